@@ -1,8 +1,28 @@
-from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
-from typing import List
-from app.database.database import get_db
-from app.database.models import Product, InventoryTransaction, TransactionType
+from fastapi import APIRouter, HTTPException, Depends, Header, Query, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Literal
+from app.database.database import get_async_db
+from app.database.models import Product, InventoryTransaction, TransactionType, reorder_threshold, stock_ratio
+from app.api.pagination import encode_cursor, decode_cursor, NEXT_CURSOR_HEADER
+from app.services.stock import (
+    apply_stock_movement,
+    apply_stock_movements_batch,
+    InsufficientStockError,
+    ProductNotFoundError
+)
+from app.services.ledger_export import stream_ledger, EXPORT_MEDIA_TYPES
+from app.services.snapshots import stock_at
+from app.services.idempotency import (
+    claim_idempotency_key,
+    store_idempotent_response,
+    request_fingerprint,
+    IdempotencyKeyReuseError,
+    IDEMPOTENCY_KEY_MAX_LENGTH
+)
+from app.services.cache import read_cache, PRODUCT_LISTS_TAG, MAX_LIST_OFFSET
+from app.services.events import stock_events, stock_event
 from pydantic import BaseModel, Field
 from datetime import datetime
 import logging
@@ -48,187 +68,416 @@ class InventoryTransactionResponse(InventoryTransactionBase):
     class Config:
         from_attributes = True
 
-@router.post("/receive", response_model=InventoryTransactionResponse)
-async def receive_stock(transaction: InventoryTransactionCreate, db: Session = Depends(get_db)):
+class LowStockProductResponse(BaseModel):
+    id: str
+    name: str
+    sku: str
+    category: str
+    current_stock: int
+    min_stock_level: int
+    reorder_point: int | None = None
+    reorder_threshold: int
+    stock_ratio: float
+
+class StockAtResponse(BaseModel):
+    product_id: str
+    at: datetime
+    stock: int
+    anchor: str  # "snapshot" or "current"
+    anchor_at: datetime | None = None
+    transactions_replayed: int
+
+class BatchTransactionResult(BaseModel):
+    index: int
+    status: str  # "applied" or "rejected"
+    transaction: InventoryTransactionResponse | None = None
+    error: str | None = None
+
+class BatchTransactionResponse(BaseModel):
+    applied: int
+    rejected: int
+    results: List[BatchTransactionResult]
+
+MAX_BATCH_SIZE = 5000
+IDEMPOTENT_REPLAY_HEADER = "Idempotent-Replayed"
+
+def replay_response(stored: tuple) -> JSONResponse:
+    status_code, body = stored
+    return JSONResponse(status_code=status_code, content=body, headers={IDEMPOTENT_REPLAY_HEADER: "true"})
+
+async def apply_transaction(
+    transaction: InventoryTransactionCreate,
+    expected_type: TransactionType,
+    endpoint: str,
+    db: AsyncSession,
+    idempotency_key: str | None = None
+):
+    """Validate and apply a single stock movement through the atomic stock service.
+
+    With an Idempotency-Key, the key is claimed in the same database
+    transaction as the movement and the response stored with it, so a retry
+    replays the stored response without moving stock again.
+    """
+    if transaction.transaction_type != expected_type:
+        raise HTTPException(status_code=400, detail=f"Invalid transaction type for {endpoint} endpoint")
     try:
-        product = db.query(Product).filter(Product.id == transaction.product_id).first()
-        if not product:
-            raise HTTPException(status_code=404, detail=f"Product not found: {transaction.product_id}")
-        if transaction.transaction_type != TransactionType.RECEIVED:
-            raise HTTPException(status_code=400, detail="Invalid transaction type for receive endpoint")
-        
-        previous_stock = product.current_stock
-        new_stock = previous_stock + transaction.quantity
-        
-        db_transaction = InventoryTransaction(
+        if idempotency_key is not None:
+            stored = await claim_idempotency_key(
+                db, idempotency_key, endpoint, request_fingerprint(endpoint, transaction.model_dump(mode="json"))
+            )
+            if stored is not None:
+                await db.rollback()
+                return replay_response(stored)
+
+        db_transaction = await apply_stock_movement(
+            db,
             product_id=transaction.product_id,
-            transaction_type=TransactionType.RECEIVED,
+            transaction_type=expected_type,
             quantity=transaction.quantity,
-            previous_stock=previous_stock,
-            new_stock=new_stock,
             reference_number=transaction.reference_number,
             notes=transaction.notes
         )
-        product.current_stock = new_stock
-        db.add(db_transaction)
-        db.commit()
-        db.refresh(db_transaction)
-        return db_transaction
-    except HTTPException:
-        raise
+        response = InventoryTransactionResponse.model_validate(db_transaction)
+        if idempotency_key is not None:
+            await store_idempotent_response(db, idempotency_key, 200, response.model_dump(mode="json"))
+        await db.commit()
+        await read_cache.invalidate_product(transaction.product_id)
+        await stock_events.publish([stock_event(db_transaction)])
+        return response
+    except ProductNotFoundError as e:
+        await db.rollback()
+        raise HTTPException(status_code=404, detail=str(e))
+    except InsufficientStockError as e:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+    except IdempotencyKeyReuseError as e:
+        await db.rollback()
+        raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
-        db.rollback()
-        logger.error(f"Error receiving stock: {str(e)}")
+        await db.rollback()
+        logger.error(f"Error processing {endpoint} transaction: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to process transaction: {str(e)}")
 
+IdempotencyKeyHeader = Header(None, alias="Idempotency-Key", max_length=IDEMPOTENCY_KEY_MAX_LENGTH)
+
+@router.post("/receive", response_model=InventoryTransactionResponse)
+async def receive_stock(
+    transaction: InventoryTransactionCreate,
+    db: AsyncSession = Depends(get_async_db),
+    idempotency_key: str | None = IdempotencyKeyHeader
+):
+    return await apply_transaction(transaction, TransactionType.RECEIVED, "receive", db, idempotency_key)
+
 @router.post("/adjust", response_model=InventoryTransactionResponse)
-async def adjust_stock(transaction: InventoryTransactionCreate, db: Session = Depends(get_db)):
-    try:
-        product = db.query(Product).filter(Product.id == transaction.product_id).first()
-        if not product:
-            raise HTTPException(status_code=404, detail=f"Product not found: {transaction.product_id}")
-        if transaction.transaction_type != TransactionType.ADJUSTED:
-            raise HTTPException(status_code=400, detail="Invalid transaction type for adjust endpoint")
-        
-        previous_stock = product.current_stock
-        new_stock = previous_stock + transaction.quantity if transaction.quantity > 0 else previous_stock - abs(transaction.quantity)
-        
-        db_transaction = InventoryTransaction(
-            product_id=transaction.product_id,
-            transaction_type=TransactionType.ADJUSTED,
-            quantity=abs(transaction.quantity),
-            previous_stock=previous_stock,
-            new_stock=new_stock,
-            reference_number=transaction.reference_number,
-            notes=transaction.notes
-        )
-        product.current_stock = new_stock
-        db.add(db_transaction)
-        db.commit()
-        db.refresh(db_transaction)
-        return db_transaction
-    except HTTPException:
-        raise
-    except Exception as e:
-        db.rollback()
-        logger.error(f"Error adjusting stock: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Failed to process transaction: {str(e)}")
-    
-    
+async def adjust_stock(
+    transaction: InventoryTransactionCreate,
+    db: AsyncSession = Depends(get_async_db),
+    idempotency_key: str | None = IdempotencyKeyHeader
+):
+    return await apply_transaction(transaction, TransactionType.ADJUSTED, "adjust", db, idempotency_key)
+
 @router.post("/ship", response_model=InventoryTransactionResponse)
-async def ship_stock(transaction: InventoryTransactionCreate, db: Session = Depends(get_db)):
+async def ship_stock(
+    transaction: InventoryTransactionCreate,
+    db: AsyncSession = Depends(get_async_db),
+    idempotency_key: str | None = IdempotencyKeyHeader
+):
+    return await apply_transaction(transaction, TransactionType.SHIPPED, "ship", db, idempotency_key)
+
+def build_batch_response(outcomes: list[dict]) -> BatchTransactionResponse:
+    results = [
+        BatchTransactionResult(
+            index=index,
+            status="applied" if "transaction" in outcome else "rejected",
+            transaction=(
+                InventoryTransactionResponse.model_validate(outcome["transaction"])
+                if "transaction" in outcome else None
+            ),
+            error=outcome.get("error")
+        )
+        for index, outcome in enumerate(outcomes)
+    ]
+    applied = sum(1 for result in results if result.status == "applied")
+    return BatchTransactionResponse(applied=applied, rejected=len(results) - applied, results=results)
+
+@router.post("/transactions/batch", response_model=BatchTransactionResponse)
+async def apply_transactions_batch(
+    transactions: List[InventoryTransactionCreate],
+    db: AsyncSession = Depends(get_async_db),
+    idempotency_key: str | None = IdempotencyKeyHeader
+):
+    """Apply a batch of receive/ship/adjust events in one database transaction.
+
+    Items are applied in order per product; items that would overdraw stock or
+    reference an unknown product are rejected individually.
+    """
+    if not transactions:
+        raise HTTPException(status_code=400, detail="Batch must contain at least one transaction")
+    if len(transactions) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"Batch size exceeds the maximum of {MAX_BATCH_SIZE}")
     try:
-        product = db.query(Product).filter(Product.id == transaction.product_id).first()
-        if not product:
-            raise HTTPException(status_code=404, detail=f"Product not found: {transaction.product_id}")
-        if transaction.transaction_type != TransactionType.SHIPPED:
-            raise HTTPException(status_code=400, detail="Invalid transaction type for ship endpoint")
-        if product.current_stock < transaction.quantity:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Insufficient stock. Current stock: {product.current_stock}"
+        if idempotency_key is not None:
+            stored = await claim_idempotency_key(
+                db, idempotency_key, "batch",
+                request_fingerprint("batch", [transaction.model_dump(mode="json") for transaction in transactions])
             )
+            if stored is not None:
+                await db.rollback()
+                return replay_response(stored)
 
-        previous_stock = product.current_stock
-        new_stock = previous_stock - transaction.quantity
-        
-        db_transaction = InventoryTransaction(
-            product_id=transaction.product_id,
-            transaction_type=TransactionType.SHIPPED,
-            quantity=transaction.quantity,
-            previous_stock=previous_stock,
-            new_stock=new_stock,
-            reference_number=transaction.reference_number,
-            notes=transaction.notes
+        outcomes = await apply_stock_movements_batch(
+            db, [transaction.model_dump() for transaction in transactions]
         )
-
-        product.current_stock = new_stock
-        db.add(db_transaction)
-        db.commit()
-        db.refresh(db_transaction)
-        return db_transaction
-    except HTTPException:
-        raise  # Re-raise HTTPException to return 400/404 as intended
+        response = build_batch_response(outcomes)
+        if idempotency_key is not None:
+            await store_idempotent_response(db, idempotency_key, 200, response.model_dump(mode="json"))
+        await db.commit()
+    except IdempotencyKeyReuseError as e:
+        await db.rollback()
+        raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
-        db.rollback()
-        logger.error(f"Error shipping stock: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Failed to process transaction: {str(e)}")
+        await db.rollback()
+        logger.error(f"Error processing transaction batch: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to process transaction batch: {str(e)}")
+
+    touched = {transaction.product_id for transaction in transactions}
+    await read_cache.invalidate(
+        keys=[f"product:{product_id}" for product_id in touched],
+        tags=[PRODUCT_LISTS_TAG]
+    )
+    await stock_events.publish([
+        stock_event(outcome["transaction"]) for outcome in outcomes if "transaction" in outcome
+    ])
+
+    return response
+
+async def fetch_transaction_page(
+    db: AsyncSession,
+    response: Response,
+    cursor: str | None,
+    skip: int,
+    limit: int,
+    product_id: str | None = None
+):
+    """
+    Fetch one page of transactions, newest first.
+
+    With a cursor the page is located by keyset on (created_at, id), which the
+    composite indexes on inventory_transactions serve directly, so latency does
+    not grow with page depth. The cursor for the following page is returned in
+    the X-Next-Cursor header. ``skip`` is kept for older clients.
+    """
+    query = select(InventoryTransaction)
+    if product_id is not None:
+        query = query.where(InventoryTransaction.product_id == product_id)
+    if cursor:
+        created_at, transaction_id = decode_cursor(cursor, datetime, int)
+        # The plain created_at bound is redundant with the row comparison but
+        # lets the planner prune newer monthly partitions
+        query = query.where(
+            InventoryTransaction.created_at <= created_at,
+            tuple_(InventoryTransaction.created_at, InventoryTransaction.id) < (created_at, transaction_id)
+        )
+    elif skip:
+        query = query.offset(skip)
+
+    result = await db.execute(
+        query
+        .order_by(InventoryTransaction.created_at.desc(), InventoryTransaction.id.desc())
+        .limit(limit + 1)
+    )
+    transactions = result.scalars().all()
+    if len(transactions) > limit:
+        transactions = transactions[:limit]
+        last = transactions[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(last.created_at, last.id)
+    return transactions
+
+STREAM_KEEPALIVE_SECONDS = 15
+
+@router.get("/stream")
+async def stream_stock_events(request: Request):
+    """
+    Server-Sent Events stream of committed stock changes.
+
+    Each event's data is a compact JSON object (id, product_id, type,
+    quantity, new_stock, at). Clients that fall too far behind receive a
+    ``dropped`` event and are disconnected; they should reconnect and refetch
+    the current status.
+    """
+    subscription = stock_events.subscribe()
+
+    async def event_stream():
+        try:
+            yield "retry: 3000\n\n"
+            while not await request.is_disconnected():
+                payload = await subscription.next(timeout=STREAM_KEEPALIVE_SECONDS)
+                if subscription.dropped:
+                    yield "event: dropped\ndata: {}\n\n"
+                    break
+                if payload is None:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: stock\ndata: {payload}\n\n"
+        finally:
+            stock_events.unsubscribe(subscription)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/transactions/export")
+async def export_transactions(
+    format: Literal["csv", "ndjson"] = "csv",
+    start: datetime | None = None,
+    end: datetime | None = None,
+    product_id: str | None = None
+):
+    """Stream the inventory ledger as CSV or NDJSON, optionally filtered by date range and product."""
+    if start is not None and end is not None and start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    filename = f"inventory_transactions.{format}"
+    return StreamingResponse(
+        stream_ledger(format, start=start, end=end, product_id=product_id),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
 
 @router.get("/transactions/{product_id}", response_model=List[InventoryTransactionResponse])
 async def get_product_transactions(
     product_id: str,
+    response: Response,
+    cursor: str | None = None,
     skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db)
-):
-    transactions = (
-        db.query(InventoryTransaction)
-        .filter(InventoryTransaction.product_id == product_id)
-        .order_by(InventoryTransaction.created_at.desc())
-        .offset(skip)
-        .limit(limit)
-        .all()
-    )
-    return transactions
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_async_db)
+):
+    return await fetch_transaction_page(db, response, cursor, skip, limit, product_id=product_id)
 
 @router.get("/transactions", response_model=List[InventoryTransactionResponse])
 async def get_all_transactions(
+    response: Response,
+    cursor: str | None = None,
     skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db)
-):
-    transactions = (
-        db.query(InventoryTransaction)
-        .order_by(InventoryTransaction.created_at.desc())
-        .offset(skip)
-        .limit(limit)
-        .all()
-    )
-    return transactions
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_async_db)
+):
+    return await fetch_transaction_page(db, response, cursor, skip, limit)
 
 @router.get("/status", response_model=List[ProductResponse])
 async def get_inventory_status(
-    skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db)
+    skip: int = Query(0, ge=0, le=MAX_LIST_OFFSET),
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    products = (
-        db.query(Product)
-        .offset(skip)
-        .limit(limit)
-        .all()
-    )
-    return products
+    async def load():
+        result = await db.execute(
+            select(Product)
+            .offset(skip)
+            .limit(limit)
+        )
+        return [
+            ProductResponse.model_validate(product).model_dump(mode="json")
+            for product in result.scalars().all()
+        ]
+
+    return await read_cache.get_or_load(f"inventory:status:{skip}:{limit}", load, tags=[PRODUCT_LISTS_TAG])
+
+@router.get("/stock-at", response_model=StockAtResponse)
+async def get_stock_at(
+    product_id: str,
+    at: datetime,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Stock of a product at a point in time, replayed from the nearest daily snapshot."""
+    try:
+        reconstructed = await stock_at(db, product_id, at)
+    except ProductNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return StockAtResponse(product_id=product_id, at=at, **reconstructed)
+
+@router.get("/low-stock", response_model=List[LowStockProductResponse])
+async def get_low_stock_products(
+    response: Response,
+    cursor: str | None = None,
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Products at or below their reorder threshold, most severe first.
+
+    Severity is current_stock / reorder threshold (0 = out of stock). The
+    filter and ordering run in SQL against the partial severity index on
+    products; pages are keyed on (stock_ratio, id) with the next cursor in the
+    X-Next-Cursor header.
+    """
+    query = select(
+        Product.id,
+        Product.name,
+        Product.sku,
+        Product.category,
+        Product.current_stock,
+        Product.min_stock_level,
+        Product.reorder_point,
+        reorder_threshold.label("reorder_threshold"),
+        stock_ratio.label("stock_ratio")
+    ).where(Product.current_stock <= reorder_threshold, reorder_threshold > 0)
+    if cursor:
+        ratio, product_id = decode_cursor(cursor, float, str)
+        query = query.where(tuple_(stock_ratio, Product.id) > (ratio, product_id))
+
+    result = await db.execute(query.order_by(stock_ratio, Product.id).limit(limit + 1))
+    rows = result.all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(rows[-1].stock_ratio, rows[-1].id)
+    return [LowStockProductResponse.model_validate(row, from_attributes=True) for row in rows]
 
 @router.get("/inventory/transactions", response_model=List[InventoryTransactionResponse])
 async def get_all_transactions_alt(
+    response: Response,
+    cursor: str | None = None,
     skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db)
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get all inventory transactions (alternative endpoint)"""
-    return await get_all_transactions(skip, limit, db)
+    return await get_all_transactions(response, cursor, skip, limit, db)
 
 @router.get("/inventory/status", response_model=List[ProductResponse])
 async def get_inventory_status_alt(
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get inventory status (alternative endpoint)"""
     return await get_inventory_status(skip, limit, db)
 
 @router.post("/inventory/receive", response_model=InventoryTransactionResponse)
-async def receive_stock_alt(transaction: InventoryTransactionCreate, db: Session = Depends(get_db)):
+async def receive_stock_alt(
+    transaction: InventoryTransactionCreate,
+    db: AsyncSession = Depends(get_async_db),
+    idempotency_key: str | None = IdempotencyKeyHeader
+):
     """Receive stock (alternative endpoint)"""
-    return await receive_stock(transaction, db)
+    return await receive_stock(transaction, db, idempotency_key)
 
 @router.post("/inventory/ship", response_model=InventoryTransactionResponse)
-async def ship_stock_alt(transaction: InventoryTransactionCreate, db: Session = Depends(get_db)):
+async def ship_stock_alt(
+    transaction: InventoryTransactionCreate,
+    db: AsyncSession = Depends(get_async_db),
+    idempotency_key: str | None = IdempotencyKeyHeader
+):
     """Ship stock (alternative endpoint)"""
-    return await ship_stock(transaction, db)
+    return await ship_stock(transaction, db, idempotency_key)
 
 @router.post("/inventory/adjust", response_model=InventoryTransactionResponse)
-async def adjust_stock_alt(transaction: InventoryTransactionCreate, db: Session = Depends(get_db)):
+async def adjust_stock_alt(
+    transaction: InventoryTransactionCreate,
+    db: AsyncSession = Depends(get_async_db),
+    idempotency_key: str | None = IdempotencyKeyHeader
+):
     """Adjust stock (alternative endpoint)"""
-    return await adjust_stock(transaction, db)
\ No newline at end of file
+    return await adjust_stock(transaction, db, idempotency_key)
\ No newline at end of file
@@ -0,0 +1,33 @@
+from fastapi import HTTPException
+from datetime import datetime
+import base64
+import json
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def encode_cursor(*values) -> str:
+    """Encode the sort key of the last row on a page as an opaque cursor."""
+    payload = json.dumps(
+        [value.isoformat() if isinstance(value, datetime) else value for value in values],
+        separators=(",", ":")
+    )
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, *types) -> tuple:
+    """
+    Decode a cursor produced by encode_cursor back into typed values.
+
+    ``types`` gives the expected type of each value; datetimes are parsed from
+    ISO format. Raises a 400 HTTPException for malformed cursors.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if len(values) != len(types):
+            raise ValueError("unexpected cursor length")
+        return tuple(
+            datetime.fromisoformat(value) if value_type is datetime else value_type(value)
+            for value, value_type in zip(values, types)
+        )
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
@@ -1,22 +1,36 @@
-from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
-from app.database.database import get_db
+from fastapi import APIRouter, HTTPException, Depends, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database.database import get_async_db
 from app.database.models import Product
-from app.models.predict import DemandPredictor
-from pydantic import BaseModel
-from typing import List, Optional
+from app.models import ModelNotFoundError
+from app.services.forecasts import get_forecast, get_forecasts, get_demand_matrix
+from app.services.advice import compute_advice, advice_message, URGENCY_LEVELS
+from app.services.inference import InferenceBusyError, INFERENCE_RETRY_AFTER_SECONDS
+from concurrent.futures.process import BrokenProcessPool
+from pydantic import BaseModel, Field
+from typing import Dict, List, Optional
 from datetime import datetime
+import numpy as np
 import logging
 
 router = APIRouter(prefix="/predictions", tags=["predictions"])
 
 logger = logging.getLogger(__name__)
 
-# Initialize predictor
-predictor = DemandPredictor(
-    model_path="models/saved",
-    data_path="data/processed"
-)
+MAX_FORECAST_BATCH_SIZE = 1000
+ADVICE_HORIZON_DAYS = 30
+# POST /advice keeps its original fixed lead time; /advice/all uses each product's lead_time_days
+ADVICE_LEAD_TIME_DAYS = 7
+
+def inference_unavailable(e: Exception) -> HTTPException:
+    """Fail fast with a retryable status when the inference pool cannot take work."""
+    logger.warning(f"Rejecting forecast request: {e}")
+    return HTTPException(
+        status_code=503,
+        detail="Forecasting is at capacity, retry shortly",
+        headers={"Retry-After": str(INFERENCE_RETRY_AFTER_SECONDS)}
+    )
 
 # Pydantic models
 class PredictionRequest(BaseModel):
@@ -28,6 +42,24 @@ class PredictionResponse(BaseModel):
     predictions: List[dict]
     generated_at: datetime
 
+class BatchPredictionRequest(BaseModel):
+    product_ids: List[str] = Field(..., min_length=1, max_length=MAX_FORECAST_BATCH_SIZE)
+    days_ahead: int = Field(30, ge=1, le=365)
+
+class ForecastSeries(BaseModel):
+    predicted_demand: List[float]
+    lower_bound: List[float]
+    upper_bound: List[float]
+    # Only set when this product's forecast starts on a different date than the batch
+    dates: Optional[List[datetime]] = None
+
+class BatchPredictionResponse(BaseModel):
+    days_ahead: int
+    dates: List[datetime]
+    forecasts: Dict[str, ForecastSeries]
+    missing_models: List[str]
+    generated_at: datetime
+
 class InventoryAdviceRequest(BaseModel):
     product_id: str
     current_stock: int
@@ -40,18 +72,35 @@ class InventoryAdviceResponse(BaseModel):
     days_of_stock: float
     urgency: str
 
+class CatalogAdviceItem(BaseModel):
+    product_id: str
+    current_stock: int
+    lead_time_days: int
+    advice: str
+    order_quantity: int
+    reorder_point: int
+    days_of_stock: float
+    avg_daily_demand: float
+    urgency: str
+
+class CatalogAdviceResponse(BaseModel):
+    total: int
+    skip: int
+    limit: int
+    without_forecast: int
+    items: List[CatalogAdviceItem]
+    generated_at: datetime
+
 @router.post("/demand", response_model=PredictionResponse)
-async def predict_demand(request: PredictionRequest, db: Session = Depends(get_db)):
+async def predict_demand(request: PredictionRequest, db: AsyncSession = Depends(get_async_db)):
     try:
         # Verify product exists
-        product = db.query(Product).filter(Product.id == request.product_id).first()
+        product = await db.get(Product, request.product_id)
         if not product:
             raise HTTPException(status_code=404, detail="Product not found")
 
-        # Generate predictions
-        predictions_df = predictor.predict_demand(
-            request.product_id, request.days_ahead
-        )
+        # Read the materialized forecast, or generate it (cached per model version)
+        predictions_df = await get_forecast(request.product_id, request.days_ahead, db)
         
         # Convert predictions to list of dicts
         predictions = []
@@ -69,56 +118,165 @@ async def predict_demand(request: PredictionRequest, db: Session = Depends(get_d
             generated_at=datetime.now()
         )
 
+    except HTTPException:
+        raise
+    except (InferenceBusyError, BrokenProcessPool) as e:
+        raise inference_unavailable(e)
+    except ModelNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         logger.error(f"Error generating predictions: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/demand/batch", response_model=BatchPredictionResponse, response_model_exclude_none=True)
+async def predict_demand_batch(request: BatchPredictionRequest, db: AsyncSession = Depends(get_async_db)):
+    """
+    Forecast many products in one call.
+
+    The response is columnar: the forecast dates are listed once and each
+    product carries arrays aligned to them. Products without a trained model
+    are listed in ``missing_models`` instead of failing the batch.
+    """
+    product_ids = list(dict.fromkeys(request.product_ids))
+    try:
+        # Verify all products exist in one query
+        found = set((await db.execute(
+            select(Product.id).where(Product.id.in_(product_ids))
+        )).scalars().all())
+        unknown = [product_id for product_id in product_ids if product_id not in found]
+        if unknown:
+            raise HTTPException(status_code=404, detail=f"Products not found: {', '.join(unknown)}")
+
+        forecasts = await get_forecasts(product_ids, request.days_ahead, db)
+
+        dates = None
+        series = {}
+        missing_models = []
+        for product_id, forecast in forecasts.items():
+            if isinstance(forecast, ModelNotFoundError):
+                missing_models.append(product_id)
+                continue
+            product_dates = forecast["date"].dt.to_pydatetime().tolist()
+            if dates is None:
+                dates = product_dates
+            series[product_id] = ForecastSeries(
+                predicted_demand=forecast["combined_prediction"].tolist(),
+                lower_bound=forecast["prophet_lower"].tolist(),
+                upper_bound=forecast["prophet_upper"].tolist(),
+                dates=product_dates if product_dates != dates else None
+            )
+
+        return BatchPredictionResponse(
+            days_ahead=request.days_ahead,
+            dates=dates or [],
+            forecasts=series,
+            missing_models=missing_models,
+            generated_at=datetime.now()
+        )
+
+    except HTTPException:
+        raise
+    except (InferenceBusyError, BrokenProcessPool) as e:
+        raise inference_unavailable(e)
+    except Exception as e:
+        logger.error(f"Error generating batch predictions: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.post("/advice", response_model=InventoryAdviceResponse)
-async def get_inventory_advice(request: InventoryAdviceRequest, db: Session = Depends(get_db)):
+async def get_inventory_advice(request: InventoryAdviceRequest, db: AsyncSession = Depends(get_async_db)):
     try:
         # Verify product exists
-        product = db.query(Product).filter(Product.id == request.product_id).first()
+        product = await db.get(Product, request.product_id)
         if not product:
             raise HTTPException(status_code=404, detail="Product not found")
 
         # Get predictions for the next 30 days
-        predictions_df = predictor.predict_demand(request.product_id, 30)
-        
-        # Calculate average daily demand
-        daily_demand = predictions_df["combined_prediction"].mean()
-        
-        # Calculate days of stock remaining
-        days_of_stock = request.current_stock / daily_demand if daily_demand > 0 else float('inf')
+        predictions_df = await get_forecast(request.product_id, ADVICE_HORIZON_DAYS, db)
         
-        # Calculate reorder point (7 days lead time + 5 days safety stock)
-        reorder_point = int(daily_demand * (7 + 5))
-        
-        # Determine urgency
-        if days_of_stock < 7:  # Less than lead time
-            urgency = "HIGH"
-        elif days_of_stock < 14:  # Less than lead time + safety stock
-            urgency = "MEDIUM"
-        else:
-            urgency = "LOW"
-        
-        # Calculate order quantity
-        order_quantity = max(0, reorder_point - request.current_stock)
-        
-        # Generate advice
-        if order_quantity > 0:
-            advice = f"Order {order_quantity} units"
-        else:
-            advice = "No immediate order needed"
+        advice = compute_advice(
+            np.array([request.current_stock]),
+            np.array([ADVICE_LEAD_TIME_DAYS]),
+            predictions_df["combined_prediction"].to_numpy()[np.newaxis, :]
+        )
+        order_quantity = int(advice["order_quantity"][0])
 
         return InventoryAdviceResponse(
             product_id=request.product_id,
-            advice=advice,
+            advice=advice_message(order_quantity),
             order_quantity=order_quantity,
-            reorder_point=reorder_point,
-            days_of_stock=round(days_of_stock, 1),
-            urgency=urgency
+            reorder_point=int(advice["reorder_point"][0]),
+            days_of_stock=round(float(advice["days_of_stock"][0]), 1),
+            urgency=URGENCY_LEVELS[advice["urgency_rank"][0]]
         )
 
+    except HTTPException:
+        raise
+    except (InferenceBusyError, BrokenProcessPool) as e:
+        raise inference_unavailable(e)
+    except ModelNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         logger.error(f"Error generating inventory advice: {e}")
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/advice/all", response_model=CatalogAdviceResponse)
+async def get_catalog_advice(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    urgency: Optional[str] = Query(None, pattern="^(HIGH|MEDIUM|LOW)$"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Reorder advice for every product with a forecast, most urgent first.
+
+    Stock and lead times come from one query and the advice is computed over
+    the whole catalog's forecast matrix at once; only the requested page is
+    turned into response objects.
+    """
+    try:
+        # Plain column rows through the connection; skips ORM result processing
+        rows = (await (await db.connection()).execute(
+            select(Product.id, Product.current_stock, Product.lead_time_days)
+        )).all()
+        stock = {product_id: (current_stock or 0, lead_time_days) for product_id, current_stock, lead_time_days in rows}
+
+        product_ids, demand = await get_demand_matrix(list(stock), ADVICE_HORIZON_DAYS, db)
+        current_stock = np.array([stock[product_id][0] for product_id in product_ids], dtype=int)
+        lead_time_days = np.array([stock[product_id][1] for product_id in product_ids], dtype=int)
+        advice = compute_advice(current_stock, lead_time_days, demand)
+
+        # Most urgent first, then fewest days of stock
+        order = np.lexsort((advice["days_of_stock"], advice["urgency_rank"]))
+        if urgency is not None:
+            rank = int(np.flatnonzero(URGENCY_LEVELS == urgency)[0])
+            order = order[advice["urgency_rank"][order] == rank]
+
+        items = []
+        for index in order[skip:skip + limit]:
+            order_quantity = int(advice["order_quantity"][index])
+            items.append(CatalogAdviceItem(
+                product_id=product_ids[index],
+                current_stock=int(current_stock[index]),
+                lead_time_days=int(lead_time_days[index]),
+                advice=advice_message(order_quantity),
+                order_quantity=order_quantity,
+                reorder_point=int(advice["reorder_point"][index]),
+                days_of_stock=round(float(advice["days_of_stock"][index]), 1),
+                avg_daily_demand=round(float(advice["daily_demand"][index]), 2),
+                urgency=URGENCY_LEVELS[advice["urgency_rank"][index]]
+            ))
+
+        return CatalogAdviceResponse(
+            total=len(order),
+            skip=skip,
+            limit=limit,
+            without_forecast=len(stock) - len(product_ids),
+            items=items,
+            generated_at=datetime.now()
+        )
+
+    except (InferenceBusyError, BrokenProcessPool) as e:
+        raise inference_unavailable(e)
+    except Exception as e:
+        logger.error(f"Error generating catalog advice: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
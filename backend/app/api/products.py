@@ -1,7 +1,9 @@
-from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
-from app.database.database import get_db
+from fastapi import APIRouter, HTTPException, Depends, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database.database import get_async_db
 from app.database.models import Product, InventoryTransaction, TransactionType
+from app.services.cache import read_cache, PRODUCT_LISTS_TAG, MAX_LIST_OFFSET
 from pydantic import BaseModel
 from datetime import datetime
 import logging
@@ -35,13 +37,13 @@ class ProductResponse(ProductBase):
         from_attributes = True
 
 @router.post("", response_model=ProductResponse)
-async def create_product(product: ProductCreate, db: Session = Depends(get_db)):
+async def create_product(product: ProductCreate, db: AsyncSession = Depends(get_async_db)):
     try:
         # Generate a unique ID using SKU
         product_id = f"PROD-{product.sku}"
         
         # Check if product already exists
-        existing_product = db.query(Product).filter(Product.id == product_id).first()
+        existing_product = await db.get(Product, product_id)
         if existing_product:
             raise HTTPException(status_code=400, detail="Product with this SKU already exists")
 
@@ -60,12 +62,13 @@ async def create_product(product: ProductCreate, db: Session = Depends(get_db)):
             current_stock=0
         )
         db.add(db_product)
-        db.commit()
-        db.refresh(db_product)
+        await db.commit()
+        await db.refresh(db_product)
+        await read_cache.invalidate(tags=[PRODUCT_LISTS_TAG])
         return db_product
 
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"Error creating product: {str(e)}")
         logger.error(f"Error type: {type(e).__name__}")
         import traceback
@@ -76,34 +79,42 @@ async def create_product(product: ProductCreate, db: Session = Depends(get_db)):
         )
 
 @router.get("/{product_id}", response_model=ProductResponse)
-async def get_product(product_id: str, db: Session = Depends(get_db)):
-    product = db.query(Product).filter(Product.id == product_id).first()
-    if not product:
-        raise HTTPException(status_code=404, detail="Product not found")
-    return product
+async def get_product(product_id: str, db: AsyncSession = Depends(get_async_db)):
+    async def load():
+        product = await db.get(Product, product_id)
+        if not product:
+            raise HTTPException(status_code=404, detail="Product not found")
+        return ProductResponse.model_validate(product).model_dump(mode="json")
+
+    return await read_cache.get_or_load(f"product:{product_id}", load)
 
 @router.get("", response_model=list[ProductResponse])
 async def list_products(
-    skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db)
+    skip: int = Query(0, ge=0, le=MAX_LIST_OFFSET),
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    products = (
-        db.query(Product)
-        .offset(skip)
-        .limit(limit)
-        .all()
-    )
-    return products
+    async def load():
+        result = await db.execute(
+            select(Product)
+            .offset(skip)
+            .limit(limit)
+        )
+        return [
+            ProductResponse.model_validate(product).model_dump(mode="json")
+            for product in result.scalars().all()
+        ]
+
+    return await read_cache.get_or_load(f"products:list:{skip}:{limit}", load, tags=[PRODUCT_LISTS_TAG])
 
 @router.put("/{product_id}", response_model=ProductResponse)
 async def update_product(
     product_id: str,
     product_update: ProductBase,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     try:
-        db_product = db.query(Product).filter(Product.id == product_id).first()
+        db_product = await db.get(Product, product_id)
         if not db_product:
             raise HTTPException(status_code=404, detail="Product not found")
 
@@ -111,19 +122,20 @@ async def update_product(
         for field, value in product_update.dict(exclude_unset=True).items():
             setattr(db_product, field, value)
 
-        db.commit()
-        db.refresh(db_product)
+        await db.commit()
+        await db.refresh(db_product)
+        await read_cache.invalidate_product(product_id)
         return db_product
 
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"Error updating product: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.delete("/{product_id}")
-async def delete_product(product_id: str, db: Session = Depends(get_db)):
+async def delete_product(product_id: str, db: AsyncSession = Depends(get_async_db)):
     try:
-        db_product = db.query(Product).filter(Product.id == product_id).first()
+        db_product = await db.get(Product, product_id)
         if not db_product:
             raise HTTPException(status_code=404, detail="Product not found")
 
@@ -134,11 +146,12 @@ async def delete_product(product_id: str, db: Session = Depends(get_db)):
                 detail="Cannot delete product with remaining stock"
             )
 
-        db.delete(db_product)
-        db.commit()
+        await db.delete(db_product)
+        await db.commit()
+        await read_cache.invalidate_product(product_id)
         return {"message": "Product deleted successfully"}
 
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"Error deleting product: {e}")
         raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
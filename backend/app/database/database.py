@@ -1,11 +1,13 @@
 from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from contextlib import contextmanager
 import os
 from dotenv import load_dotenv
 import logging
 from sqlalchemy.exc import SQLAlchemyError
 from .models import Base  # Import Base from models
+from .partitions import ensure_monthly_partitions, require_partitioned
 import time
 from urllib.parse import urlparse
 
@@ -32,8 +34,16 @@ def get_database_url():
         logger.error(f"Invalid DATABASE_URL format: {e}")
         raise
 
+def get_async_database_url(database_url):
+    """Derive the asyncpg URL used by the async engine from the sync URL."""
+    scheme, rest = database_url.split("://", 1)
+    if scheme.split("+")[0] in ("postgresql", "postgres"):
+        return f"postgresql+asyncpg://{rest}"
+    return database_url
+
 # Get database URL from environment variable
 SQLALCHEMY_DATABASE_URL = get_database_url()
+ASYNC_SQLALCHEMY_DATABASE_URL = get_async_database_url(SQLALCHEMY_DATABASE_URL)
 
 # Configure PostgreSQL connection pool
 POSTGRES_POOL_SIZE = int(os.getenv("POSTGRES_POOL_SIZE", "5"))
@@ -41,6 +51,7 @@ POSTGRES_MAX_OVERFLOW = int(os.getenv("POSTGRES_MAX_OVERFLOW", "10"))
 POSTGRES_POOL_TIMEOUT = int(os.getenv("POSTGRES_POOL_TIMEOUT", "30"))
 POSTGRES_RETRY_ATTEMPTS = int(os.getenv("POSTGRES_RETRY_ATTEMPTS", "5"))
 POSTGRES_RETRY_DELAY = int(os.getenv("POSTGRES_RETRY_DELAY", "5"))
+POSTGRES_ECHO = os.getenv("POSTGRES_ECHO", "True").lower() == "true"
 
 def get_engine():
     """Create and return a database engine with appropriate configuration."""
@@ -53,7 +64,7 @@ def get_engine():
                 pool_timeout=POSTGRES_POOL_TIMEOUT,
                 pool_pre_ping=True,
                 pool_recycle=3600,  # Recycle connections after 1 hour
-                echo=True
+                echo=POSTGRES_ECHO
             )
             # Test the connection
             with engine.connect() as conn:
@@ -93,6 +104,47 @@ def get_db():
     finally:
         db.close()
 
+def get_async_engine():
+    """Create and return an async database engine with the same pool configuration.
+
+    Connections are opened lazily, so unlike get_engine() this does not block
+    on a connectivity check at import time.
+    """
+    return create_async_engine(
+        ASYNC_SQLALCHEMY_DATABASE_URL,
+        pool_size=POSTGRES_POOL_SIZE,
+        max_overflow=POSTGRES_MAX_OVERFLOW,
+        pool_timeout=POSTGRES_POOL_TIMEOUT,
+        pool_pre_ping=True,
+        pool_recycle=3600,  # Recycle connections after 1 hour
+        echo=POSTGRES_ECHO
+    )
+
+# Create async engine
+async_engine = get_async_engine()
+
+# Create async session factory
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
+async def get_async_db():
+    """FastAPI dependency providing an AsyncSession for the duration of a request.
+
+    Handlers commit explicitly; anything left uncommitted is rolled back when
+    the session closes.
+    """
+    async with AsyncSessionLocal() as db:
+        try:
+            yield db
+        except SQLAlchemyError as e:
+            await db.rollback()
+            logger.error(f"Database session error: {e}")
+            raise
+
 def init_db():
     """Initialize the database, creating all tables."""
     try:
@@ -105,6 +157,21 @@ def init_db():
         
         # Create tables
         Base.metadata.create_all(bind=engine)
+
+        # create_all leaves an existing unpartitioned ledger as it is, which no
+        # longer matches the model (primary key (id, created_at)); refuse to start
+        with engine.connect() as conn:
+            require_partitioned(conn)
+
+        # create_all only builds indexes with new tables; add any that were
+        # introduced after the table already existed
+        for table in Base.metadata.tables.values():
+            for index in table.indexes:
+                index.create(bind=engine, checkfirst=True)
+
+        # Make sure the ledger has partitions for this month and the next few
+        with engine.begin() as conn:
+            ensure_monthly_partitions(conn)
         logger.info("Database tables created successfully")
     except Exception as e:
         logger.error(f"Error creating database tables: {str(e)}")
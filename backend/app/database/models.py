@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, Boolean, ForeignKey, Enum, Index, JSON, func, cast, type_coerce, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -31,10 +31,88 @@ class Product(Base):
     # Relationships
     inventory_transactions = relationship("InventoryTransaction", back_populates="product")
 
+class StockSnapshot(Base):
+    """Stock of a product as of snapshot_at, i.e. after every transaction created before it."""
+    __tablename__ = "stock_snapshots"
+
+    product_id = Column(String, ForeignKey("products.id", ondelete="CASCADE"), primary_key=True)
+    snapshot_at = Column(DateTime, primary_key=True)
+    stock = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class IdempotencyKey(Base):
+    """Completed response of a mutation request, replayed when its Idempotency-Key is retried."""
+    __tablename__ = "idempotency_keys"
+
+    key = Column(String, primary_key=True)
+    endpoint = Column(String, nullable=False)
+    request_hash = Column(String, nullable=False)
+    response_status = Column(Integer)
+    response_body = Column(JSON)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+class ForecastRun(Base):
+    """
+    One batch materialization of demand forecasts.
+
+    Rows are loaded under a new run, then the run is made current in a single
+    transaction, so readers switch from one complete run to the next.
+    """
+    __tablename__ = "forecast_runs"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    status = Column(String, nullable=False, default="running")  # running, complete, failed
+    is_current = Column(Boolean, nullable=False, default=False)
+    days_ahead = Column(Integer, nullable=False)
+    products = Column(Integer, nullable=False, default=0)
+    started_at = Column(DateTime, default=datetime.utcnow)
+    completed_at = Column(DateTime)
+
+    __table_args__ = (
+        # At most one current run
+        Index("ux_forecast_runs_current", is_current, unique=True, postgresql_where=text("is_current")),
+    )
+
+class DemandForecast(Base):
+    __tablename__ = "demand_forecasts"
+
+    # Primary key order serves the per-product range read of the current run
+    run_id = Column(Integer, ForeignKey("forecast_runs.id", ondelete="CASCADE"), primary_key=True)
+    product_id = Column(String, primary_key=True)
+    forecast_date = Column(Date, primary_key=True)
+    predicted_demand = Column(Float, nullable=False)
+    prophet_prediction = Column(Float, nullable=False)
+    lower_bound = Column(Float, nullable=False)
+    upper_bound = Column(Float, nullable=False)
+
+# Stock level at which a product needs reordering: its reorder point, but never
+# below its minimum stock level
+reorder_threshold = func.greatest(
+    func.coalesce(Product.reorder_point, Product.min_stock_level),
+    Product.min_stock_level
+)
+
+# Severity of a low-stock product; 0 is out of stock, 1 is at the threshold.
+# NULL for a zero threshold: PostgreSQL may evaluate this before the
+# "reorder_threshold > 0" filter, so the division guards itself.
+stock_ratio = cast(Product.current_stock, Float) / type_coerce(func.nullif(reorder_threshold, 0), Float)
+
+# Partial index over only the products that need reordering, ordered by
+# severity. Queries must use the expressions above verbatim to match it.
+Index(
+    "ix_products_low_stock_severity",
+    stock_ratio,
+    Product.id,
+    postgresql_where=(Product.current_stock <= reorder_threshold) & (reorder_threshold > 0)
+)
+
 class InventoryTransaction(Base):
     __tablename__ = "inventory_transactions"
 
-    id = Column(Integer, primary_key=True)
+    # Range-partitioned by month on created_at, so the partition key is part
+    # of the primary key. Partitions are managed by app.database.partitions.
+    id = Column(Integer, primary_key=True, autoincrement=True)
     product_id = Column(String, ForeignKey("products.id"))
     transaction_type = Column(Enum(TransactionType))
     quantity = Column(Integer, nullable=False)
@@ -42,7 +120,14 @@ class InventoryTransaction(Base):
     new_stock = Column(Integer, nullable=False)
     reference_number = Column(String)  # PO number, shipping number, etc.
     notes = Column(String)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, primary_key=True, default=datetime.utcnow)
 
     # Relationships
-    product = relationship("Product", back_populates="inventory_transactions") 
\ No newline at end of file
+    product = relationship("Product", back_populates="inventory_transactions")
+
+    # Keyset pagination indexes for transaction history, newest first
+    __table_args__ = (
+        Index("ix_inventory_transactions_product_created", product_id, created_at.desc(), id.desc()),
+        Index("ix_inventory_transactions_created", created_at.desc(), id.desc()),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    ) 
\ No newline at end of file
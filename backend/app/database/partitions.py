@@ -0,0 +1,149 @@
+from sqlalchemy import text
+from datetime import date, datetime
+from pathlib import Path
+import gzip
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+PARENT_TABLE = "inventory_transactions"
+DEFAULT_PARTITION = f"{PARENT_TABLE}_default"
+PARTITION_NAME_RE = re.compile(rf"^{PARENT_TABLE}_p(\d{{4}})_(\d{{2}})$")
+
+class LedgerNotPartitionedError(RuntimeError):
+    """The ledger table predates partitioning and has to be migrated first."""
+
+def month_start(value: date) -> date:
+    return date(value.year, value.month, 1)
+
+def add_months(value: date, months: int) -> date:
+    month_index = value.year * 12 + value.month - 1 + months
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+def partition_name(month: date) -> str:
+    return f"{PARENT_TABLE}_p{month.year:04d}_{month.month:02d}"
+
+def is_partitioned(conn) -> bool:
+    relkind = conn.execute(
+        text("SELECT relkind FROM pg_class WHERE relname = :name AND relkind IN ('r', 'p')"),
+        {"name": PARENT_TABLE}
+    ).scalar()
+    return relkind == "p"
+
+def require_partitioned(conn):
+    """Raise LedgerNotPartitionedError if the ledger table is still a plain table."""
+    if not is_partitioned(conn):
+        raise LedgerNotPartitionedError(
+            f"{PARENT_TABLE} is not partitioned; run `python scripts/manage_partitions.py migrate` "
+            "before starting the application"
+        )
+
+def list_partitions(conn) -> dict:
+    """Return {month: partition name} for the monthly partitions currently attached."""
+    names = conn.execute(text("""
+        SELECT child.relname
+        FROM pg_inherits
+        JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE parent.relname = :parent
+    """), {"parent": PARENT_TABLE}).scalars()
+    partitions = {}
+    for name in names:
+        match = PARTITION_NAME_RE.match(name)
+        if match:
+            partitions[date(int(match.group(1)), int(match.group(2)), 1)] = name
+    return partitions
+
+def ensure_default_partition(conn):
+    conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {PARENT_TABLE} DEFAULT"
+    ))
+
+def create_month_partition(conn, month: date) -> str:
+    """
+    Create the partition for one month.
+
+    Rows for that month that already landed in the default partition are
+    moved into the new partition before it is attached, since Postgres
+    refuses to attach a range the default partition already holds rows for.
+    The default partition must exist.
+    """
+    name = partition_name(month)
+    start, end = month, add_months(month, 1)
+    bounds = {"start": datetime.combine(start, datetime.min.time()), "end": datetime.combine(end, datetime.min.time())}
+
+    stray_rows = conn.execute(
+        text(f"SELECT count(*) FROM {DEFAULT_PARTITION} WHERE created_at >= :start AND created_at < :end"),
+        bounds
+    ).scalar()
+
+    if not stray_rows:
+        conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {PARENT_TABLE} "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        ))
+        return name
+
+    logger.info(f"Moving {stray_rows} rows from {DEFAULT_PARTITION} into {name}")
+    conn.execute(text(f"CREATE TABLE {name} (LIKE {PARENT_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    conn.execute(text(
+        f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE created_at >= :start AND created_at < :end RETURNING *) "
+        f"INSERT INTO {name} SELECT * FROM moved"
+    ), bounds)
+    conn.execute(text(
+        f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {name} "
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    ))
+    return name
+
+def ensure_monthly_partitions(conn, months_ahead: int = 3, months_back: int = 0, today: date | None = None) -> list:
+    """Pre-create partitions from ``months_back`` before to ``months_ahead`` after the current month."""
+    if not is_partitioned(conn):
+        logger.warning(f"{PARENT_TABLE} is not partitioned; run scripts/manage_partitions.py migrate")
+        return []
+    ensure_default_partition(conn)
+    existing = list_partitions(conn)
+    current = month_start(today or datetime.utcnow().date())
+    created = []
+    for offset in range(-months_back, months_ahead + 1):
+        month = add_months(current, offset)
+        if month not in existing:
+            created.append(create_month_partition(conn, month))
+    if created:
+        logger.info(f"Created partitions: {', '.join(created)}")
+    return created
+
+def detach_partition(conn, name: str):
+    conn.execute(text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name}"))
+
+def archive_table(conn, name: str, archive_dir: Path) -> Path:
+    """Write a (detached) partition to a gzip-compressed CSV file using COPY."""
+    archive_dir.mkdir(parents=True, exist_ok=True)
+    archive_path = archive_dir / f"{name}.csv.gz"
+    raw = conn.connection.dbapi_connection
+    with gzip.open(archive_path, "wt", encoding="utf-8") as archive, raw.cursor() as cursor:
+        cursor.copy_expert(f"COPY {name} TO STDOUT WITH (FORMAT csv, HEADER true)", archive)
+    return archive_path
+
+def retire_partitions(conn, retain_months: int, archive_dir: Path | None = None, today: date | None = None) -> list:
+    """
+    Detach partitions whose whole month is older than ``retain_months``.
+
+    With ``archive_dir`` each detached partition is exported to a compressed
+    CSV and dropped; without it the detached table is left in place.
+    """
+    cutoff = add_months(month_start(today or datetime.utcnow().date()), -retain_months)
+    retired = []
+    for month, name in sorted(list_partitions(conn).items()):
+        if month >= cutoff:
+            continue
+        detach_partition(conn, name)
+        if archive_dir is not None:
+            archive_path = archive_table(conn, name, archive_dir)
+            conn.execute(text(f"DROP TABLE {name}"))
+            logger.info(f"Archived {name} to {archive_path}")
+        else:
+            logger.info(f"Detached {name}")
+        retired.append(name)
+    return retired
@@ -1,11 +1,20 @@
 from fastapi import FastAPI, APIRouter, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
-from redis import Redis
+import asyncio
 import logging
 import traceback
-from app.database.database import init_db, check_db_connection
+from app.database.database import init_db, check_db_connection, async_engine, AsyncSessionLocal
 from app.api import products_router, inventory_router, predictions_router
+from app.services.cache import read_cache
+from app.services.events import stock_events
+from app.services.forecasts import forecast_cache, forecast_flights, store_stats
+from app.services.forecast_runs import current_run
+from app.services.inference import inference_pool
+from app.services.idempotency import purge_expired_keys
+
+IDEMPOTENCY_PURGE_INTERVAL_SECONDS = 3600
+background_tasks = []
 
 # Set up logging
 logging.basicConfig(
@@ -74,9 +83,6 @@ async def global_exception_handler(request: Request, exc: Exception):
         }
     )
 
-# Initialize Redis connection
-redis_client = Redis(host='localhost', port=6379, db=0, decode_responses=True)
-
 # Include the main router with /api prefix
 app.include_router(api_router, prefix="/api")
 
@@ -89,6 +95,28 @@ async def root():
         "api_prefix": "/api"
     }
 
+@app.get("/metrics")
+async def metrics():
+    return {
+        "cache": read_cache.stats(),
+        "stock_events": stock_events.stats(),
+        "forecast_cache": forecast_cache.stats(),
+        "forecast_coalescing": forecast_flights.stats(),
+        "forecast_sources": store_stats,
+        "inference": inference_pool.stats()
+    }
+
+async def purge_idempotency_keys_periodically():
+    while True:
+        try:
+            async with AsyncSessionLocal() as db:
+                purged = await purge_expired_keys(db)
+            if purged:
+                logger.info(f"Purged {purged} expired idempotency keys")
+        except Exception as e:
+            logger.warning(f"Failed to purge expired idempotency keys: {e}")
+        await asyncio.sleep(IDEMPOTENCY_PURGE_INTERVAL_SECONDS)
+
 # Initialize database and models on startup
 @app.on_event("startup")
 async def startup_event():
@@ -100,12 +128,36 @@ async def startup_event():
         # Initialize database
         init_db()
         logger.info("Database initialized successfully")
+
+        await stock_events.start()
+        async with AsyncSessionLocal() as db:
+            run = await current_run(db)
+        if run is None:
+            await inference_pool.start()
+        else:
+            # Forecasts are served from the run; workers start on the first fallback
+            logger.info(f"Serving forecasts from materialized run {run.id}; inference pool starts on demand")
+        background_tasks.append(asyncio.create_task(purge_idempotency_keys_periodically()))
     except Exception as e:
         logger.error(f"Error during startup: {e}")
         logger.error(f"Error type: {type(e).__name__}")
         logger.error(f"Traceback: {traceback.format_exc()}")
         raise
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    background_tasks.clear()
+
+    # Release pooled async connections
+    await async_engine.dispose()
+    await read_cache.close()
+    await forecast_cache.close()
+    await stock_events.stop()
+    await inference_pool.stop()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8950) 
\ No newline at end of file
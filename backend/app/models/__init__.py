@@ -1,3 +1,4 @@
 from .predict import DemandPredictor
+from .registry import ModelRegistry, ModelNotFoundError
 
-__all__ = ["DemandPredictor"] 
\ No newline at end of file
+__all__ = ["DemandPredictor", "ModelRegistry", "ModelNotFoundError"]
@@ -1,25 +1,169 @@
 import pandas as pd
+from pathlib import Path
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+import hashlib
 import logging
+import os
+import threading
+from .registry import ModelRegistry, ModelNotFoundError
 
 logger = logging.getLogger(__name__)
 
+# Load environment variables
+load_dotenv()
+
+REPO_ROOT = Path(__file__).resolve().parents[3]
+MODEL_PATH = os.getenv("MODEL_PATH", str(REPO_ROOT / "models" / "saved"))
+DATA_PATH = os.getenv("DATA_PATH", str(REPO_ROOT / "data" / "processed"))
+MODEL_CACHE_MAX_BYTES = int(os.getenv("MODEL_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+MODEL_SCAN_TTL_SECONDS = float(os.getenv("MODEL_SCAN_TTL_SECONDS", "5"))
+
+# Same blend as models/predict.py
+PROPHET_WEIGHT = 0.7
+FEATURE_WEIGHT = 0.3
+FEATURE_COLUMNS = ['day_of_week', 'month', 'year', 'is_weekend', 'sales_7d_avg', 'stock_to_sales_ratio']
+
+def data_watermark(row: dict) -> str:
+    """
+    Date of a product's latest sales row plus a digest of the features a
+    forecast reads from it, so a restated row changes the watermark too.
+    """
+    features = repr([row['sales_7d_avg'], row['stock_to_sales_ratio']]).encode()
+    return f"{row['date'].date().isoformat()}-{hashlib.sha1(features).hexdigest()[:8]}"
+
 class DemandPredictor:
-    def __init__(self, model_path: str, data_path: str):
-        self.model_path = model_path
-        self.data_path = data_path
+    """
+    Serves demand forecasts from the artifacts written by models/train.py.
+
+    Models are loaded per product on first use through a ModelRegistry, so
+    startup cost does not grow with the number of products. Products without
+    a feature model are forecast by Prophet alone.
+    """
+
+    def __init__(self, model_path: str = MODEL_PATH, data_path: str = DATA_PATH,
+                 max_model_bytes: int = MODEL_CACHE_MAX_BYTES):
+        self.model_path = Path(model_path)
+        self.data_path = Path(data_path)
+        self.registry = ModelRegistry(self.model_path, max_model_bytes, MODEL_SCAN_TTL_SECONDS)
+        self.latest_features = None  # product_id -> latest processed_sales row
+        self.watermarks = {}  # product_id -> date and feature digest of that row
+        self.data_stat = None  # (mtime_ns, size) of processed_sales.csv when it was read
+        self.latest_lock = threading.Lock()
         logger.info(f"Initialized DemandPredictor with model_path={model_path}, data_path={data_path}")
 
+    def load_latest_features(self) -> dict:
+        """
+        Last processed sales row per product. The file is re-read when its
+        modification time or size changes, so new sales data moves forecast
+        dates and watermarks without a restart.
+        """
+        sales_file = self.data_path / "processed_sales.csv"
+        with self.latest_lock:
+            try:
+                stat = sales_file.stat()
+                data_stat = (stat.st_mtime_ns, stat.st_size)
+            except FileNotFoundError:
+                data_stat = None
+            if self.latest_features is not None and data_stat == self.data_stat:
+                return self.latest_features
+
+            self.data_stat = data_stat
+            try:
+                data = pd.read_csv(sales_file, parse_dates=['date'])
+            except FileNotFoundError:
+                logger.warning(f"No processed sales in {self.data_path}; forecasting from today")
+                self.latest_features = {}
+                self.watermarks = {}
+                return self.latest_features
+
+            latest = data.sort_values('date').groupby('product_id').tail(1)
+            self.latest_features = {
+                row['product_id']: row for row in latest.to_dict('records')
+            }
+            self.watermarks = {
+                product_id: data_watermark(row)
+                for product_id, row in self.latest_features.items()
+            }
+            logger.info(f"Loaded latest sales features for {len(self.latest_features)} products")
+            return self.latest_features
+
+    def preload(self, max_products: int | None = None) -> int:
+        """
+        Load models ahead of the first request, stopping at ``max_products``
+        or once the registry's byte budget is full. Returns the number loaded.
+        """
+        self.load_latest_features()
+        loaded = 0
+        for product_id in self.registry.product_ids()[:max_products]:
+            if self.registry.resident_bytes >= self.registry.max_bytes:
+                break
+            self.registry.prophet_model(product_id)
+            self.registry.feature_model(product_id)
+            loaded += 1
+        logger.info(f"Preloaded models for {loaded} products")
+        return loaded
+
+    def data_watermark(self, product_id: str) -> str:
+        """Identifies the latest sales row the forecast starts from."""
+        self.load_latest_features()
+        return self.watermarks.get(product_id, "none")
+
+    def forecast_dates(self, product_id: str, days_ahead: int) -> pd.DatetimeIndex:
+        latest = self.load_latest_features().get(product_id)
+        last_date = latest['date'] if latest is not None else pd.Timestamp(datetime.now())
+        return pd.date_range(start=last_date.normalize() + timedelta(days=1), periods=days_ahead, freq='D')
+
+    def feature_frame(self, product_id: str, dates: pd.DatetimeIndex) -> pd.DataFrame | None:
+        latest = self.load_latest_features().get(product_id)
+        if latest is None:
+            return None
+        return pd.DataFrame({
+            'day_of_week': dates.dayofweek,
+            'month': dates.month,
+            'year': dates.year,
+            'is_weekend': (dates.dayofweek >= 5).astype(int),
+            'sales_7d_avg': latest['sales_7d_avg'],
+            'stock_to_sales_ratio': latest['stock_to_sales_ratio'],
+        }, columns=FEATURE_COLUMNS)
+
     def predict_demand(self, product_id: str, days_ahead: int = 30) -> pd.DataFrame:
         """
         Generate demand predictions for a product.
-        For now, returns dummy data to get the server running.
+
+        Raises ModelNotFoundError if the product has no trained Prophet model.
         """
-        # Create dummy predictions
-        dates = pd.date_range(start='2024-01-01', periods=days_ahead, freq='D')
-        predictions = pd.DataFrame({
+        prophet_model = self.registry.prophet_model(product_id)
+        dates = self.forecast_dates(product_id, days_ahead)
+        forecast = prophet_model.predict(pd.DataFrame({'ds': dates}))
+        prophet_prediction = forecast['yhat'].to_numpy()
+
+        combined = prophet_prediction
+        feature_model = self.registry.feature_model(product_id)
+        features = self.feature_frame(product_id, dates) if feature_model is not None else None
+        if features is not None:
+            feature_prediction = feature_model["model"].predict(feature_model["scaler"].transform(features))
+            combined = PROPHET_WEIGHT * prophet_prediction + FEATURE_WEIGHT * feature_prediction
+
+        return pd.DataFrame({
             'date': dates,
-            'combined_prediction': [10.0] * days_ahead,  # Dummy prediction
-            'prophet_lower': [8.0] * days_ahead,        # Dummy lower bound
-            'prophet_upper': [12.0] * days_ahead        # Dummy upper bound
+            'prophet_prediction': prophet_prediction,
+            'combined_prediction': combined,
+            'prophet_lower': forecast['yhat_lower'].to_numpy(),
+            'prophet_upper': forecast['yhat_upper'].to_numpy()
         })
-        return predictions 
\ No newline at end of file
+
+    def predict_demand_batch(self, product_ids: list[str], days_ahead: int = 30) -> dict:
+        """
+        Forecast several products in one call.
+
+        Returns {product_id: DataFrame or ModelNotFoundError}, so one product
+        without a model does not fail the rest of the batch.
+        """
+        forecasts = {}
+        for product_id in product_ids:
+            try:
+                forecasts[product_id] = self.predict_demand(product_id, days_ahead)
+            except ModelNotFoundError as e:
+                forecasts[product_id] = e
+        return forecasts
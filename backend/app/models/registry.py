@@ -0,0 +1,187 @@
+from collections import OrderedDict
+from pathlib import Path
+import hashlib
+import joblib
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+class ModelNotFoundError(LookupError):
+    def __init__(self, product_id: str):
+        super().__init__(f"No trained model for product {product_id}")
+        self.product_id = product_id
+
+    def __reduce__(self):
+        # Keep product_id intact when raised in an inference worker process
+        return (ModelNotFoundError, (self.product_id,))
+
+class ModelRegistry:
+    """
+    Loads per-product model artifacts on first use and keeps them in an LRU.
+
+    The LRU is bounded by the bytes of resident models rather than a count,
+    since artifact sizes vary a lot between products. An artifact's size on
+    disk is used as its resident size; that is cheap to get and close enough
+    for pickled models. The most recently used model is never evicted, even
+    if it alone exceeds the budget. A model whose file changed on disk since
+    it was loaded is reloaded.
+    """
+
+    def __init__(self, model_path: Path, max_bytes: int, scan_ttl: float = 5.0):
+        self.model_path = Path(model_path)
+        self.max_bytes = max_bytes
+        self.scan_ttl = scan_ttl
+        self.scan = None  # (expires_at, {file name: stat}, {product_id: version})
+        self.entries = OrderedDict()  # artifact file name -> (model, size in bytes, mtime_ns)
+        self.resident_bytes = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.load_seconds = 0.0
+        self.evictions = 0
+
+    def _lookup(self, name: str, mtime_ns: int):
+        with self.lock:
+            entry = self.entries.get(name)
+            if entry is None:
+                return None
+            if entry[2] != mtime_ns:
+                # Artifact was rewritten by a retrain; drop the stale model
+                del self.entries[name]
+                self.resident_bytes -= entry[1]
+                return None
+            self.hits += 1
+            self.entries.move_to_end(name)
+            return entry[0]
+
+    def _insert(self, name: str, model, size: int, mtime_ns: int):
+        with self.lock:
+            entry = self.entries.get(name)
+            if entry is not None and entry[2] == mtime_ns:
+                # Another thread loaded it meanwhile; keep the resident copy
+                self.entries.move_to_end(name)
+                return entry[0]
+            if entry is not None:
+                self.resident_bytes -= entry[1]
+            self.entries[name] = (model, size, mtime_ns)
+            self.entries.move_to_end(name)
+            self.resident_bytes += size
+            while self.resident_bytes > self.max_bytes and len(self.entries) > 1:
+                _, (_, evicted_size, _) = self.entries.popitem(last=False)
+                self.resident_bytes -= evicted_size
+                self.evictions += 1
+            return model
+
+    def load(self, name: str, required: bool = True):
+        """Return the artifact stored in ``name``, loading it on a miss or after it changed on disk."""
+        path = self.model_path / name
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            if required:
+                raise
+            return None
+
+        model = self._lookup(name, stat.st_mtime_ns)
+        if model is not None:
+            return model
+
+        started = time.perf_counter()
+        model = joblib.load(path)
+        elapsed = time.perf_counter() - started
+        with self.lock:
+            self.misses += 1
+            self.loads += 1
+            self.load_seconds += elapsed
+        logger.info(f"Loaded {name} in {elapsed * 1000:.0f} ms")
+        return self._insert(name, model, stat.st_size, stat.st_mtime_ns)
+
+    def prophet_model(self, product_id: str):
+        try:
+            return self.load(f"prophet_model_{product_id}.json")
+        except FileNotFoundError:
+            raise ModelNotFoundError(product_id)
+
+    def feature_model(self, product_id: str) -> dict | None:
+        """Return {"model", "scaler"} for a product, or None if it has no feature model."""
+        return self.load(f"feature_model_{product_id}.joblib", required=False)
+
+    @staticmethod
+    def _version(product_id: str, stats: dict) -> str:
+        parts = []
+        for name in (f"prophet_model_{product_id}.json", f"feature_model_{product_id}.joblib"):
+            stat = stats.get(name)
+            if stat is None:
+                if not parts:
+                    raise ModelNotFoundError(product_id)
+                continue
+            parts.append(f"{name}:{stat.st_size}:{stat.st_mtime_ns}")
+        return hashlib.sha1("|".join(parts).encode()).hexdigest()[:12]
+
+    def model_version(self, product_id: str) -> str:
+        """
+        Short fingerprint of a product's artifacts on disk.
+
+        Changes whenever models/train.py rewrites that product's models, so it
+        can key anything derived from them.
+        """
+        stats = {}
+        for name in (f"prophet_model_{product_id}.json", f"feature_model_{product_id}.joblib"):
+            try:
+                stats[name] = (self.model_path / name).stat()
+            except FileNotFoundError:
+                pass
+        return self._version(product_id, stats)
+
+    def model_versions(self, product_ids: list[str]) -> dict:
+        """
+        Model versions for many products from a scan of the model directory.
+
+        The scan is reused for ``scan_ttl`` seconds, so catalog-wide callers
+        see a retrain within that window rather than immediately. Products
+        without a trained model are left out.
+        """
+        with self.lock:
+            if self.scan is None or self.scan[0] <= time.monotonic():
+                stats = {entry.name: entry.stat() for entry in os.scandir(self.model_path) if entry.is_file()}
+                self.scan = (time.monotonic() + self.scan_ttl, stats, {})
+            _, stats, versions = self.scan
+
+        missing = [
+            product_id for product_id in product_ids
+            if product_id not in versions and f"prophet_model_{product_id}.json" in stats
+        ]
+        for product_id in missing:
+            versions[product_id] = self._version(product_id, stats)
+        return {product_id: versions[product_id] for product_id in product_ids if product_id in versions}
+
+    def has_model(self, product_id: str) -> bool:
+        return (self.model_path / f"prophet_model_{product_id}.json").exists()
+
+    def product_ids(self) -> list[str]:
+        """Products with a trained Prophet model, sorted."""
+        return sorted(path.stem[len("prophet_model_"):] for path in self.model_path.glob("prophet_model_*.json"))
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.resident_bytes = 0
+
+    def stats(self) -> dict:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "resident_models": len(self.entries),
+                "resident_bytes": self.resident_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "loads": self.loads,
+                "avg_load_ms": round(self.load_seconds / self.loads * 1000, 2) if self.loads else 0.0,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,26 @@
+"""Entry points run inside inference worker processes."""
+import logging
+import os
+from .predict import DemandPredictor
+
+logger = logging.getLogger(__name__)
+
+# One predictor per worker process, created by init_worker
+predictor = None
+
+def init_worker(model_path: str, data_path: str, max_model_bytes: int, preload_products: int):
+    global predictor
+    predictor = DemandPredictor(model_path=model_path, data_path=data_path, max_model_bytes=max_model_bytes)
+    if preload_products:
+        predictor.preload(preload_products)
+    logger.info(f"Inference worker {os.getpid()} ready")
+
+def warm_up() -> int:
+    """No-op task used to make the pool start its workers."""
+    return os.getpid()
+
+def predict_demand(product_id: str, days_ahead: int):
+    return predictor.predict_demand(product_id, days_ahead)
+
+def predict_demand_batch(product_ids: list[str], days_ahead: int) -> dict:
+    return predictor.predict_demand_batch(product_ids, days_ahead)
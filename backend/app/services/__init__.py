@@ -0,0 +1,13 @@
+from .stock import (
+    apply_stock_movement,
+    apply_stock_movements_batch,
+    InsufficientStockError,
+    ProductNotFoundError
+)
+
+__all__ = [
+    "apply_stock_movement",
+    "apply_stock_movements_batch",
+    "InsufficientStockError",
+    "ProductNotFoundError"
+]
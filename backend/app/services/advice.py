@@ -0,0 +1,42 @@
+import numpy as np
+
+# Days of extra demand kept on hand beyond the supplier lead time
+SAFETY_STOCK_DAYS = 5
+
+# Sorted most to least urgent
+URGENCY_LEVELS = np.array(["HIGH", "MEDIUM", "LOW"])
+
+def compute_advice(current_stock: np.ndarray, lead_time_days: np.ndarray, demand: np.ndarray) -> dict:
+    """
+    Reorder advice for many products at once.
+
+    ``demand`` is a (products x days) matrix of forecast daily demand. Stock
+    covering less than the lead time is HIGH urgency, less than lead time plus
+    safety stock MEDIUM, anything else LOW. Returns a dict of per-product
+    arrays; ``urgency_rank`` indexes URGENCY_LEVELS.
+    """
+    current_stock = np.asarray(current_stock, dtype=float)
+    lead_time_days = np.asarray(lead_time_days, dtype=float)
+    daily_demand = demand.mean(axis=1)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        days_of_stock = np.where(daily_demand > 0, current_stock / daily_demand, np.inf)
+
+    reorder_point = np.trunc(daily_demand * (lead_time_days + SAFETY_STOCK_DAYS)).astype(int)
+    order_quantity = np.maximum(0, reorder_point - current_stock.astype(int))
+    urgency_rank = np.select(
+        [days_of_stock < lead_time_days, days_of_stock < lead_time_days + SAFETY_STOCK_DAYS],
+        [0, 1],
+        default=2
+    )
+
+    return {
+        "daily_demand": daily_demand,
+        "days_of_stock": days_of_stock,
+        "reorder_point": reorder_point,
+        "order_quantity": order_quantity,
+        "urgency_rank": urgency_rank,
+    }
+
+def advice_message(order_quantity: int) -> str:
+    return f"Order {order_quantity} units" if order_quantity > 0 else "No immediate order needed"
@@ -0,0 +1,289 @@
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from collections import OrderedDict
+from dotenv import load_dotenv
+import json
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+CACHE_TTL_SECONDS = int(os.getenv("CACHE_TTL_SECONDS", "60"))
+CACHE_LOCAL_MAX_ENTRIES = int(os.getenv("CACHE_LOCAL_MAX_ENTRIES", "2048"))
+CACHE_REDIS_RETRY_SECONDS = int(os.getenv("CACHE_REDIS_RETRY_SECONDS", "30"))
+
+# Tag shared by every cached listing of products (product list, inventory status)
+PRODUCT_LISTS_TAG = "product-lists"
+# Largest offset accepted by cached listings, which bounds their cache keys
+MAX_LIST_OFFSET = int(os.getenv("CACHE_MAX_LIST_OFFSET", "100000"))
+
+class LocalLRUCache:
+    """In-process LRU with per-entry TTL, used when Redis is unavailable."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # key -> (expires_at, value, tags)
+        self.tags = {}  # tag -> set of keys
+
+    def _discard(self, key: str):
+        """Drop key and its tag memberships, so tag sets only hold live keys."""
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self.tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.tags[tag]
+
+    def get(self, key: str):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value, _ = entry
+        if expires_at < time.monotonic():
+            self._discard(key)
+            return None
+        self.entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: str, ttl: int, tags=()):
+        self._discard(key)
+        self.entries[key] = (time.monotonic() + ttl, value, tuple(tags))
+        for tag in tags:
+            self.tags.setdefault(tag, set()).add(key)
+        while len(self.entries) > self.max_entries:
+            self._discard(next(iter(self.entries)))
+
+    def invalidate(self, keys=(), tags=()):
+        keys = set(keys)
+        for tag in tags:
+            keys |= self.tags.get(tag, set())
+        for key in keys:
+            self._discard(key)
+
+class ReadCache:
+    """
+    Read-through JSON cache backed by Redis with an in-process LRU fallback.
+
+    Values are stored as JSON under ``namespace:key``. Every key and tag has a
+    generation counter that ``invalidate`` increments; ``get_or_load`` stores
+    a value together with the generations it read before loading it and only
+    serves it while they are current. A load that races an invalidation thus
+    stores a value no reader accepts, and tagging a group of keys (e.g. every
+    product listing) lets them be invalidated at once.
+
+    If Redis errors, the cache switches to the local LRU and retries Redis
+    after ``retry_seconds``. Invalidations made in the meantime are queued and
+    applied to Redis before it is read again.
+    """
+
+    def __init__(
+        self,
+        redis_url: str = REDIS_URL,
+        namespace: str = "inventory-cache",
+        default_ttl: int = CACHE_TTL_SECONDS,
+        max_local_entries: int = CACHE_LOCAL_MAX_ENTRIES,
+        retry_seconds: int = CACHE_REDIS_RETRY_SECONDS
+    ):
+        self.namespace = namespace
+        self.default_ttl = default_ttl
+        self.retry_seconds = retry_seconds
+        self.redis = Redis.from_url(
+            redis_url,
+            decode_responses=True,
+            socket_connect_timeout=0.5,
+            socket_timeout=0.5
+        ) if redis_url else None
+        self.local = LocalLRUCache(max_local_entries)
+        self.generations = {}  # key or tag -> generation, for the local LRU
+        self.pending_invalidations = set()  # keys and tags not yet invalidated in Redis
+        self.redis_down_until = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.redis_errors = 0
+
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    def _generation_key(self, scope: str) -> str:
+        return f"{self.namespace}:gen:{scope}"
+
+    def _redis_available(self) -> bool:
+        return self.redis is not None and time.monotonic() >= self.redis_down_until
+
+    def _redis_failed(self, e: Exception):
+        self.redis_errors += 1
+        if time.monotonic() >= self.redis_down_until:
+            logger.warning(f"Redis unavailable, using in-process cache for {self.retry_seconds}s: {e}")
+        self.redis_down_until = time.monotonic() + self.retry_seconds
+
+    async def _use_redis(self) -> bool:
+        """Whether to use Redis now; first applies invalidations queued while it was down."""
+        if not self._redis_available():
+            return False
+        if self.pending_invalidations:
+            scopes = list(self.pending_invalidations)
+            try:
+                async with self.redis.pipeline(transaction=False) as pipe:
+                    for scope in scopes:
+                        pipe.incr(self._generation_key(scope))
+                    pipe.delete(*[self._key(scope) for scope in scopes])
+                    await pipe.execute()
+            except RedisError as e:
+                self._redis_failed(e)
+                return False
+            self.pending_invalidations.difference_update(scopes)
+        return True
+
+    async def _lookup(self, key: str, scopes: list[str]):
+        """(source, raw entry or None, generations of scopes), from Redis in one round trip if possible."""
+        if await self._use_redis():
+            try:
+                raws = await self.redis.mget(
+                    [self._key(key)] + [self._generation_key(scope) for scope in scopes]
+                )
+                return "redis", raws[0], [int(generation or 0) for generation in raws[1:]]
+            except RedisError as e:
+                self._redis_failed(e)
+        return "local", self.local.get(key), [self.generations.get(scope, 0) for scope in scopes]
+
+    async def get_or_load(self, key: str, load, ttl: int | None = None, tags=()):
+        """
+        Return the cached value for key, or await ``load()`` and cache its
+        JSON-serializable result under key and tags. Exceptions from load are
+        not cached.
+        """
+        scopes = [key, *tags]
+        source, raw, generations = await self._lookup(key, scopes)
+        if raw is not None:
+            entry = json.loads(raw)
+            if entry["g"] == generations:
+                self.hits += 1
+                return entry["v"]
+        self.misses += 1
+
+        value = await load()
+        raw = json.dumps({"g": generations, "v": value})
+        ttl = ttl or self.default_ttl
+        # Write where the generations came from; they mean nothing in the other store
+        if source == "redis":
+            try:
+                await self.redis.set(self._key(key), raw, ex=ttl)
+            except RedisError as e:
+                self._redis_failed(e)
+        else:
+            self.local.set(key, raw, ttl, tags)
+        return value
+
+    async def get(self, key: str):
+        """
+        Return the value stored by ``set`` for key, or None on a miss.
+
+        ``get``/``set`` and their batch forms skip the generation check and
+        are meant for keys that already identify their content (e.g. a
+        forecast keyed by model version); use ``get_or_load`` for values that
+        are invalidated.
+        """
+        raw = None
+        if await self._use_redis():
+            try:
+                raw = await self.redis.get(self._key(key))
+            except RedisError as e:
+                self._redis_failed(e)
+                raw = self.local.get(key)
+        else:
+            raw = self.local.get(key)
+
+        if raw is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(raw)
+
+    async def get_many(self, keys: list[str]) -> dict:
+        """Return {key: value} for the keys that are cached, in one round trip."""
+        if not keys:
+            return {}
+        raws = None
+        if await self._use_redis():
+            try:
+                raws = await self.redis.mget([self._key(key) for key in keys])
+            except RedisError as e:
+                self._redis_failed(e)
+        if raws is None:
+            raws = [self.local.get(key) for key in keys]
+
+        found = {key: json.loads(raw) for key, raw in zip(keys, raws) if raw is not None}
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    async def set(self, key: str, value, ttl: int | None = None):
+        """Store a JSON-serializable value under key."""
+        ttl = ttl or self.default_ttl
+        raw = json.dumps(value)
+        if await self._use_redis():
+            try:
+                await self.redis.set(self._key(key), raw, ex=ttl)
+                return
+            except RedisError as e:
+                self._redis_failed(e)
+        self.local.set(key, raw, ttl)
+
+    async def set_many(self, values: dict, ttl: int | None = None):
+        """Store several JSON-serializable values in one round trip."""
+        if not values:
+            return
+        ttl = ttl or self.default_ttl
+        raws = {key: json.dumps(value) for key, value in values.items()}
+        if await self._use_redis():
+            try:
+                async with self.redis.pipeline(transaction=False) as pipe:
+                    for key, raw in raws.items():
+                        pipe.set(self._key(key), raw, ex=ttl)
+                    await pipe.execute()
+                return
+            except RedisError as e:
+                self._redis_failed(e)
+        for key, raw in raws.items():
+            self.local.set(key, raw, ttl)
+
+    async def invalidate(self, keys=(), tags=()):
+        """Invalidate the given keys and every key loaded with one of the given tags."""
+        scopes = [*keys, *tags]
+        for scope in scopes:
+            self.generations[scope] = self.generations.get(scope, 0) + 1
+        self.local.invalidate(keys, tags)
+        if self.redis is not None:
+            # Applied now if Redis is up, otherwise as soon as it is used again
+            self.pending_invalidations.update(scopes)
+            await self._use_redis()
+
+    async def invalidate_product(self, product_id: str):
+        """Invalidate everything derived from a product row."""
+        await self.invalidate(keys=[f"product:{product_id}"], tags=[PRODUCT_LISTS_TAG])
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": "redis" if self._redis_available() else "local",
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "redis_errors": self.redis_errors,
+            "local_entries": len(self.local.entries),
+            "pending_invalidations": len(self.pending_invalidations),
+        }
+
+    async def close(self):
+        if self.redis is not None:
+            await self.redis.aclose()
+
+read_cache = ReadCache()
@@ -0,0 +1,152 @@
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from dotenv import load_dotenv
+import asyncio
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+# "local" fans out within this process only; "redis" relays through pub/sub so
+# every API worker sees every stock change
+STOCK_EVENTS_BACKEND = os.getenv("STOCK_EVENTS_BACKEND", "local")
+STOCK_EVENTS_CHANNEL = os.getenv("STOCK_EVENTS_CHANNEL", "inventory:stock-events")
+STOCK_EVENTS_QUEUE_SIZE = int(os.getenv("STOCK_EVENTS_QUEUE_SIZE", "256"))
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+def stock_event(db_transaction) -> dict:
+    """Compact event describing a committed inventory transaction."""
+    return {
+        "id": db_transaction.id,
+        "product_id": db_transaction.product_id,
+        "type": db_transaction.transaction_type.value,
+        "quantity": db_transaction.quantity,
+        "new_stock": db_transaction.new_stock,
+        "at": db_transaction.created_at.isoformat(),
+    }
+
+class Subscription:
+    """A single client's bounded event queue."""
+
+    def __init__(self, max_size: int):
+        self.queue = asyncio.Queue(maxsize=max_size)
+        self.dropped = False
+        self.wakeup = asyncio.Event()
+
+    def offer(self, payload: str) -> bool:
+        try:
+            self.queue.put_nowait(payload)
+            self.wakeup.set()
+            return True
+        except asyncio.QueueFull:
+            # Slow consumer: drop it instead of buffering without bound
+            self.dropped = True
+            self.wakeup.set()
+            return False
+
+    async def next(self, timeout: float) -> str | None:
+        """Return the next payload, or None on timeout or once dropped."""
+        if self.queue.empty() and not self.dropped:
+            self.wakeup.clear()
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+        if self.dropped:
+            return None
+        return self.queue.get_nowait()
+
+class StockEventBroker:
+    """
+    Fans stock change events out to connected stream clients.
+
+    Each subscriber gets a bounded queue; a subscriber whose queue is full when
+    an event arrives is dropped and must reconnect. With the redis backend,
+    events are published to a channel and a listener task delivers them to
+    this process's subscribers, so all workers share one stream.
+    """
+
+    def __init__(self, backend: str = STOCK_EVENTS_BACKEND, queue_size: int = STOCK_EVENTS_QUEUE_SIZE):
+        self.backend = backend
+        self.queue_size = queue_size
+        self.subscribers = set()
+        self.redis = Redis.from_url(REDIS_URL, decode_responses=True) if backend == "redis" else None
+        self.listener = None
+        self.published = 0
+        self.dropped = 0
+
+    def subscribe(self) -> Subscription:
+        subscription = Subscription(self.queue_size)
+        self.subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self.subscribers.discard(subscription)
+
+    def _deliver(self, payload: str):
+        for subscription in list(self.subscribers):
+            if not subscription.offer(payload):
+                self.dropped += 1
+                self.subscribers.discard(subscription)
+                logger.warning("Dropped slow stock stream subscriber")
+
+    async def publish(self, events: list[dict]):
+        """Publish committed stock events. Never raises into the caller."""
+        if not events:
+            return
+        self.published += len(events)
+        payloads = [json.dumps(event, separators=(",", ":")) for event in events]
+        if self.redis is not None:
+            try:
+                async with self.redis.pipeline(transaction=False) as pipe:
+                    for payload in payloads:
+                        pipe.publish(STOCK_EVENTS_CHANNEL, payload)
+                    await pipe.execute()
+                return
+            except RedisError as e:
+                logger.warning(f"Redis publish failed, delivering stock events locally: {e}")
+        for payload in payloads:
+            self._deliver(payload)
+
+    async def _listen(self):
+        while True:
+            try:
+                async with self.redis.pubsub() as pubsub:
+                    await pubsub.subscribe(STOCK_EVENTS_CHANNEL)
+                    async for message in pubsub.listen():
+                        if message["type"] == "message":
+                            self._deliver(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except RedisError as e:
+                logger.warning(f"Stock event listener lost Redis connection, retrying: {e}")
+                await asyncio.sleep(5)
+
+    async def start(self):
+        if self.redis is not None and self.listener is None:
+            self.listener = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self.listener is not None:
+            self.listener.cancel()
+            try:
+                await self.listener
+            except asyncio.CancelledError:
+                pass
+            self.listener = None
+        if self.redis is not None:
+            await self.redis.aclose()
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.backend,
+            "subscribers": len(self.subscribers),
+            "published": self.published,
+            "dropped_subscribers": self.dropped,
+        }
+
+stock_events = StockEventBroker()
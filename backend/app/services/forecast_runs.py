@@ -0,0 +1,143 @@
+from sqlalchemy import select, update, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database.models import ForecastRun, DemandForecast
+from dotenv import load_dotenv
+from datetime import datetime, timedelta
+import pandas as pd
+import csv
+import io
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+# A current run completed longer ago than this is ignored, so readers fall back
+# to inference if the materialization job stops running
+FORECAST_RUN_MAX_AGE_HOURS = float(os.getenv("FORECAST_RUN_MAX_AGE_HOURS", "48"))
+
+COPY_COLUMNS = [
+    "run_id", "product_id", "forecast_date", "predicted_demand",
+    "prophet_prediction", "lower_bound", "upper_bound"
+]
+
+def fresh_run():
+    """Filter for the current run, unless it is older than FORECAST_RUN_MAX_AGE_HOURS."""
+    cutoff = datetime.utcnow() - timedelta(hours=FORECAST_RUN_MAX_AGE_HOURS)
+    return (ForecastRun.is_current, ForecastRun.completed_at >= cutoff)
+
+# Materialization job (sync engine)
+
+def start_run(conn, days_ahead: int) -> int:
+    return conn.execute(
+        ForecastRun.__table__.insert().values(status="running", is_current=False, days_ahead=days_ahead, products=0)
+        .returning(ForecastRun.id)
+    ).scalar_one()
+
+def copy_forecasts(raw_connection, run_id: int, forecasts: dict) -> int:
+    """
+    Bulk-load {product_id: forecast DataFrame} into demand_forecasts with COPY.
+
+    ``raw_connection`` is a psycopg2 connection; the caller commits. Returns
+    the number of rows written.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    rows = 0
+    for product_id, forecast in forecasts.items():
+        for date, combined, prophet, lower, upper in zip(
+            forecast["date"], forecast["combined_prediction"], forecast["prophet_prediction"],
+            forecast["prophet_lower"], forecast["prophet_upper"]
+        ):
+            writer.writerow((run_id, product_id, date.date().isoformat(), combined, prophet, lower, upper))
+            rows += 1
+    buffer.seek(0)
+    with raw_connection.cursor() as cursor:
+        cursor.copy_expert(
+            f"COPY {DemandForecast.__tablename__} ({', '.join(COPY_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+            buffer
+        )
+    return rows
+
+def publish_run(conn, run_id: int, products: int):
+    """Make a fully loaded run the current one, atomically replacing the previous run."""
+    conn.execute(update(ForecastRun).where(ForecastRun.is_current).values(is_current=False))
+    conn.execute(
+        update(ForecastRun).where(ForecastRun.id == run_id)
+        .values(is_current=True, status="complete", products=products, completed_at=datetime.utcnow())
+    )
+
+def fail_run(conn, run_id: int):
+    conn.execute(delete(DemandForecast).where(DemandForecast.run_id == run_id))
+    conn.execute(update(ForecastRun).where(ForecastRun.id == run_id).values(status="failed", completed_at=datetime.utcnow()))
+
+def retire_runs(conn, keep: int) -> list:
+    """Delete every run except the ``keep`` most recent complete ones (the current run is always kept)."""
+    kept = conn.execute(
+        select(ForecastRun.id).where(ForecastRun.status == "complete")
+        .order_by(ForecastRun.is_current.desc(), ForecastRun.id.desc()).limit(max(keep, 1))
+    ).scalars().all()
+    retired = conn.execute(
+        select(ForecastRun.id).where(ForecastRun.id.notin_(kept), ForecastRun.status != "running")
+    ).scalars().all()
+    if retired:
+        conn.execute(delete(DemandForecast).where(DemandForecast.run_id.in_(retired)))
+        conn.execute(delete(ForecastRun).where(ForecastRun.id.in_(retired)))
+    return retired
+
+# Reads (API)
+
+async def current_run(db: AsyncSession):
+    """(id, days_ahead) of the current run, or None if there is none or it is too old."""
+    return (await (await db.connection()).execute(
+        select(ForecastRun.id, ForecastRun.days_ahead).where(*fresh_run())
+    )).first()
+
+async def run_product_ids(db: AsyncSession, run_id: int) -> list:
+    """Products with forecasts in a run."""
+    return (await (await db.connection()).execute(
+        select(DemandForecast.product_id).where(DemandForecast.run_id == run_id).distinct()
+    )).scalars().all()
+
+def materialized_query(product_ids: list[str], days_ahead: int):
+    """Rows of the current run from today on for product_ids, in product and date order."""
+    current_run_id = select(ForecastRun.id).where(*fresh_run()).scalar_subquery()
+    query = (
+        select(
+            DemandForecast.product_id, DemandForecast.forecast_date, DemandForecast.predicted_demand,
+            DemandForecast.prophet_prediction, DemandForecast.lower_bound, DemandForecast.upper_bound
+        )
+        .where(
+            DemandForecast.run_id == current_run_id,
+            DemandForecast.product_id.in_(product_ids),
+            DemandForecast.forecast_date >= datetime.now().date()
+        )
+        .order_by(DemandForecast.product_id, DemandForecast.forecast_date)
+    )
+    if len(product_ids) == 1:
+        query = query.limit(days_ahead)
+    return query
+
+async def materialized_forecasts(db: AsyncSession, product_ids: list[str], days_ahead: int) -> dict:
+    """
+    Forecasts from the current run, starting today, for the products it
+    covers for at least ``days_ahead`` more days, as {product_id: DataFrame}.
+    Past days are skipped, so a run that has aged out of the horizon is
+    treated as missing.
+    """
+    query = materialized_query(product_ids, days_ahead)
+    rows = (await (await db.connection()).execute(query)).all()
+    if not rows:
+        return {}
+
+    frame = pd.DataFrame(rows, columns=[
+        "product_id", "date", "combined_prediction", "prophet_prediction", "prophet_lower", "prophet_upper"
+    ])
+    frame["date"] = pd.to_datetime(frame["date"])
+    forecasts = {}
+    for product_id, forecast in frame.groupby("product_id", sort=False):
+        if len(forecast) >= days_ahead:
+            forecasts[product_id] = forecast.drop(columns="product_id").head(days_ahead).reset_index(drop=True)
+    return forecasts
@@ -0,0 +1,214 @@
+from dotenv import load_dotenv
+from app.models import DemandPredictor, ModelNotFoundError
+from app.services.cache import ReadCache
+from app.services.inference import inference_pool
+from app.services.singleflight import SingleFlight
+from app.services.forecast_runs import materialized_forecasts, current_run, run_product_ids
+from sqlalchemy.ext.asyncio import AsyncSession
+from collections import OrderedDict
+from datetime import date
+import numpy as np
+import pandas as pd
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+# Entries are keyed by model version and data watermark, so they never go
+# stale; the TTL only bounds how long unused forecasts take up space
+FORECAST_CACHE_TTL_SECONDS = int(os.getenv("FORECAST_CACHE_TTL_SECONDS", "86400"))
+
+# Products whose daily demand row is kept in process for catalog-wide requests
+DEMAND_ROWS_MAX_PRODUCTS = int(os.getenv("DEMAND_ROWS_MAX_PRODUCTS", "50000"))
+
+FORECAST_COLUMNS = ["prophet_prediction", "combined_prediction", "prophet_lower", "prophet_upper"]
+
+# Used here for model versions and data watermarks only; inference runs in the
+# inference pool, which loads the models
+predictor = DemandPredictor()
+
+forecast_cache = ReadCache(namespace="forecast-cache", default_ttl=FORECAST_CACHE_TTL_SECONDS)
+
+forecast_flights = SingleFlight()
+
+# Forecasts served from the materialized table vs computed on demand
+store_stats = {"materialized": 0, "on_demand": 0}
+
+def forecast_key(product_id: str, model_version: str, data_watermark: str) -> str:
+    return f"forecast:{product_id}:{model_version}:{data_watermark}"
+
+def forecast_to_columns(forecast: pd.DataFrame) -> dict:
+    columns = {"date": [date.isoformat() for date in forecast["date"]]}
+    for column in FORECAST_COLUMNS:
+        columns[column] = forecast[column].astype(float).tolist()
+    return columns
+
+def forecast_from_columns(columns: dict, days_ahead: int) -> pd.DataFrame:
+    forecast = pd.DataFrame({column: columns[column][:days_ahead] for column in ["date", *FORECAST_COLUMNS]})
+    forecast["date"] = pd.to_datetime(forecast["date"])
+    return forecast
+
+async def get_forecast(product_id: str, days_ahead: int, db: AsyncSession | None = None) -> pd.DataFrame:
+    """
+    Demand forecast for a product.
+
+    With a database session, the current materialized forecast run is read
+    first; inference is the fallback for products missing from that run (or
+    covered for fewer days). On-demand forecasts are served from the forecast
+    cache when possible. One entry is kept per (product, model version, data watermark) holding the
+    longest horizon computed so far; shorter horizons are slices of it, since
+    a forecast's first n days do not depend on the horizon. A retrain changes
+    the product's model version, so only the retrained products miss.
+    Raises ModelNotFoundError if the product has no trained model.
+    """
+    if db is not None:
+        materialized = await materialized_forecasts(db, [product_id], days_ahead)
+        if product_id in materialized:
+            store_stats["materialized"] += 1
+            return materialized[product_id]
+    store_stats["on_demand"] += 1
+
+    model_version = predictor.registry.model_version(product_id)
+    key = forecast_key(product_id, model_version, predictor.data_watermark(product_id))
+
+    cached = await forecast_cache.get(key)
+    if cached is not None and cached["days_ahead"] >= days_ahead:
+        return forecast_from_columns(cached, days_ahead)
+
+    # Concurrent misses for the same forecast share one model call
+    return await forecast_flights.do((key, days_ahead), compute_forecast, product_id, key, days_ahead)
+
+async def compute_forecast(product_id: str, key: str, days_ahead: int) -> pd.DataFrame:
+    forecast = await inference_pool.predict_demand(product_id, days_ahead)
+    await forecast_cache.set(key, {"days_ahead": days_ahead, **forecast_to_columns(forecast)})
+    return forecast
+
+def forecast_keys(product_ids: list[str]) -> dict:
+    """{product_id: cache key} for the products that have a trained model."""
+    predictor.load_latest_features()
+    watermarks = predictor.watermarks
+    return {
+        product_id: forecast_key(product_id, model_version, watermarks.get(product_id, "none"))
+        for product_id, model_version in predictor.registry.model_versions(product_ids).items()
+    }
+
+async def forecasts_for_keys(keys: dict, days_ahead: int) -> dict:
+    """Cached or freshly computed forecasts for {product_id: cache key}."""
+    cached = await forecast_cache.get_many(list(keys.values()))
+    results = {}
+    missing = []
+    for product_id, key in keys.items():
+        entry = cached.get(key)
+        if entry is not None and entry["days_ahead"] >= days_ahead:
+            results[product_id] = forecast_from_columns(entry, days_ahead)
+        else:
+            missing.append(product_id)
+
+    if missing:
+        computed = await inference_pool.predict_demand_batch(missing, days_ahead)
+        results.update(computed)
+        await forecast_cache.set_many({
+            keys[product_id]: {"days_ahead": days_ahead, **forecast_to_columns(forecast)}
+            for product_id, forecast in computed.items()
+            if isinstance(forecast, pd.DataFrame)
+        })
+    return results
+
+async def get_forecasts(product_ids: list[str], days_ahead: int, db: AsyncSession | None = None) -> dict:
+    """
+    Forecasts for several products with one query, one cache round trip and
+    one predictor call for the rest.
+
+    Returns {product_id: DataFrame or ModelNotFoundError} in the order given.
+    """
+    results = await materialized_forecasts(db, product_ids, days_ahead) if db is not None else {}
+    remaining = [product_id for product_id in product_ids if product_id not in results]
+    store_stats["materialized"] += len(results)
+    store_stats["on_demand"] += len(remaining)
+    if remaining:
+        results.update(await forecasts_for_keys(forecast_keys(remaining), days_ahead))
+    return {
+        product_id: results[product_id] if product_id in results else ModelNotFoundError(product_id)
+        for product_id in product_ids
+    }
+
+# product_id -> (forecast cache key or materialized run key, combined daily
+# demand), least recently used first; rows are reused across catalog-wide
+# requests until the product's key changes
+demand_rows = OrderedDict()
+
+# Products covered by the current materialized run, read once per run
+run_coverage = {"run_key": None, "product_ids": frozenset()}
+
+async def materialized_keys(db: AsyncSession, product_ids: list[str], days_ahead: int) -> dict:
+    """
+    {product_id: run key} for the products the current run covers, with
+    their demand rows loaded from demand_forecasts if not held already.
+    """
+    run = await current_run(db)
+    if run is None or run.days_ahead < days_ahead:
+        return {}
+    # Rows start today, so a day's rows are not reused the next day
+    run_key = f"run:{run.id}:{date.today().isoformat()}"
+    if run_coverage["run_key"] != run_key:
+        run_coverage.update(run_key=run_key, product_ids=frozenset(await run_product_ids(db, run.id)))
+
+    covered = [product_id for product_id in product_ids if product_id in run_coverage["product_ids"]]
+    stale = [
+        product_id for product_id in covered
+        if (row := demand_rows.get(product_id)) is None or row[0] != run_key or len(row[1]) < days_ahead
+    ]
+    if stale:
+        for product_id, forecast in (await materialized_forecasts(db, stale, days_ahead)).items():
+            demand_rows[product_id] = (run_key, forecast["combined_prediction"].to_numpy(dtype=float))
+    # Products whose rows ran out before days_ahead are left to inference
+    return {
+        product_id: run_key for product_id in covered
+        if (row := demand_rows.get(product_id)) is not None and row[0] == run_key and len(row[1]) >= days_ahead
+    }
+
+async def get_demand_matrix(
+    product_ids: list[str], days_ahead: int, db: AsyncSession | None = None
+) -> tuple[list[str], np.ndarray]:
+    """
+    Daily demand forecasts for many products as one (products x days) matrix.
+
+    With a database session, products in the current materialized run are
+    read from it, as get_forecasts does; the rest come from the forecast
+    cache or inference. Rows are kept in process keyed by run or forecast
+    cache key, so once a catalog has been forecast, rebuilding the matrix
+    costs a directory scan and a stack of arrays rather than a read per
+    product. Returns the products that have a forecast, in the order given,
+    and their matrix.
+    """
+    keys = await materialized_keys(db, product_ids, days_ahead) if db is not None else {}
+    remaining = [product_id for product_id in product_ids if product_id not in keys]
+    store_stats["materialized"] += len(keys)
+    store_stats["on_demand"] += len(remaining)
+
+    cache_keys = forecast_keys(remaining)
+    keys.update(cache_keys)
+    stale = {
+        product_id: key for product_id, key in cache_keys.items()
+        if (row := demand_rows.get(product_id)) is None or row[0] != key or len(row[1]) < days_ahead
+    }
+    if stale:
+        for product_id, forecast in (await forecasts_for_keys(stale, days_ahead)).items():
+            if isinstance(forecast, pd.DataFrame):
+                demand_rows[product_id] = (stale[product_id], forecast["combined_prediction"].to_numpy(dtype=float))
+
+    available = [
+        product_id for product_id in product_ids
+        if product_id in keys and demand_rows.get(product_id, (None,))[0] == keys[product_id]
+    ]
+    if not available:
+        return [], np.empty((0, days_ahead))
+    matrix = np.vstack([demand_rows[product_id][1][:days_ahead] for product_id in available])
+    for product_id in available:
+        demand_rows.move_to_end(product_id)
+    while len(demand_rows) > DEMAND_ROWS_MAX_PRODUCTS:
+        demand_rows.popitem(last=False)
+    return available, matrix
@@ -0,0 +1,91 @@
+from sqlalchemy import select, update, delete
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database.models import IdempotencyKey
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+import hashlib
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+IDEMPOTENCY_TTL_HOURS = int(os.getenv("IDEMPOTENCY_TTL_HOURS", "24"))
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+
+class IdempotencyKeyReuseError(Exception):
+    def __init__(self, key: str):
+        super().__init__(f"Idempotency-Key {key!r} was already used for a different request")
+        self.key = key
+
+def request_fingerprint(endpoint: str, payload) -> str:
+    """Stable hash of an endpoint and its JSON-serializable request body."""
+    body = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(f"{endpoint}\n{body}".encode()).hexdigest()
+
+async def claim_idempotency_key(
+    db: AsyncSession,
+    key: str,
+    endpoint: str,
+    request_hash: str
+) -> tuple[int, object] | None:
+    """
+    Claim a key inside the caller's transaction, or return the stored response.
+
+    Returns None when the caller should go ahead and execute the request; the
+    claim commits or rolls back together with the caller's work, so a failed
+    request leaves nothing behind and may be retried. Returns
+    (status_code, body) when the key already completed. A concurrent request
+    with the same key blocks on the key's unique index until the first one
+    commits, then gets the stored response. Raises IdempotencyKeyReuseError if
+    the key was used for a different request.
+    """
+    now = datetime.utcnow()
+    expires_at = now + timedelta(hours=IDEMPOTENCY_TTL_HOURS)
+    claimed = await db.execute(
+        pg_insert(IdempotencyKey)
+        .values(key=key, endpoint=endpoint, request_hash=request_hash, created_at=now, expires_at=expires_at)
+        .on_conflict_do_nothing(index_elements=["key"])
+        .returning(IdempotencyKey.key)
+    )
+    if claimed.first() is not None:
+        return None
+
+    existing = (await db.execute(
+        select(IdempotencyKey).where(IdempotencyKey.key == key).with_for_update()
+    )).scalar_one()
+    if existing.expires_at <= now:
+        # Expired but not yet purged: take the key over for this request
+        await db.execute(
+            update(IdempotencyKey)
+            .where(IdempotencyKey.key == key)
+            .values(
+                endpoint=endpoint, request_hash=request_hash, response_status=None,
+                response_body=None, created_at=now, expires_at=expires_at
+            )
+            .execution_options(synchronize_session=False)
+        )
+        return None
+    if existing.endpoint != endpoint or existing.request_hash != request_hash:
+        raise IdempotencyKeyReuseError(key)
+    return existing.response_status, existing.response_body
+
+async def store_idempotent_response(db: AsyncSession, key: str, status_code: int, body) -> None:
+    """Record the response for a claimed key; committed with the caller's work."""
+    await db.execute(
+        update(IdempotencyKey)
+        .where(IdempotencyKey.key == key)
+        .values(response_status=status_code, response_body=body)
+        .execution_options(synchronize_session=False)
+    )
+
+async def purge_expired_keys(db: AsyncSession) -> int:
+    result = await db.execute(
+        delete(IdempotencyKey).where(IdempotencyKey.expires_at <= datetime.utcnow())
+    )
+    await db.commit()
+    return result.rowcount
@@ -0,0 +1,207 @@
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from fastapi.concurrency import run_in_threadpool
+from dotenv import load_dotenv
+from app.models import worker
+from app.models.predict import MODEL_PATH, DATA_PATH, MODEL_CACHE_MAX_BYTES
+import asyncio
+import logging
+import math
+import multiprocessing
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+# 0 runs inference in the API process's threadpool instead of worker processes
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Tasks allowed to wait for a free worker before new work is rejected
+INFERENCE_QUEUE_SIZE = int(os.getenv("INFERENCE_QUEUE_SIZE", "32"))
+# Products whose models each worker loads before taking requests
+INFERENCE_PRELOAD_PRODUCTS = int(os.getenv("INFERENCE_PRELOAD_PRODUCTS", "1000"))
+INFERENCE_RETRY_AFTER_SECONDS = 1
+
+class InferenceBusyError(Exception):
+    """Raised instead of queueing when every worker is busy and the queue is full."""
+
+class InferencePool:
+    """
+    Runs forecast inference in a bounded pool of worker processes.
+
+    Each worker builds its own DemandPredictor and preloads models when it
+    starts, so requests do not pay model load time. At most ``workers +
+    queue_size`` tasks are admitted; beyond that ``submit`` raises
+    InferenceBusyError immediately so the API can shed load instead of
+    letting latency grow. With ``workers=0`` tasks run in the threadpool of
+    the API process, still subject to the same admission limit. If ``start``
+    was never called, the workers are started by the first task.
+    """
+
+    def __init__(
+        self,
+        workers: int = INFERENCE_WORKERS,
+        queue_size: int = INFERENCE_QUEUE_SIZE,
+        preload_products: int = INFERENCE_PRELOAD_PRODUCTS
+    ):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.preload_products = preload_products
+        self.executor = None
+        self.in_flight = 0
+        self.busy_seconds = 0.0  # integral of busy workers over time
+        self.started_at = time.monotonic()
+        self.last_change = self.started_at
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    @property
+    def capacity(self) -> int:
+        return max(self.workers, 1) + self.queue_size
+
+    def _set_in_flight(self, in_flight: int):
+        now = time.monotonic()
+        self.busy_seconds += min(self.in_flight, max(self.workers, 1)) * (now - self.last_change)
+        self.last_change = now
+        self.in_flight = in_flight
+
+    def _reserve(self, tasks: int):
+        """
+        Admit ``tasks`` tasks or none of them. The check and the increment
+        happen without an await in between, so concurrent requests on the
+        event loop cannot together overshoot the capacity.
+        """
+        if self.in_flight + tasks > self.capacity:
+            self.rejected += 1
+            raise InferenceBusyError(f"Inference queue is full ({self.in_flight} tasks in flight)")
+        self._set_in_flight(self.in_flight + tasks)
+
+    def _release(self, tasks: int):
+        self._set_in_flight(self.in_flight - tasks)
+
+    def _create_executor(self):
+        # spawn, not fork: the API process has an event loop, threads and open connections
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=worker.init_worker,
+            initargs=(MODEL_PATH, DATA_PATH, MODEL_CACHE_MAX_BYTES, self.preload_products)
+        )
+
+    async def _start_local(self):
+        if worker.predictor is None:
+            await run_in_threadpool(
+                worker.init_worker, MODEL_PATH, DATA_PATH, MODEL_CACHE_MAX_BYTES, self.preload_products
+            )
+
+    async def start(self):
+        """Start every worker and let it preload models before serving traffic."""
+        if self.workers <= 0:
+            await self._start_local()
+            return
+        if self.executor is not None:
+            return
+        self.executor = self._create_executor()
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        # One task per worker makes the pool spawn all of them; each preloads in its initializer
+        await asyncio.gather(*[
+            loop.run_in_executor(self.executor, worker.warm_up) for _ in range(self.workers)
+        ])
+        logger.info(f"Started {self.workers} inference workers in {time.perf_counter() - started:.1f}s")
+
+    async def stop(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    async def submit(self, fn, *args):
+        """Run fn(*args) on a worker, or raise InferenceBusyError if the pool is saturated."""
+        self._reserve(1)
+        try:
+            return await self._run(fn, *args)
+        finally:
+            self._release(1)
+
+    def _replace_broken(self, executor):
+        """
+        Replace ``executor`` after it broke, unless another request already
+        did. Every request running on the broken pool fails at once, so only
+        the first one to get here builds the new pool.
+        """
+        if self.executor is not executor:
+            return
+        logger.error("Inference worker pool broke; restarting it")
+        executor.shutdown(wait=False, cancel_futures=True)
+        self.executor = self._create_executor()
+
+    async def _run(self, fn, *args):
+        """Run one admitted task; the caller holds its slot."""
+        try:
+            if self.workers <= 0:
+                await self._start_local()
+                result = await run_in_threadpool(fn, *args)
+            else:
+                if self.executor is None:
+                    self.executor = self._create_executor()
+                executor = self.executor
+                try:
+                    result = await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+                except BrokenProcessPool:
+                    # A worker died (e.g. out of memory); replace the pool for later requests
+                    self._replace_broken(executor)
+                    raise
+            self.completed += 1
+            return result
+        except Exception:
+            self.failed += 1
+            raise
+
+    async def predict_demand(self, product_id: str, days_ahead: int):
+        return await self.submit(worker.predict_demand, product_id, days_ahead)
+
+    async def predict_demand_batch(self, product_ids: list[str], days_ahead: int) -> dict:
+        """Split a batch into one chunk per worker and merge the results."""
+        chunk_size = math.ceil(len(product_ids) / max(self.workers, 1))
+        chunks = [product_ids[i:i + chunk_size] for i in range(0, len(product_ids), chunk_size)]
+        # Admit the whole batch or none of it
+        self._reserve(len(chunks))
+        try:
+            # Wait for every chunk, so slots are not released while chunks still run
+            chunk_results = await asyncio.gather(*[
+                self._run(worker.predict_demand_batch, chunk, days_ahead) for chunk in chunks
+            ], return_exceptions=True)
+        finally:
+            self._release(len(chunks))
+        results = {}
+        for chunk_result in chunk_results:
+            if isinstance(chunk_result, BaseException):
+                raise chunk_result
+            results.update(chunk_result)
+        return results
+
+    def stats(self) -> dict:
+        workers = max(self.workers, 1)
+        self._set_in_flight(self.in_flight)
+        elapsed = self.last_change - self.started_at
+        stats = {
+            "mode": "processes" if self.workers > 0 else "threadpool",
+            "workers": self.workers,
+            "in_flight": self.in_flight,
+            "queue_depth": max(0, self.in_flight - workers),
+            "queue_capacity": self.queue_size,
+            "busy_workers": min(self.in_flight, workers),
+            "utilization": round(self.busy_seconds / (elapsed * workers), 4) if elapsed else 0.0,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+        }
+        if self.workers <= 0 and worker.predictor is not None:
+            # Worker processes keep their own registries; only the local one is visible here
+            stats["model_registry"] = worker.predictor.registry.stats()
+        return stats
+
+inference_pool = InferencePool()
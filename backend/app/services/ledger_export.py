@@ -0,0 +1,80 @@
+from sqlalchemy import select
+from app.database.database import AsyncSessionLocal
+from app.database.models import InventoryTransaction
+from datetime import datetime
+from enum import Enum
+import csv
+import io
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+EXPORT_COLUMNS = [
+    "id", "product_id", "transaction_type", "quantity", "previous_stock",
+    "new_stock", "reference_number", "notes", "created_at"
+]
+
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+def _plain(value):
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+def _format_csv(rows, header: bool) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(EXPORT_COLUMNS)
+    writer.writerows([_plain(value) for value in row] for row in rows)
+    return buffer.getvalue()
+
+def _format_ndjson(rows) -> str:
+    return "".join(
+        json.dumps({column: _plain(value) for column, value in zip(EXPORT_COLUMNS, row)}) + "\n"
+        for row in rows
+    )
+
+async def stream_ledger(
+    export_format: str,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    product_id: str | None = None,
+    batch_size: int = 1000
+):
+    """
+    Yield the inventory ledger as CSV or NDJSON chunks, oldest first.
+
+    Rows are read through a server-side cursor ``batch_size`` at a time as
+    plain tuples (no ORM objects), so memory stays constant however large the
+    ledger is. The generator owns its session because it outlives the request
+    handler that returns the StreamingResponse.
+    """
+    table = InventoryTransaction.__table__
+    query = select(*[table.c[column] for column in EXPORT_COLUMNS])
+    if product_id is not None:
+        query = query.where(table.c.product_id == product_id)
+    if start is not None:
+        query = query.where(table.c.created_at >= start)
+    if end is not None:
+        query = query.where(table.c.created_at < end)
+    query = query.order_by(table.c.created_at, table.c.id)
+
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(query.execution_options(yield_per=batch_size))
+        if export_format == "csv":
+            yield _format_csv([], header=True)
+        exported = 0
+        async for rows in result.partitions():
+            exported += len(rows)
+            if export_format == "csv":
+                yield _format_csv(rows, header=False)
+            else:
+                yield _format_ndjson(rows)
+        logger.info(f"Exported {exported} ledger rows as {export_format}")
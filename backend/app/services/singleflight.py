@@ -0,0 +1,38 @@
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key into one execution.
+
+    The first caller for a key starts the work; callers arriving while it is
+    in flight await the same task and get its result or exception. The task
+    is shielded, so a caller that goes away (e.g. a disconnected client)
+    does not cancel the work for the others. Keys are forgotten as soon as
+    the work finishes; this does not cache results.
+    """
+
+    def __init__(self):
+        self.calls = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    async def do(self, key, fn, *args):
+        task = self.calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn(*args))
+            self.calls[key] = task
+            task.add_done_callback(lambda _: self.calls.pop(key, None))
+            self.executed += 1
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self.calls),
+            "executed": self.executed,
+            "coalesced": self.coalesced,
+        }
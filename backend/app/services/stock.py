@@ -0,0 +1,195 @@
+from sqlalchemy import select, update, insert, literal, case, func, String, Integer, DateTime
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database.models import Product, InventoryTransaction, TransactionType
+from datetime import datetime
+import logging
+
+logger = logging.getLogger(__name__)
+
+class ProductNotFoundError(Exception):
+    def __init__(self, product_id: str):
+        super().__init__(f"Product not found: {product_id}")
+        self.product_id = product_id
+
+class InsufficientStockError(Exception):
+    def __init__(self, product_id: str, current_stock: int):
+        super().__init__(f"Insufficient stock. Current stock: {current_stock}")
+        self.product_id = product_id
+        self.current_stock = current_stock
+
+# A product whose current_stock is NULL holds no stock. Both the single-row
+# and the batch path read stock through this rule, so a movement succeeds or
+# fails the same way whichever endpoint applies it.
+stock_level = func.coalesce(Product.current_stock, 0)
+
+def stock_delta(transaction_type: TransactionType, quantity: int) -> int:
+    """Signed change in stock for a transaction of the given type."""
+    if transaction_type == TransactionType.SHIPPED:
+        return -quantity
+    return quantity
+
+def build_stock_movement(
+    product_id: str,
+    transaction_type: TransactionType,
+    quantity: int,
+    reference_number: str | None = None,
+    notes: str | None = None
+):
+    """
+    Build a single statement that moves stock and records the ledger row.
+
+    The conditional UPDATE only matches when the product exists and the
+    resulting stock stays non-negative, and the INSERT selects from its
+    RETURNING clause, so the check, the write and the transaction row are
+    applied atomically under the product's row lock:
+
+        WITH stock_update AS (
+            UPDATE products SET current_stock = coalesce(current_stock, 0) + :delta
+            WHERE id = :product_id AND coalesce(current_stock, 0) + :delta >= 0
+            RETURNING current_stock
+        )
+        INSERT INTO inventory_transactions (...)
+        SELECT ... FROM stock_update
+        RETURNING *
+    """
+    delta = stock_delta(transaction_type, quantity)
+    now = datetime.utcnow()
+
+    stock_update = (
+        update(Product)
+        .where(Product.id == product_id, stock_level + delta >= 0)
+        .values(current_stock=stock_level + delta, updated_at=now)
+        .returning(Product.current_stock.label("new_stock"))
+        .cte("stock_update")
+    )
+
+    return (
+        insert(InventoryTransaction)
+        .from_select(
+            [
+                "product_id", "transaction_type", "quantity", "previous_stock",
+                "new_stock", "reference_number", "notes", "created_at"
+            ],
+            select(
+                literal(product_id, String),
+                literal(transaction_type, InventoryTransaction.__table__.c.transaction_type.type),
+                literal(quantity, Integer),
+                stock_update.c.new_stock - delta,
+                stock_update.c.new_stock,
+                literal(reference_number, String),
+                literal(notes, String),
+                literal(now, DateTime)
+            ).select_from(stock_update)
+        )
+        .returning(InventoryTransaction)
+    )
+
+async def apply_stock_movement(
+    db: AsyncSession,
+    product_id: str,
+    transaction_type: TransactionType,
+    quantity: int,
+    reference_number: str | None = None,
+    notes: str | None = None
+) -> InventoryTransaction:
+    """
+    Apply a receive/ship/adjust movement in one round trip.
+
+    Returns the new InventoryTransaction. The caller owns the commit. Raises
+    ProductNotFoundError or InsufficientStockError when nothing was written.
+    """
+    statement = build_stock_movement(
+        product_id, transaction_type, quantity, reference_number, notes
+    )
+    db_transaction = (await db.execute(statement)).scalar_one_or_none()
+    if db_transaction is not None:
+        return db_transaction
+
+    # Nothing matched: find out why (only paid on the failure path)
+    product = (
+        await db.execute(select(stock_level.label("current_stock")).where(Product.id == product_id))
+    ).first()
+    if product is None:
+        raise ProductNotFoundError(product_id)
+    raise InsufficientStockError(product_id, product.current_stock)
+
+async def apply_stock_movements_batch(db: AsyncSession, movements: list[dict]) -> list[dict]:
+    """
+    Apply many movements of mixed types with a handful of set-based statements.
+
+    Each movement is a dict with product_id, transaction_type, quantity and
+    optional reference_number/notes. Movements are grouped by product and
+    applied in input order, so each ledger row carries the running stock.
+    A movement that would take stock below zero, or references an unknown
+    product, is rejected without affecting the rest of the batch.
+
+    Statements issued, regardless of batch size:
+      1. SELECT ... FOR UPDATE on the touched products (locked in id order)
+      2. one multi-row INSERT into inventory_transactions ... RETURNING
+      3. one UPDATE products SET current_stock = CASE id ... END
+
+    Returns one result dict per movement, in input order, with either a
+    "transaction" or an "error". The caller owns the commit.
+    """
+    product_ids = sorted({m["product_id"] for m in movements})
+    locked = await db.execute(
+        select(Product.id, stock_level.label("current_stock"))
+        .where(Product.id.in_(product_ids))
+        .order_by(Product.id)
+        .with_for_update()
+    )
+    running_stock = {row.id: row.current_stock for row in locked}
+    initial_stock = dict(running_stock)
+
+    results = [None] * len(movements)
+    rows = []
+    row_indexes = []
+    now = datetime.utcnow()
+    for index, movement in enumerate(movements):
+        product_id = movement["product_id"]
+        if product_id not in running_stock:
+            results[index] = {"error": str(ProductNotFoundError(product_id))}
+            continue
+
+        previous_stock = running_stock[product_id]
+        new_stock = previous_stock + stock_delta(movement["transaction_type"], movement["quantity"])
+        if new_stock < 0:
+            results[index] = {"error": str(InsufficientStockError(product_id, previous_stock))}
+            continue
+
+        running_stock[product_id] = new_stock
+        rows.append({
+            "product_id": product_id,
+            "transaction_type": movement["transaction_type"],
+            "quantity": movement["quantity"],
+            "previous_stock": previous_stock,
+            "new_stock": new_stock,
+            "reference_number": movement.get("reference_number"),
+            "notes": movement.get("notes"),
+            "created_at": now
+        })
+        row_indexes.append(index)
+
+    if rows:
+        inserted = (
+            await db.scalars(insert(InventoryTransaction).returning(InventoryTransaction, sort_by_parameter_order=True), rows)
+        ).all()
+        for index, db_transaction in zip(row_indexes, inserted):
+            results[index] = {"transaction": db_transaction}
+
+        changed = {
+            product_id: stock for product_id, stock in running_stock.items()
+            if stock != initial_stock[product_id]
+        }
+        if changed:
+            await db.execute(
+                update(Product)
+                .where(Product.id.in_(list(changed)))
+                .values(
+                    current_stock=case(changed, value=Product.id),
+                    updated_at=now
+                )
+                .execution_options(synchronize_session=False)
+            )
+
+    return results
@@ -0,0 +1,101 @@
+"""
+Ingestion throughput benchmark: single-item endpoints vs the batch endpoint.
+
+Sends the same mixed stream of receive/ship events across a set of products,
+first one request per event to /receive and /ship, then in batches to
+/transactions/batch, and reports events/sec for each.
+
+Usage:
+    python benchmarks/bench_batch_ingest.py --base-url http://localhost:8950 --events 2000
+"""
+import argparse
+import asyncio
+import random
+import time
+
+import httpx
+
+INVENTORY_PREFIX = "/api/inventory/inventory"
+PRODUCTS_PREFIX = "/api/products/products"
+SKU_PREFIX = "BENCH-BATCH"
+
+
+async def ensure_products(client, count):
+    product_ids = []
+    for i in range(count):
+        sku = f"{SKU_PREFIX}-{i:04d}"
+        product_id = f"PROD-{sku}"
+        response = await client.get(f"{PRODUCTS_PREFIX}/{product_id}")
+        if response.status_code == 404:
+            response = await client.post(PRODUCTS_PREFIX, json={
+                "name": f"Batch benchmark product {i}",
+                "category": "Benchmark",
+                "sku": sku,
+                "unit_price": 1.0,
+                "min_stock_level": 0,
+                "max_stock_level": 1000000,
+                "lead_time_days": 1
+            })
+            response.raise_for_status()
+        product_ids.append(product_id)
+    return product_ids
+
+
+def make_events(product_ids, count, seed=42):
+    rng = random.Random(seed)
+    events = []
+    for _ in range(count):
+        received = rng.random() < 0.6
+        events.append({
+            "product_id": rng.choice(product_ids),
+            "quantity": rng.randint(1, 5),
+            "transaction_type": "received" if received else "shipped"
+        })
+    return events
+
+
+async def run_single(client, events, concurrency):
+    queue = list(events)
+
+    async def worker():
+        while queue:
+            event = queue.pop()
+            endpoint = "receive" if event["transaction_type"] == "received" else "ship"
+            await client.post(f"{INVENTORY_PREFIX}/{endpoint}", json=event)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    return len(events) / (time.perf_counter() - start)
+
+
+async def run_batch(client, events, batch_size):
+    start = time.perf_counter()
+    for i in range(0, len(events), batch_size):
+        response = await client.post(f"{INVENTORY_PREFIX}/transactions/batch", json=events[i:i + batch_size])
+        response.raise_for_status()
+    return len(events) / (time.perf_counter() - start)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8950")
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--products", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=8, help="Clients for the single-item run")
+    parser.add_argument("--batch-sizes", default="100,500,1000")
+    args = parser.parse_args()
+
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=120) as client:
+        product_ids = await ensure_products(client, args.products)
+        events = make_events(product_ids, args.events)
+
+        single_rate = await run_single(client, events, args.concurrency)
+        print(f"{'mode':<22} {'events/sec':>11} {'speedup':>8}")
+        print(f"{'single (x' + str(args.concurrency) + ' clients)':<22} {single_rate:>11.1f} {1.0:>7.1f}x")
+        for batch_size in [int(size) for size in args.batch_sizes.split(",")]:
+            rate = await run_batch(client, events, batch_size)
+            print(f"{'batch ' + str(batch_size):<22} {rate:>11.1f} {rate / single_rate:>7.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
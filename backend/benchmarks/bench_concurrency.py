@@ -0,0 +1,93 @@
+"""
+Concurrency benchmark for the read endpoints.
+
+Drives a running API server with an increasing number of concurrent clients
+and reports latency percentiles per concurrency level. With the async
+database layer the p99 should stay roughly flat as clients are added, since
+a slow query no longer blocks the event loop for every other request.
+
+Usage:
+    python benchmarks/bench_concurrency.py --base-url http://localhost:8950
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+DEFAULT_ENDPOINTS = [
+    "/api/inventory/inventory/status",
+    "/api/products/products",
+    "/api/inventory/inventory/transactions",
+]
+
+
+def percentile(samples, pct):
+    """Return the pct-th percentile of a list of samples."""
+    if len(samples) == 1:
+        return samples[0]
+    return statistics.quantiles(samples, n=100, method="inclusive")[pct - 1]
+
+
+async def client_worker(client, endpoints, requests_per_client, latencies, errors):
+    for i in range(requests_per_client):
+        path = endpoints[i % len(endpoints)]
+        start = time.perf_counter()
+        try:
+            response = await client.get(path)
+            if response.status_code >= 400:
+                errors.append(response.status_code)
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+
+async def run_level(base_url, concurrency, requests_per_client, endpoints):
+    latencies = []
+    errors = []
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*[
+            client_worker(client, endpoints, requests_per_client, latencies, errors)
+            for _ in range(concurrency)
+        ])
+        elapsed = time.perf_counter() - start
+
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": len(errors),
+        "rps": len(latencies) / elapsed,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8950")
+    parser.add_argument("--levels", default="1,4,16,32,64", help="Comma separated client counts")
+    parser.add_argument("--requests-per-client", type=int, default=50)
+    parser.add_argument("--endpoint", action="append", dest="endpoints", help="Path to request (repeatable)")
+    args = parser.parse_args()
+
+    endpoints = args.endpoints or DEFAULT_ENDPOINTS
+    levels = [int(level) for level in args.levels.split(",")]
+
+    # Warm up connection pools on both sides
+    await run_level(args.base_url, min(levels), 5, endpoints)
+
+    print(f"{'clients':>8} {'requests':>9} {'errors':>7} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for concurrency in levels:
+        r = await run_level(args.base_url, concurrency, args.requests_per_client, endpoints)
+        print(
+            f"{r['concurrency']:>8} {r['requests']:>9} {r['errors']:>7} {r['rps']:>9.1f} "
+            f"{r['p50']:>9.2f} {r['p95']:>9.2f} {r['p99']:>9.2f}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,60 @@
+"""
+Batch vs per-product forecast benchmark.
+
+Requests forecasts for N products once through /predictions/demand/batch and
+once as N calls to /predictions/demand, for growing batch sizes, and prints
+the cost per product. Each size is warmed first so both paths read from the
+forecast cache and the comparison measures request overhead, not inference.
+
+Usage:
+    python benchmarks/bench_forecast_batch.py --base-url http://localhost:8950 --sizes 1 10 50
+"""
+import argparse
+import time
+
+import httpx
+
+PREDICTIONS_PATH = "/api/predictions/predictions"
+
+
+def forecast_batch(client, product_ids, days_ahead):
+    response = client.post(
+        f"{PREDICTIONS_PATH}/demand/batch", json={"product_ids": product_ids, "days_ahead": days_ahead}
+    )
+    response.raise_for_status()
+
+
+def forecast_each(client, product_ids, days_ahead):
+    for product_id in product_ids:
+        response = client.post(
+            f"{PREDICTIONS_PATH}/demand", json={"product_id": product_id, "days_ahead": days_ahead}
+        )
+        response.raise_for_status()
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8950")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--days-ahead", type=int, default=30)
+    parser.add_argument("--product-prefix", default="PRD", help="Products are <prefix>001, <prefix>002, ...")
+    args = parser.parse_args()
+
+    print(f"{'products':>8} {'batch ms/product':>17} {'single ms/product':>18}")
+    with httpx.Client(base_url=args.base_url, timeout=300) as client:
+        for size in args.sizes:
+            product_ids = [f"{args.product_prefix}{i:03d}" for i in range(1, size + 1)]
+            forecast_batch(client, product_ids, args.days_ahead)
+            batch_ms = timed(forecast_batch, client, product_ids, args.days_ahead)
+            single_ms = timed(forecast_each, client, product_ids, args.days_ahead)
+            print(f"{size:>8} {batch_ms / size:>17.2f} {single_ms / size:>18.2f}")
+
+
+if __name__ == "__main__":
+    main()
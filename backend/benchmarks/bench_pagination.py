@@ -0,0 +1,51 @@
+"""
+Transaction history paging benchmark: offset vs keyset cursor.
+
+Walks /transactions page by page, once with ?skip= and once following the
+X-Next-Cursor header, and prints request latency at increasing page depths.
+Cursor latency should stay flat while offset latency grows with depth.
+
+Usage:
+    python benchmarks/bench_pagination.py --base-url http://localhost:8950 --pages 200
+"""
+import argparse
+import time
+
+import httpx
+
+TRANSACTIONS_PATH = "/api/inventory/inventory/transactions"
+
+
+def timed_get(client, params):
+    start = time.perf_counter()
+    response = client.get(TRANSACTIONS_PATH, params=params)
+    response.raise_for_status()
+    return response, (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8950")
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--report-every", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'page':>6} {'offset ms':>10} {'cursor ms':>10}")
+    with httpx.Client(base_url=args.base_url, timeout=60) as client:
+        cursor = None
+        for page in range(args.pages):
+            _, offset_ms = timed_get(client, {"skip": page * args.limit, "limit": args.limit})
+            response, cursor_ms = timed_get(
+                client, {"limit": args.limit, **({"cursor": cursor} if cursor else {})}
+            )
+            if page % args.report_every == 0:
+                print(f"{page:>6} {offset_ms:>10.2f} {cursor_ms:>10.2f}")
+            cursor = response.headers.get("X-Next-Cursor")
+            if cursor is None:
+                print(f"Reached the end of the ledger after {page + 1} pages")
+                break
+
+
+if __name__ == "__main__":
+    main()
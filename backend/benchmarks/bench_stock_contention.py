@@ -0,0 +1,139 @@
+"""
+Contention benchmark for the stock mutation path.
+
+N workers repeatedly ship one unit of the same hot product. Reports ops/sec
+and checks that the final stock and the ledger agree with the number of
+successful shipments. Run with --mode legacy to compare against the old
+read-modify-write handler logic, which loses updates under contention.
+
+Usage:
+    python benchmarks/bench_stock_contention.py --workers 32 --ops-per-worker 200
+"""
+import sys
+from pathlib import Path
+
+# Add the backend directory to Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import delete, func, select
+
+from app.database.database import AsyncSessionLocal, async_engine
+from app.database.models import Base, Product, InventoryTransaction, TransactionType
+from app.database.partitions import ensure_monthly_partitions
+from app.services.stock import apply_stock_movement, InsufficientStockError
+
+HOT_PRODUCT_ID = "BENCH-HOT-SKU"
+
+
+def create_schema(conn):
+    Base.metadata.create_all(conn)
+    # A new partitioned ledger has no partitions; inserts need them, as in init_db
+    ensure_monthly_partitions(conn)
+
+
+async def reset_hot_product(initial_stock):
+    async with async_engine.begin() as conn:
+        await conn.run_sync(create_schema)
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(InventoryTransaction).where(InventoryTransaction.product_id == HOT_PRODUCT_ID))
+        await db.execute(delete(Product).where(Product.id == HOT_PRODUCT_ID))
+        db.add(Product(
+            id=HOT_PRODUCT_ID,
+            name="Contention benchmark product",
+            category="Benchmark",
+            sku=HOT_PRODUCT_ID,
+            unit_price=1.0,
+            min_stock_level=0,
+            max_stock_level=initial_stock,
+            lead_time_days=1,
+            current_stock=initial_stock
+        ))
+        await db.commit()
+
+
+async def ship_atomic(db):
+    try:
+        await apply_stock_movement(db, HOT_PRODUCT_ID, TransactionType.SHIPPED, 1)
+        await db.commit()
+        return True
+    except InsufficientStockError:
+        await db.rollback()
+        return False
+
+
+async def ship_legacy(db):
+    # Mirrors the previous handlers: read in Python, compute, write back
+    product = await db.get(Product, HOT_PRODUCT_ID, populate_existing=True)
+    if product.current_stock < 1:
+        await db.rollback()
+        return False
+    previous_stock = product.current_stock
+    product.current_stock = previous_stock - 1
+    db.add(InventoryTransaction(
+        product_id=HOT_PRODUCT_ID,
+        transaction_type=TransactionType.SHIPPED,
+        quantity=1,
+        previous_stock=previous_stock,
+        new_stock=previous_stock - 1
+    ))
+    await db.commit()
+    return True
+
+
+async def worker(ship, ops, counters):
+    async with AsyncSessionLocal() as db:
+        for _ in range(ops):
+            if await ship(db):
+                counters["ok"] += 1
+            else:
+                counters["rejected"] += 1
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--ops-per-worker", type=int, default=200)
+    parser.add_argument("--initial-stock", type=int, default=None,
+                        help="Defaults to 90%% of total ops so some shipments are rejected")
+    parser.add_argument("--mode", choices=["atomic", "legacy"], default="atomic")
+    args = parser.parse_args()
+
+    total_ops = args.workers * args.ops_per_worker
+    initial_stock = args.initial_stock if args.initial_stock is not None else int(total_ops * 0.9)
+    await reset_hot_product(initial_stock)
+
+    ship = ship_atomic if args.mode == "atomic" else ship_legacy
+    counters = {"ok": 0, "rejected": 0}
+    start = time.perf_counter()
+    await asyncio.gather(*[worker(ship, args.ops_per_worker, counters) for _ in range(args.workers)])
+    elapsed = time.perf_counter() - start
+
+    async with AsyncSessionLocal() as db:
+        final_stock = (await db.execute(
+            select(Product.current_stock).where(Product.id == HOT_PRODUCT_ID)
+        )).scalar_one()
+        ledger_rows = (await db.execute(
+            select(func.count()).where(InventoryTransaction.product_id == HOT_PRODUCT_ID)
+        )).scalar_one()
+    await async_engine.dispose()
+
+    expected_stock = initial_stock - counters["ok"]
+    correct = final_stock == expected_stock and ledger_rows == counters["ok"] and final_stock >= 0
+    print(f"mode:            {args.mode}")
+    print(f"workers:         {args.workers}")
+    print(f"operations:      {total_ops} ({counters['ok']} shipped, {counters['rejected']} rejected)")
+    print(f"throughput:      {total_ops / elapsed:.1f} ops/sec")
+    print(f"initial stock:   {initial_stock}")
+    print(f"final stock:     {final_stock} (expected {expected_stock})")
+    print(f"ledger rows:     {ledger_rows}")
+    print(f"consistent:      {'yes' if correct else 'NO'}")
+    if not correct:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,89 @@
+import os
+import sys
+import asyncio
+import logging
+import argparse
+import threading
+import time
+from pathlib import Path
+
+# Add the parent directory to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+# Run inference in this process so model calls can be counted
+os.environ["INFERENCE_WORKERS"] = "0"
+
+import httpx
+from app.main import app
+from app.models import worker
+from app.services.forecasts import forecast_cache, forecast_flights, forecast_key, predictor
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def counting(fn, counter: dict, delay: float):
+    lock = threading.Lock()
+
+    def wrapper(*args):
+        with lock:
+            counter["calls"] += 1
+        # Hold the call open so every request arrives while it is in flight
+        time.sleep(delay)
+        return fn(*args)
+    return wrapper
+
+async def run_check(product_id: str, requests: int, days_ahead: int, delay: float) -> int:
+    # Start from a cache miss so every request needs the model
+    key = forecast_key(product_id, predictor.registry.model_version(product_id), predictor.data_watermark(product_id))
+    await forecast_cache.invalidate(keys=[key])
+
+    counter = {"calls": 0}
+    predict_demand = worker.predict_demand
+    worker.predict_demand = counting(predict_demand, counter, delay)
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://check") as client:
+            responses = await asyncio.gather(*[
+                client.post(
+                    "/api/predictions/predictions/demand",
+                    json={"product_id": product_id, "days_ahead": days_ahead}
+                )
+                for _ in range(requests)
+            ])
+    finally:
+        worker.predict_demand = predict_demand
+
+    statuses = sorted({response.status_code for response in responses})
+    bodies = {response.json()["predictions"][0]["predicted_demand"] for response in responses if response.status_code == 200}
+    logger.info(f"{requests} requests -> statuses {statuses}, model calls {counter['calls']}, {forecast_flights.stats()}")
+
+    if statuses != [200]:
+        logger.error("Not every request succeeded")
+        return 1
+    if counter["calls"] != 1:
+        logger.error(f"Expected exactly one model call, got {counter['calls']}")
+        return 1
+    if len(bodies) != 1:
+        logger.error("Coalesced requests returned different forecasts")
+        return 1
+    logger.info("OK: identical concurrent requests shared one model call")
+    return 0
+
+def main():
+    """End-to-end check that N simultaneous identical forecast requests trigger exactly one model call."""
+    parser = argparse.ArgumentParser(description="Verify single-flight coalescing of forecast requests")
+    parser.add_argument("--product-id", default="PRD001", help="A product with a trained model in the database")
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--days-ahead", type=int, default=30)
+    parser.add_argument("--delay", type=float, default=0.5, help="Seconds each model call is held open")
+    args = parser.parse_args()
+
+    try:
+        sys.exit(asyncio.run(run_check(args.product_id, args.requests, args.days_ahead, args.delay)))
+    except Exception as e:
+        logger.error(f"Single-flight check failed: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
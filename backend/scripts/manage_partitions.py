@@ -0,0 +1,168 @@
+import sys
+import json
+import logging
+import argparse
+from pathlib import Path
+from datetime import datetime, timedelta
+from sqlalchemy import text
+
+# Add the parent directory to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.database.database import get_engine
+from app.database.models import Base, InventoryTransaction
+from app.database.partitions import (
+    PARENT_TABLE,
+    add_months,
+    month_start,
+    is_partitioned,
+    list_partitions,
+    ensure_default_partition,
+    ensure_monthly_partitions,
+    retire_partitions,
+)
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+LEGACY_TABLE = f"{PARENT_TABLE}_legacy"
+COLUMNS = [
+    "id", "product_id", "transaction_type", "quantity", "previous_stock",
+    "new_stock", "reference_number", "notes", "created_at"
+]
+
+def migrate(conn, drop_legacy: bool):
+    """Convert an existing plain inventory_transactions table into the partitioned layout."""
+    if is_partitioned(conn):
+        logger.info(f"{PARENT_TABLE} is already partitioned")
+        return
+
+    # Move the old table, its indexes and its id sequence out of the way
+    conn.execute(text(f"ALTER TABLE {PARENT_TABLE} RENAME TO {LEGACY_TABLE}"))
+    for index_name in conn.execute(
+        text("SELECT indexname FROM pg_indexes WHERE tablename = :table"), {"table": LEGACY_TABLE}
+    ).scalars().all():
+        conn.execute(text(f'ALTER INDEX "{index_name}" RENAME TO "{index_name}_legacy"'))
+    conn.execute(text(f"ALTER SEQUENCE IF EXISTS {PARENT_TABLE}_id_seq RENAME TO {LEGACY_TABLE}_id_seq"))
+
+    Base.metadata.create_all(conn, tables=[InventoryTransaction.__table__])
+    ensure_default_partition(conn)
+
+    oldest = conn.execute(text(f"SELECT min(created_at) FROM {LEGACY_TABLE}")).scalar()
+    months_back = 0
+    if oldest is not None:
+        current = month_start(datetime.utcnow().date())
+        month = month_start(oldest.date())
+        while month < current:
+            months_back += 1
+            month = add_months(month, 1)
+    ensure_monthly_partitions(conn, months_back=months_back)
+
+    columns = ", ".join(COLUMNS)
+    source_columns = ", ".join(
+        "COALESCE(created_at, now())" if column == "created_at" else column for column in COLUMNS
+    )
+    copied = conn.execute(text(
+        f"INSERT INTO {PARENT_TABLE} ({columns}) SELECT {source_columns} FROM {LEGACY_TABLE}"
+    )).rowcount
+    conn.execute(text(
+        f"SELECT setval(pg_get_serial_sequence('{PARENT_TABLE}', 'id'), "
+        f"COALESCE((SELECT max(id) FROM {PARENT_TABLE}), 0) + 1, false)"
+    ))
+    logger.info(f"Copied {copied} rows into partitioned {PARENT_TABLE}")
+
+    if drop_legacy:
+        conn.execute(text(f"DROP TABLE {LEGACY_TABLE}"))
+        logger.info(f"Dropped {LEGACY_TABLE}")
+    else:
+        logger.info(f"Kept {LEGACY_TABLE}; drop it once the migration is verified")
+
+def scanned_relations(conn, query: str, params: dict) -> set:
+    plan = conn.execute(text(f"EXPLAIN (FORMAT JSON) {query}"), params).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    relations = set()
+    nodes = [plan[0]["Plan"]]
+    while nodes:
+        node = nodes.pop()
+        if "Relation Name" in node:
+            relations.add(node["Relation Name"])
+        nodes.extend(node.get("Plans", []))
+    return relations
+
+def check_pruning(conn) -> bool:
+    """Verify that date-bounded history queries only touch the partitions they need."""
+    partitions = list_partitions(conn)
+    if not partitions:
+        logger.error(f"{PARENT_TABLE} has no monthly partitions")
+        return False
+
+    month = month_start(datetime.utcnow().date())
+    start = datetime.combine(month, datetime.min.time())
+    end = datetime.combine(add_months(month, 1), datetime.min.time())
+    checks = [
+        (
+            "ledger export for the current month",
+            f"SELECT * FROM {PARENT_TABLE} WHERE created_at >= :start AND created_at < :end",
+            {"start": start, "end": end},
+        ),
+        (
+            "keyset history page within the current month",
+            f"SELECT * FROM {PARENT_TABLE} WHERE product_id = :product_id "
+            f"AND created_at >= :start AND created_at <= :cursor "
+            f"AND (created_at, id) < (:cursor, :cursor_id) ORDER BY created_at DESC, id DESC LIMIT 100",
+            {"product_id": "PRUNING-CHECK", "start": start, "cursor": start + timedelta(days=1), "cursor_id": 0},
+        ),
+    ]
+
+    expected = {partitions[month]} if month in partitions else set()
+    ok = True
+    for description, query, params in checks:
+        relations = scanned_relations(conn, query, params)
+        pruned = relations <= expected
+        ok = ok and pruned
+        logger.info(
+            f"{'OK  ' if pruned else 'FAIL'} {description}: scans {sorted(relations) or 'nothing'}"
+            f" of {len(partitions) + 1} partitions"
+        )
+    return ok
+
+def main():
+    """Maintain monthly partitions of the inventory ledger."""
+    parser = argparse.ArgumentParser(description="Maintain monthly partitions of inventory_transactions")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    migrate_parser = subparsers.add_parser("migrate", help="Convert an existing unpartitioned table")
+    migrate_parser.add_argument("--drop-legacy", action="store_true", help="Drop the old table after copying")
+
+    maintain_parser = subparsers.add_parser("maintain", help="Pre-create future partitions and retire old ones")
+    maintain_parser.add_argument("--months-ahead", type=int, default=3)
+    maintain_parser.add_argument("--retain-months", type=int, default=None,
+                                 help="Detach partitions older than this many months (default: keep all)")
+    maintain_parser.add_argument("--archive-dir", type=Path, default=None,
+                                 help="Export retired partitions to gzip CSV here and drop them")
+
+    subparsers.add_parser("check-pruning", help="Verify history queries prune partitions")
+
+    args = parser.parse_args()
+    engine = get_engine()
+
+    try:
+        with engine.begin() as conn:
+            if args.command == "migrate":
+                migrate(conn, args.drop_legacy)
+            elif args.command == "maintain":
+                ensure_monthly_partitions(conn, months_ahead=args.months_ahead)
+                if args.retain_months is not None:
+                    retired = retire_partitions(conn, args.retain_months, args.archive_dir)
+                    logger.info(f"Retired {len(retired)} partitions")
+            elif args.command == "check-pruning":
+                if not check_pruning(conn):
+                    sys.exit(1)
+    except Exception as e:
+        logger.error(f"Partition maintenance failed: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
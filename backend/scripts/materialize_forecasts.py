@@ -0,0 +1,88 @@
+import sys
+import time
+import logging
+import argparse
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+from sqlalchemy import select
+
+# Add the parent directory to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.database.database import get_engine
+from app.database.models import Base, Product, ForecastRun, DemandForecast
+from app.models import DemandPredictor, ModelNotFoundError, worker
+from app.models.predict import MODEL_PATH, DATA_PATH, MODEL_CACHE_MAX_BYTES
+from app.services.forecast_runs import start_run, copy_forecasts, publish_run, fail_run, retire_runs
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def forecast_chunks(product_ids: list, days_ahead: int, chunk_size: int, workers: int):
+    """Yield {product_id: forecast or ModelNotFoundError} per chunk of products."""
+    chunks = [product_ids[i:i + chunk_size] for i in range(0, len(product_ids), chunk_size)]
+    if workers <= 1:
+        predictor = DemandPredictor()
+        for chunk in chunks:
+            yield predictor.predict_demand_batch(chunk, days_ahead)
+        return
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=worker.init_worker,
+        initargs=(MODEL_PATH, DATA_PATH, MODEL_CACHE_MAX_BYTES, 0)
+    ) as executor:
+        yield from executor.map(worker.predict_demand_batch, chunks, [days_ahead] * len(chunks))
+
+def main():
+    """Forecast every product with a trained model into demand_forecasts; schedule nightly after training."""
+    parser = argparse.ArgumentParser(description="Materialize demand forecasts into Postgres")
+    parser.add_argument("--days-ahead", type=int, default=90)
+    parser.add_argument("--workers", type=int, default=1, help="Inference processes")
+    parser.add_argument("--chunk-size", type=int, default=200, help="Products per COPY batch")
+    parser.add_argument("--keep-runs", type=int, default=2, help="Complete runs to keep, including the new one")
+    args = parser.parse_args()
+
+    engine = get_engine()
+    Base.metadata.create_all(bind=engine, tables=[ForecastRun.__table__, DemandForecast.__table__])
+
+    with engine.begin() as conn:
+        catalog = set(conn.execute(select(Product.id)).scalars().all())
+        run_id = start_run(conn, args.days_ahead)
+    product_ids = [product_id for product_id in DemandPredictor().registry.product_ids() if product_id in catalog]
+    logger.info(f"Run {run_id}: forecasting {len(product_ids)} products {args.days_ahead} days ahead")
+
+    started = time.perf_counter()
+    raw = engine.raw_connection()
+    try:
+        products = rows = 0
+        for forecasts in forecast_chunks(product_ids, args.days_ahead, args.chunk_size, args.workers):
+            forecasts = {
+                product_id: forecast for product_id, forecast in forecasts.items()
+                if not isinstance(forecast, ModelNotFoundError)
+            }
+            rows += copy_forecasts(raw, run_id, forecasts)
+            products += len(forecasts)
+        raw.commit()
+
+        with engine.begin() as conn:
+            publish_run(conn, run_id, products)
+            retired = retire_runs(conn, args.keep_runs)
+        logger.info(
+            f"Run {run_id} is current: {products} products, {rows} rows in "
+            f"{time.perf_counter() - started:.1f}s; retired runs {retired or 'none'}"
+        )
+    except Exception as e:
+        raw.rollback()
+        logger.error(f"Error materializing forecasts: {e}")
+        with engine.begin() as conn:
+            fail_run(conn, run_id)
+        sys.exit(1)
+    finally:
+        raw.close()
+
+if __name__ == "__main__":
+    main()
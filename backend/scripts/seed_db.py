@@ -10,6 +10,7 @@ sys.path.append(str(Path(__file__).parent.parent))
 
 from app.database.database import get_engine
 from app.database.models import Base, Product
+from app.database.partitions import ensure_monthly_partitions
 from app.api.products import ProductCreate
 
 # Set up logging
@@ -21,6 +22,8 @@ def init_db():
     try:
         engine = get_engine()
         Base.metadata.create_all(bind=engine)
+        with engine.begin() as conn:
+            ensure_monthly_partitions(conn)
         logger.info("Database tables created successfully")
     except Exception as e:
         logger.error(f"Error creating database tables: {e}")
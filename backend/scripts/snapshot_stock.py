@@ -0,0 +1,42 @@
+import sys
+import logging
+import argparse
+from pathlib import Path
+from datetime import datetime, timedelta
+
+# Add the parent directory to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.database.database import get_engine
+from app.database.models import Base, StockSnapshot
+from app.services.snapshots import build_snapshot_statement
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def main():
+    """Take daily stock snapshots for every product; schedule once a day (e.g. cron at 00:05 UTC)."""
+    parser = argparse.ArgumentParser(description="Snapshot stock levels for point-in-time queries")
+    parser.add_argument("--date", type=datetime.fromisoformat, default=None,
+                        help="Snapshot as of midnight UTC of this date (default: today)")
+    parser.add_argument("--backfill-days", type=int, default=0,
+                        help="Also snapshot this many days before --date")
+    args = parser.parse_args()
+
+    day = (args.date or datetime.utcnow()).replace(hour=0, minute=0, second=0, microsecond=0)
+    cutoffs = [day - timedelta(days=offset) for offset in range(args.backfill_days, -1, -1)]
+
+    try:
+        engine = get_engine()
+        Base.metadata.create_all(bind=engine, tables=[StockSnapshot.__table__])
+        with engine.begin() as conn:
+            for cutoff in cutoffs:
+                inserted = conn.execute(build_snapshot_statement(cutoff)).rowcount
+                logger.info(f"Snapshot {cutoff.isoformat()}: {inserted} products")
+    except Exception as e:
+        logger.error(f"Error taking stock snapshots: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
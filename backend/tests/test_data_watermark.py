@@ -0,0 +1,52 @@
+import os
+
+import pandas as pd
+
+from app.models.predict import DemandPredictor
+
+def write_sales(path, rows):
+    pd.DataFrame(rows).to_csv(path / "processed_sales.csv", index=False)
+
+def sales_row(product_id, date, sales_7d_avg=5.0):
+    return {
+        "product_id": product_id, "date": date, "sales_quantity": 5,
+        "sales_7d_avg": sales_7d_avg, "stock_to_sales_ratio": 2.0,
+    }
+
+def touch_later(path):
+    # Filesystems with coarse timestamps could otherwise keep the old mtime
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+def test_watermark_follows_new_sales_data(tmp_path):
+    write_sales(tmp_path, [sales_row("PRD001", "2025-05-01"), sales_row("PRD002", "2025-05-01")])
+    predictor = DemandPredictor(model_path=tmp_path / "models", data_path=tmp_path)
+    first = predictor.data_watermark("PRD001")
+    other = predictor.data_watermark("PRD002")
+    assert first.startswith("2025-05-01")
+    assert predictor.forecast_dates("PRD001", 1)[0] == pd.Timestamp("2025-05-02")
+
+    write_sales(tmp_path, [
+        sales_row("PRD001", "2025-05-01"), sales_row("PRD001", "2025-05-02"), sales_row("PRD002", "2025-05-01"),
+    ])
+    touch_later(tmp_path / "processed_sales.csv")
+
+    assert predictor.data_watermark("PRD001").startswith("2025-05-02")
+    assert predictor.forecast_dates("PRD001", 1)[0] == pd.Timestamp("2025-05-03")
+    assert predictor.data_watermark("PRD002") == other
+
+def test_restated_row_changes_watermark(tmp_path):
+    write_sales(tmp_path, [sales_row("PRD001", "2025-05-01", sales_7d_avg=5.0)])
+    predictor = DemandPredictor(model_path=tmp_path / "models", data_path=tmp_path)
+    first = predictor.data_watermark("PRD001")
+
+    write_sales(tmp_path, [sales_row("PRD001", "2025-05-01", sales_7d_avg=7.5)])
+    touch_later(tmp_path / "processed_sales.csv")
+
+    assert predictor.data_watermark("PRD001") != first
+
+def test_unknown_product_and_missing_file(tmp_path):
+    predictor = DemandPredictor(model_path=tmp_path / "models", data_path=tmp_path)
+    assert predictor.data_watermark("PRD001") == "none"
+    write_sales(tmp_path, [sales_row("PRD001", "2025-05-01")])
+    assert predictor.data_watermark("PRD001").startswith("2025-05-01")
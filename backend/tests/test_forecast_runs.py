@@ -0,0 +1,29 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy.dialects import postgresql
+
+from app.services.forecast_runs import materialized_query, FORECAST_RUN_MAX_AGE_HOURS
+
+def compile_query(product_ids, days_ahead):
+    compiled = materialized_query(product_ids, days_ahead).compile(dialect=postgresql.dialect())
+    return " ".join(str(compiled).split()), compiled.params
+
+def test_only_rows_from_today_on_are_read():
+    sql, params = compile_query(["PRD001", "PRD002"], 30)
+
+    assert "demand_forecasts.forecast_date >= %(forecast_date_1)s" in sql
+    assert params["forecast_date_1"] == datetime.now().date()
+
+def test_runs_older_than_the_max_age_are_ignored():
+    sql, params = compile_query(["PRD001", "PRD002"], 30)
+
+    assert "forecast_runs.is_current AND forecast_runs.completed_at >= %(completed_at_1)s" in sql
+    cutoff = datetime.utcnow() - timedelta(hours=FORECAST_RUN_MAX_AGE_HOURS)
+    assert abs(params["completed_at_1"] - cutoff) < timedelta(minutes=1)
+
+def test_single_product_reads_only_the_horizon():
+    sql, params = compile_query(["PRD001"], 30)
+    assert sql.endswith("LIMIT %(param_1)s") and params["param_1"] == 30
+
+    sql, _ = compile_query(["PRD001", "PRD002"], 30)
+    assert "LIMIT" not in sql
@@ -0,0 +1,105 @@
+import asyncio
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.services.idempotency import (
+    claim_idempotency_key, store_idempotent_response, request_fingerprint, IdempotencyKeyReuseError
+)
+
+class Result:
+    def __init__(self, row=None):
+        self.row = row
+
+    def first(self):
+        return self.row
+
+    def scalar_one(self):
+        return self.row
+
+class RecordingSession:
+    """Records executed statements as PostgreSQL SQL and answers with queued results."""
+
+    def __init__(self, *results):
+        self.results = list(results)
+        self.statements = []
+
+    async def execute(self, statement):
+        compiled = statement.compile(dialect=postgresql.dialect())
+        self.statements.append((" ".join(str(compiled).split()), compiled.params))
+        return self.results.pop(0) if self.results else Result()
+
+def stored_key(request_hash, expires_in=timedelta(hours=1), status=200, body=None):
+    return SimpleNamespace(
+        endpoint="/inventory/transaction", request_hash=request_hash,
+        response_status=status, response_body=body, expires_at=datetime.utcnow() + expires_in
+    )
+
+REQUEST_HASH = request_fingerprint("/inventory/transaction", {"product_id": "PRD001", "quantity": 5})
+
+def claim(db, request_hash=REQUEST_HASH):
+    return asyncio.run(claim_idempotency_key(db, "key-1", "/inventory/transaction", request_hash))
+
+def test_first_request_claims_the_key_with_insert_on_conflict_do_nothing():
+    db = RecordingSession(Result(row=("key-1",)))
+
+    assert claim(db) is None
+
+    [(sql, params)] = db.statements
+    assert sql.startswith("INSERT INTO idempotency_keys")
+    assert sql.endswith("ON CONFLICT (key) DO NOTHING RETURNING idempotency_keys.key")
+    assert params["key"] == "key-1" and params["request_hash"] == REQUEST_HASH
+    assert params["expires_at"] > params["created_at"]
+
+def test_retry_rereads_the_key_for_update_and_replays_the_response():
+    db = RecordingSession(Result(), Result(stored_key(REQUEST_HASH, body={"id": 7})))
+
+    assert claim(db) == (200, {"id": 7})
+
+    sql, params = db.statements[1]
+    assert sql.startswith("SELECT idempotency_keys.key")
+    assert "WHERE idempotency_keys.key = %(key_1)s" in sql and params["key_1"] == "key-1"
+    assert sql.endswith("FOR UPDATE")
+    assert len(db.statements) == 2
+
+def test_expired_key_is_taken_over():
+    db = RecordingSession(Result(), Result(stored_key("other request", expires_in=-timedelta(minutes=1))))
+
+    assert claim(db) is None
+
+    sql, params = db.statements[2]
+    assert sql.startswith("UPDATE idempotency_keys SET")
+    assert "WHERE idempotency_keys.key = %(key_1)s" in sql
+    assert params["request_hash"] == REQUEST_HASH
+    assert params["response_status"] is None and params["response_body"] is None
+    assert params["expires_at"] > datetime.utcnow()
+
+@pytest.mark.parametrize("endpoint, request_hash", [
+    ("/inventory/transaction", "hash of another body"),
+    ("/inventory/adjust", REQUEST_HASH),
+])
+def test_reusing_a_key_for_another_request_is_rejected(endpoint, request_hash):
+    stored = stored_key(request_hash)
+    stored.endpoint = endpoint
+    db = RecordingSession(Result(), Result(stored))
+
+    with pytest.raises(IdempotencyKeyReuseError) as error:
+        claim(db)
+    assert error.value.key == "key-1"
+
+def test_fingerprint_ignores_key_order_only():
+    assert request_fingerprint("/x", {"a": 1, "b": 2}) == request_fingerprint("/x", {"b": 2, "a": 1})
+    assert request_fingerprint("/x", {"a": 1}) != request_fingerprint("/x", {"a": 2})
+    assert request_fingerprint("/x", {"a": 1}) != request_fingerprint("/y", {"a": 1})
+
+def test_store_response_updates_the_claimed_key():
+    db = RecordingSession()
+
+    asyncio.run(store_idempotent_response(db, "key-1", 200, {"id": 7}))
+
+    [(sql, params)] = db.statements
+    assert sql.startswith("UPDATE idempotency_keys SET response_status=%(response_status)s, response_body=%(response_body)s")
+    assert sql.endswith("WHERE idempotency_keys.key = %(key_1)s")
+    assert params["response_status"] == 200 and params["key_1"] == "key-1"
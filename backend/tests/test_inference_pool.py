@@ -0,0 +1,96 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from app.models import worker
+from app.services.inference import InferencePool, InferenceBusyError
+
+def slow_task(seconds):
+    time.sleep(seconds)
+    return seconds
+
+def crash():
+    os._exit(1)
+
+@pytest.fixture
+def local_worker(monkeypatch):
+    # Threadpool mode without loading models into this process
+    monkeypatch.setattr(worker, "predictor", object())
+
+def test_batch_admission_cannot_overshoot_capacity(local_worker):
+    pool = InferencePool(workers=0, queue_size=2)
+    peak = {"in_flight": 0}
+
+    async def track():
+        while True:
+            peak["in_flight"] = max(peak["in_flight"], pool.in_flight)
+            await asyncio.sleep(0.001)
+
+    async def batch(tasks):
+        pool._reserve(tasks)
+        try:
+            await asyncio.gather(*[pool._run(slow_task, 0.05) for _ in range(tasks)])
+        finally:
+            pool._release(tasks)
+
+    async def run():
+        tracker = asyncio.ensure_future(track())
+        results = await asyncio.gather(
+            batch(2), batch(2), pool.submit(slow_task, 0.05), return_exceptions=True
+        )
+        tracker.cancel()
+        return results
+
+    results = asyncio.run(run())
+
+    assert pool.capacity == 3
+    assert peak["in_flight"] <= pool.capacity
+    assert sum(isinstance(result, InferenceBusyError) for result in results) == 1
+    assert pool.in_flight == 0
+    assert pool.rejected == 1
+
+def test_slots_are_released_after_failures(local_worker):
+    pool = InferencePool(workers=0, queue_size=0)
+
+    def failing():
+        raise ValueError("bad input")
+
+    async def run():
+        with pytest.raises(ValueError):
+            await pool.submit(failing)
+        return await pool.submit(slow_task, 0)
+
+    assert asyncio.run(run()) == 0
+    assert pool.in_flight == 0
+    assert pool.failed == 1
+    assert pool.completed == 1
+
+def test_broken_pool_is_replaced_once_and_shut_down():
+    pool = InferencePool(workers=1, queue_size=8)
+    created = []
+
+    def create_executor():
+        executor = ProcessPoolExecutor(max_workers=1)
+        created.append(executor)
+        return executor
+
+    pool._create_executor = create_executor
+
+    async def run():
+        return await asyncio.gather(*[pool.submit(crash) for _ in range(4)], return_exceptions=True)
+
+    try:
+        results = asyncio.run(run())
+        assert all(isinstance(result, BrokenProcessPool) for result in results)
+        # The first executor plus exactly one replacement
+        assert len(created) == 2
+        assert pool.executor is created[1]
+        assert created[0]._shutdown_thread
+        assert asyncio.run(pool.submit(slow_task, 0)) == 0
+    finally:
+        for executor in created:
+            executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,30 @@
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateIndex
+
+from app.database.models import Product, stock_ratio
+
+def compile_sql(clause):
+    return " ".join(str(clause.compile(dialect=postgresql.dialect())).split())
+
+def low_stock_index():
+    [index] = [index for index in Product.__table__.indexes if index.name == "ix_products_low_stock_severity"]
+    return index
+
+def test_stock_ratio_cannot_divide_by_zero():
+    sql = compile_sql(stock_ratio)
+
+    assert sql == (
+        "CAST(products.current_stock AS FLOAT) / CAST(nullif(greatest(coalesce(products.reorder_point, "
+        "products.min_stock_level), products.min_stock_level), %(nullif_1)s) AS FLOAT)"
+    )
+
+def test_index_matches_the_query_expression_and_keeps_its_predicate():
+    sql = compile_sql(CreateIndex(low_stock_index()))
+
+    # The planner only uses the index for the exact expression the query sorts on
+    ratio = compile_sql(stock_ratio).replace("products.", "").replace("%(nullif_1)s", "0")
+    assert f"ON products (({ratio}), id)" in sql
+    assert sql.endswith(
+        "WHERE current_stock <= greatest(coalesce(reorder_point, min_stock_level), min_stock_level) "
+        "AND greatest(coalesce(reorder_point, min_stock_level), min_stock_level) > 0"
+    )
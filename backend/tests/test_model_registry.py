@@ -0,0 +1,90 @@
+import os
+
+import joblib
+import pytest
+
+from app.models.registry import ModelRegistry, ModelNotFoundError
+
+def write_model(model_path, product_id, payload, mtime_ns=None):
+    """Dump a stand-in Prophet artifact and return its size on disk."""
+    path = model_path / f"prophet_model_{product_id}.json"
+    joblib.dump(payload, path)
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+    return path.stat().st_size
+
+def test_evicts_least_recently_used_by_bytes(tmp_path):
+    sizes = {product_id: write_model(tmp_path, product_id, [product_id] * 200) for product_id in "ABC"}
+    registry = ModelRegistry(tmp_path, max_bytes=sizes["A"] + sizes["B"])
+
+    registry.prophet_model("A")
+    registry.prophet_model("B")
+    registry.prophet_model("A")  # B is now least recently used
+    registry.prophet_model("C")
+
+    assert list(registry.entries) == ["prophet_model_A.json", "prophet_model_C.json"]
+    assert registry.resident_bytes == sizes["A"] + sizes["C"]
+    assert registry.stats()["evictions"] == 1
+
+def test_most_recent_model_is_kept_even_over_budget(tmp_path):
+    size = write_model(tmp_path, "A", list(range(1000)))
+    registry = ModelRegistry(tmp_path, max_bytes=size // 2)
+
+    assert registry.prophet_model("A") == list(range(1000))
+    assert registry.resident_bytes == size
+
+def test_reloads_when_the_file_changes(tmp_path):
+    write_model(tmp_path, "A", "first", mtime_ns=1_000_000_000)
+    registry = ModelRegistry(tmp_path, max_bytes=10 ** 6)
+    assert registry.prophet_model("A") == "first"
+    assert registry.prophet_model("A") == "first"
+
+    write_model(tmp_path, "A", "second", mtime_ns=2_000_000_000)
+
+    assert registry.prophet_model("A") == "second"
+    assert len(registry.entries) == 1
+    assert registry.stats()["loads"] == 2
+
+def test_missing_product_raises_model_not_found(tmp_path):
+    registry = ModelRegistry(tmp_path, max_bytes=10 ** 6)
+
+    with pytest.raises(ModelNotFoundError) as error:
+        registry.prophet_model("NOPE")
+    assert error.value.product_id == "NOPE"
+    with pytest.raises(ModelNotFoundError):
+        registry.model_version("NOPE")
+    assert registry.feature_model("NOPE") is None
+    assert registry.model_versions(["NOPE"]) == {}
+
+def test_model_version_changes_when_rewritten(tmp_path):
+    write_model(tmp_path, "A", "first", mtime_ns=1_000_000_000)
+    write_model(tmp_path, "B", "other", mtime_ns=1_000_000_000)
+    registry = ModelRegistry(tmp_path, max_bytes=10 ** 6, scan_ttl=0)
+    before = registry.model_version("A")
+    other = registry.model_version("B")
+    assert registry.model_version("A") == before
+    assert registry.model_versions(["A", "B"]) == {"A": before, "B": other}
+
+    write_model(tmp_path, "A", "second", mtime_ns=2_000_000_000)
+
+    assert registry.model_version("A") != before
+    assert registry.model_version("B") == other
+    assert registry.model_versions(["A", "B"]) == {"A": registry.model_version("A"), "B": other}
+
+def test_stats_report_hits_misses_and_resident_bytes(tmp_path):
+    sizes = [write_model(tmp_path, product_id, product_id) for product_id in "AB"]
+    registry = ModelRegistry(tmp_path, max_bytes=10 ** 6)
+
+    registry.prophet_model("A")
+    registry.prophet_model("A")
+    registry.prophet_model("A")
+    registry.prophet_model("B")
+    stats = registry.stats()
+
+    assert (stats["hits"], stats["misses"], stats["loads"]) == (2, 2, 2)
+    assert stats["hit_rate"] == 0.5
+    assert stats["resident_models"] == 2
+    assert stats["resident_bytes"] == sum(sizes)
+
+    registry.clear()
+    assert registry.stats()["resident_bytes"] == 0
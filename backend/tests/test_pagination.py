@@ -0,0 +1,44 @@
+import base64
+import importlib.util
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+from fastapi import HTTPException
+
+# Loaded by path: importing it through app.api pulls in the routers, which
+# connect to the database at import time
+spec = importlib.util.spec_from_file_location(
+    "pagination", Path(__file__).parent.parent / "app" / "api" / "pagination.py"
+)
+pagination = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(pagination)
+encode_cursor, decode_cursor = pagination.encode_cursor, pagination.decode_cursor
+
+def test_transaction_cursor_round_trip():
+    created_at = datetime(2025, 5, 1, 13, 45, 12, 123456)
+    cursor = encode_cursor(created_at, 42)
+    assert decode_cursor(cursor, datetime, int) == (created_at, 42)
+
+def test_low_stock_cursor_round_trip():
+    cursor = encode_cursor(0.25, "PRD-001")
+    assert decode_cursor(cursor, float, str) == (0.25, "PRD-001")
+
+def test_cursor_is_url_safe_and_unpadded():
+    cursor = encode_cursor(datetime(2025, 5, 1), 1, "??>>")
+    assert "=" not in cursor
+    assert set(cursor) <= set("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_")
+
+@pytest.mark.parametrize("cursor", [
+    "not a cursor!",
+    base64.urlsafe_b64encode(b"{not json").decode(),
+    base64.urlsafe_b64encode(b"42").decode(),
+    base64.urlsafe_b64encode(b'["2025-05-01T00:00:00"]').decode(),
+    base64.urlsafe_b64encode(b'["yesterday", 1]').decode(),
+    base64.urlsafe_b64encode(b'["2025-05-01T00:00:00", "one"]').decode(),
+    base64.urlsafe_b64encode(b"\xff\xfe").decode(),
+])
+def test_malformed_cursor_is_a_400(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor, datetime, int)
+    assert error.value.status_code == 400
@@ -0,0 +1,173 @@
+import asyncio
+import time
+
+import pytest
+
+from app.services.cache import LocalLRUCache, ReadCache, PRODUCT_LISTS_TAG
+
+def test_lru_evicts_least_recently_used():
+    cache = LocalLRUCache(max_entries=2)
+    cache.set("a", "1", ttl=60)
+    cache.set("b", "2", ttl=60)
+    assert cache.get("a") == "1"  # a is now the most recently used
+    cache.set("c", "3", ttl=60)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    assert cache.get("c") == "3"
+
+def test_expired_entries_are_misses():
+    cache = LocalLRUCache(max_entries=2)
+    cache.set("a", "1", ttl=-1)
+    assert cache.get("a") is None
+    assert "a" not in cache.entries
+
+def test_tag_invalidation_drops_every_tagged_key():
+    cache = LocalLRUCache(max_entries=10)
+    cache.set("products:0:100", "[]", ttl=60, tags=[PRODUCT_LISTS_TAG])
+    cache.set("inventory-status", "[]", ttl=60, tags=[PRODUCT_LISTS_TAG])
+    cache.set("product:PRD001", "{}", ttl=60)
+
+    cache.invalidate(tags=[PRODUCT_LISTS_TAG])
+
+    assert cache.get("products:0:100") is None
+    assert cache.get("inventory-status") is None
+    assert cache.get("product:PRD001") == "{}"
+    assert PRODUCT_LISTS_TAG not in cache.tags
+
+def test_read_cache_without_redis_uses_local_lru():
+    cache = ReadCache(redis_url=None, max_local_entries=10)
+    loads = []
+
+    def loader(value):
+        async def load():
+            loads.append(value)
+            return value
+        return load
+
+    async def run():
+        product = await cache.get_or_load("product:PRD001", loader({"id": "PRD001", "current_stock": 5}))
+        listing = await cache.get_or_load("products:0:100", loader([{"id": "PRD001"}]), tags=[PRODUCT_LISTS_TAG])
+        cached = (
+            await cache.get_or_load("product:PRD001", loader(None)),
+            await cache.get_or_load("products:0:100", loader(None), tags=[PRODUCT_LISTS_TAG]),
+        )
+        await cache.invalidate_product("PRD001")
+        reloaded = (
+            await cache.get_or_load("product:PRD001", loader({"id": "PRD001", "current_stock": 4})),
+            await cache.get_or_load("products:0:100", loader([]), tags=[PRODUCT_LISTS_TAG]),
+        )
+        return product, listing, cached, reloaded
+
+    product, listing, cached, reloaded = asyncio.run(run())
+
+    assert cached == (product, listing)
+    assert reloaded == ({"id": "PRD001", "current_stock": 4}, [])
+    assert len(loads) == 4
+    assert cache.stats()["backend"] == "local"
+    assert cache.hits == 2 and cache.misses == 4
+
+def test_load_racing_an_invalidation_is_not_served():
+    cache = ReadCache(redis_url=None)
+
+    async def run():
+        async def stale_load():
+            # The row changes and is invalidated while this read is in flight
+            await cache.invalidate_product("PRD001")
+            return {"current_stock": 5}
+
+        async def fresh_load():
+            return {"current_stock": 4}
+
+        first = await cache.get_or_load("product:PRD001", stale_load)
+        second = await cache.get_or_load("product:PRD001", fresh_load)
+        third = await cache.get_or_load("product:PRD001", stale_load)
+        return first, second, third
+
+    assert asyncio.run(run()) == ({"current_stock": 5}, {"current_stock": 4}, {"current_stock": 4})
+
+def test_load_errors_are_not_cached():
+    cache = ReadCache(redis_url=None)
+
+    async def run():
+        async def missing():
+            raise LookupError("no such product")
+
+        try:
+            await cache.get_or_load("product:NOPE", missing)
+        except LookupError:
+            pass
+        return await cache.get("product:NOPE")
+
+    assert asyncio.run(run()) is None
+    assert cache.local.entries == {}
+
+def test_get_many_reports_only_cached_keys():
+    cache = ReadCache(redis_url=None)
+
+    async def run():
+        await cache.set_many({"a": 1, "b": 2})
+        return await cache.get_many(["a", "b", "c"])
+
+    assert asyncio.run(run()) == {"a": 1, "b": 2}
+
+def test_unreachable_redis_falls_back_to_local():
+    # Nothing listens on port 1, so the first command fails fast
+    cache = ReadCache(redis_url="redis://127.0.0.1:1/0", retry_seconds=30)
+
+    async def run():
+        await cache.set("product:PRD001", {"id": "PRD001"})
+        value = await cache.get("product:PRD001")
+        await cache.invalidate_product("PRD001")
+        await cache.close()
+        return value
+
+    assert asyncio.run(run()) == {"id": "PRD001"}
+    assert cache.redis_errors == 1
+    # Queued for Redis, since the local LRU could not clear it there
+    assert cache.stats()["pending_invalidations"] == 2
+    assert cache.stats()["backend"] == "local"
+
+def test_invalidations_during_an_outage_reach_redis_on_recovery():
+    fakeredis = pytest.importorskip("fakeredis")
+    cache = ReadCache(redis_url=None)
+    cache.redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+
+    async def load_v1():
+        return {"current_stock": 5}
+
+    async def load_v2():
+        return {"current_stock": 4}
+
+    async def run():
+        await cache.get_or_load("product:PRD001", load_v1)
+        # Redis goes away for a while; the stock change is invalidated meanwhile
+        cache.redis_down_until = time.monotonic() + 30
+        await cache.invalidate_product("PRD001")
+        pending = cache.stats()["pending_invalidations"]
+        cache.redis_down_until = 0.0
+        value = await cache.get_or_load("product:PRD001", load_v2)
+        await cache.close()
+        return pending, value
+
+    pending, value = asyncio.run(run())
+
+    assert pending == 2
+    assert value == {"current_stock": 4}
+    assert cache.stats()["pending_invalidations"] == 0
+
+def test_evicted_and_expired_keys_leave_their_tags():
+    cache = LocalLRUCache(max_entries=2)
+    cache.set("a", "1", ttl=60, tags=[PRODUCT_LISTS_TAG])
+    cache.set("b", "2", ttl=-1, tags=[PRODUCT_LISTS_TAG])
+    assert cache.get("b") is None
+    assert cache.tags[PRODUCT_LISTS_TAG] == {"a"}
+
+    for i in range(10):
+        cache.set(f"list:{i}", "[]", ttl=60, tags=[PRODUCT_LISTS_TAG])
+
+    assert len(cache.entries) == 2
+    assert cache.tags[PRODUCT_LISTS_TAG] == {"list:8", "list:9"}
+
+    cache.invalidate(keys=["list:8", "list:9"])
+    assert cache.tags == {}
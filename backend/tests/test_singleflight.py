@@ -0,0 +1,102 @@
+import asyncio
+
+import pytest
+
+from app.services.singleflight import SingleFlight
+
+CALLERS = 20
+
+def test_concurrent_identical_calls_run_once():
+    flights = SingleFlight()
+    calls = {"count": 0}
+
+    async def forecast(product_id):
+        calls["count"] += 1
+        # Stay in flight until every caller has joined
+        await asyncio.sleep(0.05)
+        return {"product_id": product_id, "predicted_demand": [1.0, 2.0]}
+
+    async def run():
+        return await asyncio.gather(*[
+            flights.do(("PRD001", 30), forecast, "PRD001") for _ in range(CALLERS)
+        ])
+
+    results = asyncio.run(run())
+
+    assert calls["count"] == 1
+    assert all(result is results[0] for result in results)
+    assert flights.stats() == {"in_flight": 0, "executed": 1, "coalesced": CALLERS - 1}
+
+def test_different_keys_run_separately():
+    flights = SingleFlight()
+    calls = []
+
+    async def forecast(product_id):
+        calls.append(product_id)
+        await asyncio.sleep(0.01)
+        return product_id
+
+    async def run():
+        return await asyncio.gather(
+            flights.do("PRD001", forecast, "PRD001"),
+            flights.do("PRD002", forecast, "PRD002"),
+            flights.do("PRD001", forecast, "PRD001"),
+        )
+
+    assert asyncio.run(run()) == ["PRD001", "PRD002", "PRD001"]
+    assert sorted(calls) == ["PRD001", "PRD002"]
+
+def test_exception_reaches_every_waiter():
+    flights = SingleFlight()
+    calls = {"count": 0}
+
+    async def failing():
+        calls["count"] += 1
+        await asyncio.sleep(0.01)
+        raise RuntimeError("model failed")
+
+    async def run():
+        return await asyncio.gather(
+            *[flights.do("PRD001", failing) for _ in range(CALLERS)],
+            return_exceptions=True
+        )
+
+    results = asyncio.run(run())
+
+    assert calls["count"] == 1
+    assert len(results) == CALLERS
+    assert all(isinstance(result, RuntimeError) and str(result) == "model failed" for result in results)
+
+def test_key_is_released_after_completion():
+    flights = SingleFlight()
+    calls = {"count": 0}
+
+    async def forecast():
+        calls["count"] += 1
+        return calls["count"]
+
+    async def run():
+        first = await flights.do("PRD001", forecast)
+        second = await flights.do("PRD001", forecast)
+        return first, second
+
+    # Results are not cached: a call after the first finished runs again
+    assert asyncio.run(run()) == (1, 2)
+
+def test_cancelled_caller_does_not_cancel_shared_work():
+    flights = SingleFlight()
+
+    async def forecast():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def run():
+        leaving = asyncio.ensure_future(flights.do("PRD001", forecast))
+        staying = asyncio.ensure_future(flights.do("PRD001", forecast))
+        await asyncio.sleep(0)
+        leaving.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leaving
+        return await staying
+
+    assert asyncio.run(run()) == "done"
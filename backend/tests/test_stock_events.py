@@ -0,0 +1,69 @@
+import asyncio
+import json
+
+from app.services.events import StockEventBroker
+
+def event(i):
+    return {"id": i, "product_id": "PRD001", "type": "shipped", "quantity": 1, "new_stock": 100 - i, "at": "2025-05-01T00:00:00"}
+
+def test_every_subscriber_receives_events_in_order():
+    async def run():
+        broker = StockEventBroker(backend="local", queue_size=8)
+        first, second = broker.subscribe(), broker.subscribe()
+        await broker.publish([event(1), event(2)])
+        received = []
+        for subscription in (first, second):
+            received.append([json.loads(await subscription.next(timeout=1))["id"] for _ in range(2)])
+        return broker, received
+
+    broker, received = asyncio.run(run())
+
+    assert received == [[1, 2], [1, 2]]
+    assert broker.stats()["published"] == 2
+
+def test_slow_subscriber_is_dropped_without_affecting_others():
+    async def run():
+        broker = StockEventBroker(backend="local", queue_size=2)
+        slow, fast = broker.subscribe(), broker.subscribe()
+        received = []
+        for i in range(5):
+            await broker.publish([event(i)])
+            # The fast client keeps up; the slow one never reads
+            received.append(json.loads(await fast.next(timeout=1))["id"])
+        return broker, slow, fast, received
+
+    broker, slow, fast, received = asyncio.run(run())
+
+    assert received == [0, 1, 2, 3, 4]
+    assert slow.dropped
+    assert slow not in broker.subscribers
+    assert fast in broker.subscribers and not fast.dropped
+    assert broker.stats()["dropped_subscribers"] == 1
+
+def test_dropped_subscriber_stops_receiving():
+    async def run():
+        broker = StockEventBroker(backend="local", queue_size=1)
+        subscription = broker.subscribe()
+        await broker.publish([event(1), event(2)])
+        # Dropped clients get None even though a payload is still queued
+        return await subscription.next(timeout=1)
+
+    assert asyncio.run(run()) is None
+
+def test_next_times_out_without_events():
+    async def run():
+        broker = StockEventBroker(backend="local", queue_size=1)
+        subscription = broker.subscribe()
+        return await subscription.next(timeout=0.01), subscription.dropped
+
+    assert asyncio.run(run()) == (None, False)
+
+def test_unsubscribed_clients_get_nothing():
+    async def run():
+        broker = StockEventBroker(backend="local", queue_size=1)
+        subscription = broker.subscribe()
+        broker.unsubscribe(subscription)
+        await broker.publish([event(1)])
+        return subscription.queue.qsize(), broker.stats()["subscribers"]
+
+    assert asyncio.run(run()) == (0, 0)
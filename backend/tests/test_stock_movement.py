@@ -0,0 +1,90 @@
+import asyncio
+import re
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.database.models import TransactionType
+from app.services.stock import build_stock_movement, stock_delta, apply_stock_movements_batch
+
+def compile_movement(transaction_type, quantity):
+    compiled = build_stock_movement("PRD001", transaction_type, quantity).compile(dialect=postgresql.dialect())
+    return " ".join(str(compiled).split()), compiled.params
+
+def param(sql, params, pattern):
+    """Value bound to the placeholder captured by ``pattern``."""
+    match = re.search(pattern, sql)
+    assert match, f"{pattern} not in {sql}"
+    return params[match.group(1)]
+
+@pytest.mark.parametrize("transaction_type, quantity, delta", [
+    (TransactionType.SHIPPED, 5, -5),
+    (TransactionType.RECEIVED, 5, 5),
+    (TransactionType.ADJUSTED, -3, -3),
+])
+def test_stock_delta(transaction_type, quantity, delta):
+    assert stock_delta(transaction_type, quantity) == delta
+
+def test_update_rejects_negative_resulting_stock():
+    sql, params = compile_movement(TransactionType.SHIPPED, 5)
+
+    # The guard sits in the UPDATE's WHERE clause, so a shipment that would
+    # take stock below zero matches no row and writes nothing
+    guard = r"WHERE products\.id = %\(\w+\)s AND coalesce\(products\.current_stock, %\(\w+\)s\) \+ %\((\w+)\)s >= %\(\w+\)s"
+    guard_floor = r"coalesce\(products\.current_stock, %\(\w+\)s\) \+ %\(\w+\)s >= %\((\w+)\)s"
+    assert param(sql, params, guard) == -5
+    assert param(sql, params, guard_floor) == 0
+    assert param(sql, params, r"WHERE products\.id = %\((\w+)\)s") == "PRD001"
+    assert param(sql, params, r"SET current_stock=\(coalesce\(products\.current_stock, %\(\w+\)s\) \+ %\((\w+)\)s\)") == -5
+
+def test_null_stock_counts_as_zero():
+    sql, params = compile_movement(TransactionType.RECEIVED, 5)
+
+    # Same rule as apply_stock_movements_batch: NULL stock is no stock, so a
+    # receipt succeeds and a shipment is rejected on either path
+    for pattern in [r"SET current_stock=\(coalesce\(products\.current_stock, %\((\w+)\)s\)",
+                    r"AND coalesce\(products\.current_stock, %\((\w+)\)s\)"]:
+        assert param(sql, params, pattern) == 0
+
+def test_ledger_row_is_inserted_from_the_update():
+    sql, params = compile_movement(TransactionType.RECEIVED, 7)
+
+    assert sql.startswith("WITH stock_update AS (UPDATE products")
+    assert "RETURNING products.current_stock AS new_stock" in sql
+    assert "INSERT INTO inventory_transactions" in sql
+    # No row from the UPDATE means no ledger row
+    assert "FROM stock_update" in sql
+    # previous_stock is derived from the updated value, not read separately
+    assert param(sql, params, r"stock_update\.new_stock - %\((\w+)\)s") == 7
+
+class BatchSession:
+    """Answers the batch's locking SELECT with fixed stock levels and records every statement."""
+
+    def __init__(self, stock):
+        self.stock = stock
+        self.statements = []
+
+    async def execute(self, statement, *args):
+        self.statements.append(" ".join(str(statement.compile(dialect=postgresql.dialect())).split()))
+        if len(self.statements) == 1:
+            return [SimpleNamespace(id=product_id, current_stock=stock) for product_id, stock in self.stock.items()]
+
+    async def scalars(self, statement, rows):
+        self.statements.append("INSERT")
+        return SimpleNamespace(all=lambda: [SimpleNamespace(**row) for row in rows])
+
+def test_batch_reads_null_stock_as_zero():
+    # The database returns 0 for a NULL current_stock through the coalesce
+    db = BatchSession({"PRD001": 0})
+    movements = [
+        {"product_id": "PRD001", "transaction_type": TransactionType.SHIPPED, "quantity": 1},
+        {"product_id": "PRD001", "transaction_type": TransactionType.RECEIVED, "quantity": 5},
+    ]
+
+    results = asyncio.run(apply_stock_movements_batch(db, movements))
+
+    assert db.statements[0].startswith("SELECT products.id, coalesce(products.current_stock, %(coalesce_1)s) AS current_stock")
+    assert db.statements[0].endswith("FOR UPDATE")
+    assert results[0] == {"error": "Insufficient stock. Current stock: 0"}
+    assert results[1]["transaction"].new_stock == 5
@@ -5,16 +5,19 @@ sys.path.append(str(Path(__file__).parent.parent))
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
+import argparse
 import logging
 from models.predict import DemandPredictor
+from models.intervals import INTERVAL_MODES
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 class InventoryAdvisor:
-    def __init__(self, model_path="models/saved", data_path="data/processed"):
-        self.predictor = DemandPredictor(model_path=model_path, data_path=data_path)
+    def __init__(self, model_path="models/saved", data_path="data/processed", interval_mode="sampled"):
+        # Only the interval width is used, so the fast interval modes are a close substitute for sampling
+        self.predictor = DemandPredictor(model_path=model_path, data_path=data_path, interval_mode=interval_mode)
         self.current_stock_path = Path("data/current_stock.csv")
         self.lead_time_days = 7  # Supplier lead time
         self.safety_stock_days = 5  # Days of extra stock as buffer
@@ -54,8 +57,63 @@ class InventoryAdvisor:
         
         return int(round(order_qty))
     
-    def generate_advice(self):
-        """Generate comprehensive inventory advice."""
+    def calculate_advice_vectorized(self, product_ids, predictions, current_stock):
+        """
+        Same advice as the per-product loop, computed with array operations.
+
+        Builds (products x days) matrices of demand and prediction uncertainty
+        and derives every column for all products at once.
+        """
+        demand = np.vstack([predictions[product_id]['combined_prediction'].to_numpy() for product_id in product_ids])
+        uncertainty = np.vstack([
+            (predictions[product_id]['prophet_upper'] - predictions[product_id]['prophet_lower']).to_numpy()
+            for product_id in product_ids
+        ])
+        stock = np.array([current_stock.get(product_id, 0) for product_id in product_ids])
+        window = self.lead_time_days + self.safety_stock_days
+
+        reorder_point = demand[:, :window].sum(axis=1) + uncertainty[:, :window].mean(axis=1) * 0.5
+        order_qty = np.round(
+            np.clip(np.maximum(0, reorder_point - stock), self.min_order_quantity, self.max_order_quantity)
+        ).astype(int)
+        daily_demand = demand.mean(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            days_of_stock = np.where(daily_demand > 0, stock / daily_demand, np.inf)
+        ordering = order_qty > 0
+        urgency = np.where(ordering, np.where(days_of_stock < self.lead_time_days, "HIGH", "MEDIUM"), "LOW")
+
+        ids = pd.Series(product_ids)
+        stock_text = pd.Series(stock).astype(str)
+        advice_df = pd.DataFrame({
+            'product_id': product_ids,
+            'current_stock': stock,
+            'reorder_point': reorder_point.astype(int),
+            'order_quantity': order_qty,
+            'days_of_stock': np.round(days_of_stock, 1),
+            'urgency': urgency,
+            'advice': np.where(
+                ordering,
+                "Order " + pd.Series(order_qty).astype(str) + " units of " + ids,
+                "No immediate order needed for " + ids
+            ),
+            'reason': np.where(
+                ordering,
+                "Current stock (" + stock_text + ") is below reorder point ("
+                + pd.Series(reorder_point.astype(int)).astype(str) + ")",
+                "Current stock (" + stock_text + ") is sufficient"
+            ),
+            'avg_daily_demand': np.round(daily_demand, 1),
+            'prediction_confidence': np.round(uncertainty.mean(axis=1), 1)
+        })
+        return advice_df
+
+    def generate_advice(self, mode="loop"):
+        """
+        Generate comprehensive inventory advice.
+
+        ``mode="vectorized"`` computes the advice for all products with array
+        operations instead of per-product Python logic; results are the same.
+        """
         try:
             # Load models and data
             self.predictor.load_models()
@@ -67,56 +125,20 @@ class InventoryAdvisor:
                 days_ahead=self.lead_time_days + self.safety_stock_days + 30  # Extra days for analysis
             )
             
-            advice_list = []
-            for product_id, pred_df in predictions.items():
-                # Calculate reorder point
-                reorder_point = self.calculate_reorder_point(pred_df)
-                current_stock_level = current_stock.get(product_id, 0)
-                
-                # Calculate order quantity
-                order_qty = self.calculate_order_quantity(reorder_point, current_stock_level)
-                
-                # Calculate stock coverage (days of stock remaining)
-                daily_demand = pred_df['combined_prediction'].mean()
-                days_of_stock = current_stock_level / daily_demand if daily_demand > 0 else float('inf')
-                
-                # Generate advice
-                if order_qty > 0:
-                    urgency = "HIGH" if days_of_stock < self.lead_time_days else "MEDIUM"
-                    advice = f"Order {order_qty} units of {product_id}"
-                    reason = f"Current stock ({current_stock_level}) is below reorder point ({int(reorder_point)})"
-                else:
-                    urgency = "LOW"
-                    advice = f"No immediate order needed for {product_id}"
-                    reason = f"Current stock ({current_stock_level}) is sufficient"
-                
-                advice_list.append({
-                    'product_id': product_id,
-                    'current_stock': current_stock_level,
-                    'reorder_point': int(reorder_point),
-                    'order_quantity': order_qty,
-                    'days_of_stock': round(days_of_stock, 1),
-                    'urgency': urgency,
-                    'advice': advice,
-                    'reason': reason,
-                    'avg_daily_demand': round(daily_demand, 1),
-                    'prediction_confidence': round(
-                        (pred_df['prophet_upper'] - pred_df['prophet_lower']).mean(),
-                        1
-                    )
-                })
-            
-            # Convert to DataFrame and save
-            advice_df = pd.DataFrame(advice_list)
+            if mode == "vectorized":
+                advice_df = self.calculate_advice_vectorized(list(predictions), predictions, current_stock)
+            else:
+                advice_df = self.calculate_advice_loop(predictions, current_stock)
             advice_df.to_csv(self.predictor.model_path / "inventory_advice.csv", index=False)
             
             # Generate summary
+            urgency_counts = advice_df['urgency'].value_counts()
             summary = {
                 'total_products': len(advice_df),
-                'products_to_order': len(advice_df[advice_df['order_quantity'] > 0]),
-                'high_urgency': len(advice_df[advice_df['urgency'] == 'HIGH']),
-                'medium_urgency': len(advice_df[advice_df['urgency'] == 'MEDIUM']),
-                'low_urgency': len(advice_df[advice_df['urgency'] == 'LOW']),
+                'products_to_order': int((advice_df['order_quantity'] > 0).sum()),
+                'high_urgency': int(urgency_counts.get('HIGH', 0)),
+                'medium_urgency': int(urgency_counts.get('MEDIUM', 0)),
+                'low_urgency': int(urgency_counts.get('LOW', 0)),
                 'total_order_quantity': advice_df['order_quantity'].sum(),
                 'avg_days_of_stock': advice_df['days_of_stock'].mean()
             }
@@ -134,9 +156,57 @@ class InventoryAdvisor:
             logger.error(f"Error generating inventory advice: {e}")
             raise
 
+    def calculate_advice_loop(self, predictions, current_stock):
+        """Per-product advice, one forecast at a time."""
+        advice_list = []
+        for product_id, pred_df in predictions.items():
+            # Calculate reorder point
+            reorder_point = self.calculate_reorder_point(pred_df)
+            current_stock_level = current_stock.get(product_id, 0)
+            
+            # Calculate order quantity
+            order_qty = self.calculate_order_quantity(reorder_point, current_stock_level)
+            
+            # Calculate stock coverage (days of stock remaining)
+            daily_demand = pred_df['combined_prediction'].mean()
+            days_of_stock = current_stock_level / daily_demand if daily_demand > 0 else float('inf')
+            
+            # Generate advice
+            if order_qty > 0:
+                urgency = "HIGH" if days_of_stock < self.lead_time_days else "MEDIUM"
+                advice = f"Order {order_qty} units of {product_id}"
+                reason = f"Current stock ({current_stock_level}) is below reorder point ({int(reorder_point)})"
+            else:
+                urgency = "LOW"
+                advice = f"No immediate order needed for {product_id}"
+                reason = f"Current stock ({current_stock_level}) is sufficient"
+            
+            advice_list.append({
+                'product_id': product_id,
+                'current_stock': current_stock_level,
+                'reorder_point': int(reorder_point),
+                'order_quantity': order_qty,
+                'days_of_stock': round(days_of_stock, 1),
+                'urgency': urgency,
+                'advice': advice,
+                'reason': reason,
+                'avg_daily_demand': round(daily_demand, 1),
+                'prediction_confidence': round(
+                    (pred_df['prophet_upper'] - pred_df['prophet_lower']).mean(),
+                    1
+                )
+            })
+        
+        return pd.DataFrame(advice_list)
+
 def main():
-    advisor = InventoryAdvisor()
-    advice_df, summary = advisor.generate_advice()
+    parser = argparse.ArgumentParser(description="Generate inventory advice for all products")
+    parser.add_argument("--mode", choices=["loop", "vectorized"], default="loop")
+    parser.add_argument("--intervals", choices=INTERVAL_MODES, default="sampled", help="How prediction intervals are computed")
+    args = parser.parse_args()
+
+    advisor = InventoryAdvisor(interval_mode=args.intervals)
+    advice_df, summary = advisor.generate_advice(mode=args.mode)
     
     # Print summary
     logger.info("\nInventory Advice Summary:")
@@ -0,0 +1,295 @@
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import lru_cache
+import argparse
+import hashlib
+import logging
+import os
+import time
+from datetime import timedelta
+from models.train import train_product
+from models.prophet_batch import ProphetBatch
+from models.global_model import GlobalDemandModel, load_categories
+from models.statistical import StatisticalForecaster, route_products
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+ENGINES = ["prophet", "global", "statistical", "routed"]
+# Same blend as DemandPredictor
+PROPHET_WEIGHT = 0.7
+FEATURE_WEIGHT = 0.3
+
+def cpu_seconds():
+    """CPU time of this process and its finished children (Prophet fits run cmdstan as a child)."""
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+@lru_cache(maxsize=4)
+def load_fold(path):
+    """A fold's training set, read once per worker process."""
+    return pd.read_pickle(path)
+
+def forecast_frame(product_id, dates, prediction):
+    return pd.DataFrame({'product_id': product_id, 'date': dates, 'prediction': prediction})
+
+def backtest_product(fold_path, product_id, horizon):
+    """Fit the Prophet + RandomForest pair for one product of a fold and forecast ``horizon`` days."""
+    started = cpu_seconds()
+    product_data = load_fold(fold_path)
+    product_data = product_data[product_data['product_id'] == product_id]
+    result = train_product(product_id, product_data)
+    if result['status'] != 'trained':
+        return product_id, None, cpu_seconds() - started, result['error']
+
+    latest = product_data.iloc[-1]
+    dates = pd.date_range(start=latest['date'] + timedelta(days=1), periods=horizon, freq='D')
+    _, yhat = ProphetBatch({product_id: result['prophet_model']}).yhat(dates)
+    features = pd.DataFrame({
+        'day_of_week': dates.dayofweek,
+        'month': dates.month,
+        'year': dates.year,
+        'is_weekend': (dates.dayofweek >= 5).astype(int),
+        'sales_7d_avg': latest['sales_7d_avg'],
+        'stock_to_sales_ratio': latest['stock_to_sales_ratio']
+    })
+    feature_prediction = result['feature_model'].predict(result['scaler'].transform(features))
+    prediction = PROPHET_WEIGHT * yhat[0] + FEATURE_WEIGHT * feature_prediction
+    return product_id, forecast_frame(product_id, dates, prediction), cpu_seconds() - started, None
+
+def backtest_vectorized(fold_path, engine, horizon, products_file=None):
+    """Forecast every product of a fold with one of the cross-product engines."""
+    started = cpu_seconds()
+    train = load_fold(fold_path)
+    if engine == "global":
+        model = GlobalDemandModel().fit(train, load_categories(products_file) if products_file else {})
+        forecasts = model.predict(train, horizon)
+    else:
+        forecasts = StatisticalForecaster().predict(train, horizon)
+    frames = [
+        forecast_frame(product_id, forecast['date'], forecast['combined_prediction'].to_numpy())
+        for product_id, forecast in forecasts.items()
+    ]
+    return pd.concat(frames, ignore_index=True), cpu_seconds() - started
+
+def fold_origins(data, folds, horizon, step=None):
+    """Forecast origins, oldest first; the last fold ends on the latest date."""
+    step = step or horizon
+    last_date = data['date'].max()
+    return [last_date - timedelta(days=horizon + step * (folds - 1 - i)) for i in range(folds)]
+
+def cache_folds(data, origins, cache_dir):
+    """
+    Write each fold's training set to ``cache_dir`` once, keyed by a hash of
+    the data and the origin, so workers read it from disk instead of having
+    it pickled into every task and repeated runs skip the split. Folds
+    cached for other data are deleted, so the cache only ever holds the
+    current data's folds.
+    """
+    cache_dir = Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    data_hash = hashlib.sha1(pd.util.hash_pandas_object(data, index=False).values.tobytes()).hexdigest()[:12]
+    stale = [path for path in cache_dir.glob("fold_*.pkl") if not path.name.startswith(f"fold_{data_hash}_")]
+    for path in stale:
+        path.unlink(missing_ok=True)
+    if stale:
+        logger.info(f"Removed {len(stale)} cached folds of older data from {cache_dir}")
+    paths = []
+    for origin in origins:
+        path = cache_dir / f"fold_{data_hash}_{origin:%Y%m%d%H%M%S}.pkl"
+        if not path.exists():
+            data[data['date'] <= origin].to_pickle(path)
+        paths.append(str(path))
+    return paths
+
+def run_backtest(data, engines, folds, horizon, step=None, workers=1, cache_dir="models/backtest_cache",
+                 products_file=None):
+    """
+    Rolling-origin cross-validation: every engine is refit on each fold's
+    history and scored on the ``horizon`` days after its origin. Folds, and
+    products within a fold for the per-product engine, run in parallel.
+
+    Returns (summary per engine, scores per engine and fold).
+    """
+    origins = fold_origins(data, folds, horizon, step)
+    fold_paths = cache_folds(data, origins, cache_dir)
+    logger.info(
+        f"Backtesting {engines} on {data['product_id'].nunique()} products: {folds} folds, "
+        f"{horizon}-day horizon, origins {origins[0]:%Y-%m-%d} to {origins[-1]:%Y-%m-%d}"
+    )
+
+    results = {}  # engine -> [(forecasts, cpu seconds per product) per fold]
+    summary = []
+    fold_scores = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for engine in [engine for engine in engines if engine != "routed"]:
+            started = time.perf_counter()
+            cpu = 0.0
+            failures = 0
+            if engine == "prophet":
+                fold_products = [
+                    (i, product_id)
+                    for i, path in enumerate(fold_paths)
+                    for product_id in load_fold(path)['product_id'].unique()
+                ]
+                futures = {
+                    executor.submit(backtest_product, fold_paths[i], product_id, horizon): i
+                    for i, product_id in fold_products
+                }
+                frames = [[] for _ in fold_paths]
+                product_cpu = [{} for _ in fold_paths]
+                for future in as_completed(futures):
+                    i = futures[future]
+                    product_id, frame, task_cpu, error = future.result()
+                    cpu += task_cpu
+                    product_cpu[i][product_id] = task_cpu
+                    if frame is None:
+                        failures += 1
+                        logger.error(f"Fold {i} product {product_id} failed: {error}")
+                    else:
+                        frames[i].append(frame)
+                results[engine] = [
+                    (pd.concat(frames[i], ignore_index=True) if frames[i] else None, product_cpu[i])
+                    for i in range(len(fold_paths))
+                ]
+            else:
+                futures = {
+                    executor.submit(backtest_vectorized, path, engine, horizon, products_file): i
+                    for i, path in enumerate(fold_paths)
+                }
+                fold_results = [None] * len(fold_paths)
+                for future in as_completed(futures):
+                    fold_results[futures[future]] = future.result()
+                    cpu += fold_results[futures[future]][1]
+                results[engine] = [(frame, task_cpu) for frame, task_cpu in fold_results]
+            wall = time.perf_counter() - started
+            summary.append(summarize(engine, results[engine], data, origins, horizon, wall, cpu, failures, fold_scores))
+
+    if "routed" in engines and "prophet" in results and "statistical" in results:
+        summary.append(summarize_routed(results, data, origins, horizon, fold_scores))
+    elif "routed" in engines:
+        logger.warning("The routed engine is composed from the prophet and statistical runs; include both")
+
+    return pd.DataFrame(summary), pd.DataFrame(fold_scores)
+
+def fold_actual(data, origin, horizon):
+    return data[(data['date'] > origin) & (data['date'] <= origin + timedelta(days=horizon))]
+
+def summarize(engine, fold_results, data, origins, horizon, wall, cpu, failures, fold_scores):
+    """
+    One summary row for an engine. If no fold produced a forecast the row
+    has no scores, so one failed engine does not end the whole run.
+    """
+    frames = []
+    for i, (frame, _) in enumerate(fold_results):
+        if frame is None:
+            continue
+        frame = frame.assign(fold=i)
+        fold_scores.append({'engine': engine, 'fold': i, 'origin': origins[i],
+                            **score(frame, fold_actual(data, origins[i], horizon).assign(fold=i))})
+        frames.append(frame)
+    if not frames:
+        logger.error(f"{engine} produced no forecasts in any fold ({failures} failed fits); it has no scores")
+        return {
+            'engine': engine,
+            'mae': float('nan'),
+            'wape': float('nan'),
+            'bias': float('nan'),
+            'scored_points': 0,
+            'series': 0,
+            'failed': failures,
+            'wall_seconds': round(wall, 2),
+            'cpu_seconds': round(cpu, 2),
+            'cpu_ms_per_series': float('nan'),
+        }
+    forecasts = pd.concat(frames, ignore_index=True)
+    actual = pd.concat([fold_actual(data, origin, horizon).assign(fold=i) for i, origin in enumerate(origins)])
+    series = forecasts[['fold', 'product_id']].drop_duplicates().shape[0]
+    totals = score(forecasts, actual)
+    return {
+        'engine': engine,
+        **{metric: round(value, 4) for metric, value in totals.items()},
+        'series': series,
+        'failed': failures,
+        'wall_seconds': round(wall, 2),
+        'cpu_seconds': round(cpu, 2),
+        'cpu_ms_per_series': round(1000 * cpu / max(series, 1), 2),
+    }
+
+def score(forecasts, actual):
+    """Scores over all folds, matching each forecast to the actuals of its own fold."""
+    forecasts = forecasts.assign(day=forecasts['date'].dt.normalize())
+    actual = actual.assign(day=actual['date'].dt.normalize())
+    merged = forecasts.merge(actual[['fold', 'product_id', 'day', 'sales_quantity']], on=['fold', 'product_id', 'day'])
+    error = merged['prediction'] - merged['sales_quantity']
+    return {
+        'mae': error.abs().mean(),
+        'wape': error.abs().sum() / max(merged['sales_quantity'].abs().sum(), 1e-9),
+        'bias': error.mean(),
+        'scored_points': len(merged),
+    }
+
+def summarize_routed(results, data, origins, horizon, fold_scores):
+    """
+    The routed engine from the prophet and statistical runs of each fold:
+    Prophet forecasts for the products routed to it (or statistical ones
+    where that fit failed), statistical forecasts for the rest. Its CPU time
+    is the statistical run plus the Prophet fits of routed products.
+    """
+    frames = []
+    cpu = 0.0
+    for i, origin in enumerate(origins):
+        routes = route_products(data[data['date'] <= origin])
+        prophet_ids = {product_id for product_id, engine in routes.items() if engine == "prophet"}
+        prophet_frame, product_cpu = results["prophet"][i]
+        statistical_frame, statistical_cpu = results["statistical"][i]
+        if prophet_frame is not None:
+            prophet_frame = prophet_frame[prophet_frame['product_id'].isin(prophet_ids)]
+            prophet_ids = set(prophet_frame['product_id'])
+        else:
+            # Every Prophet fit of the fold failed; the statistical engine covers all products
+            prophet_ids = set()
+        frame = pd.concat(
+            [prophet_frame, statistical_frame[~statistical_frame['product_id'].isin(prophet_ids)]],
+            ignore_index=True
+        )
+        cpu += statistical_cpu + sum(product_cpu.get(product_id, 0.0) for product_id in prophet_ids)
+        frames.append((frame, None))
+    return summarize("routed", frames, data, origins, horizon, float('nan'), cpu, 0, fold_scores)
+
+def main():
+    parser = argparse.ArgumentParser(description="Rolling-origin backtest of the forecasting engines")
+    parser.add_argument("--data-path", default="data/processed")
+    parser.add_argument("--products-file", default="data/raw/products.csv")
+    parser.add_argument("--engines", nargs="+", choices=ENGINES, default=ENGINES)
+    parser.add_argument("--folds", type=int, default=3)
+    parser.add_argument("--horizon", type=int, default=30, help="Days forecast from each origin")
+    parser.add_argument("--step", type=int, default=None, help="Days between origins (default: the horizon)")
+    parser.add_argument("--workers", type=int, default=1, help="Processes running folds and products")
+    parser.add_argument("--max-products", type=int, default=None)
+    parser.add_argument("--cache-dir", default="models/backtest_cache", help="Where fold training sets are cached")
+    parser.add_argument("--output", default="models/backtest_summary.csv")
+    args = parser.parse_args()
+
+    try:
+        data = pd.read_csv(Path(args.data_path) / "processed_sales.csv", parse_dates=['date'])
+        if args.max_products:
+            data = data[data['product_id'].isin(data['product_id'].unique()[:args.max_products])]
+        summary, fold_scores = run_backtest(
+            data, args.engines, args.folds, args.horizon, args.step, args.workers, args.cache_dir, args.products_file
+        )
+        summary.to_csv(args.output, index=False)
+        fold_scores.to_csv(Path(args.output).with_name(Path(args.output).stem + "_folds.csv"), index=False)
+        logger.info(f"Backtest summary:\n{summary.to_string(index=False)}")
+        logger.info(f"Saved report to {args.output}")
+    except Exception as e:
+        logger.error(f"Error running backtest: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
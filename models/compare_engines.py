@@ -0,0 +1,115 @@
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import pandas as pd
+import argparse
+import logging
+import tempfile
+import time
+from datetime import timedelta
+from models.train import DemandForecaster
+from models.predict import DemandPredictor
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Artifacts each engine needs at serving time
+ENGINE_ARTIFACTS = {
+    "prophet": ["prophet_model_*.json", "feature_model_*.joblib"],
+    "global": ["global_model.joblib"],
+    "routed": ["prophet_model_*.json", "feature_model_*.joblib", "routing.json"],
+}
+ENGINES = list(ENGINE_ARTIFACTS)
+
+def score(predictions, actual):
+    """MAE, WAPE and bias of {product_id: forecast} against the held-out sales."""
+    forecast = pd.concat(
+        [frame.assign(product_id=product_id) for product_id, frame in predictions.items()],
+        ignore_index=True
+    )
+    forecast['day'] = forecast['date'].dt.normalize()
+    actual = actual.assign(day=actual['date'].dt.normalize())
+    merged = forecast.merge(actual[['product_id', 'day', 'sales_quantity']], on=['product_id', 'day'])
+    error = merged['combined_prediction'] - merged['sales_quantity']
+    return {
+        'mae': error.abs().mean(),
+        'wape': error.abs().sum() / merged['sales_quantity'].abs().sum(),
+        'bias': error.mean(),
+        'scored_points': len(merged),
+    }
+
+def compare_engines(data_path, products_file, test_days, workers, max_products=None):
+    """Train each engine on all but the last ``test_days`` days and score them on those days."""
+    data = pd.read_csv(Path(data_path) / "processed_sales.csv", parse_dates=['date'])
+    if max_products:
+        data = data[data['product_id'].isin(data['product_id'].unique()[:max_products])]
+    cutoff = data['date'].max() - timedelta(days=test_days)
+    train, test = data[data['date'] <= cutoff], data[data['date'] > cutoff]
+    logger.info(f"Comparing engines on {data['product_id'].nunique()} products, holding out {test_days} days")
+
+    results = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for engine in ENGINES:
+            # Each engine gets its own directory so artifacts are counted separately
+            model_path = Path(temp_dir) / engine
+            forecaster = DemandForecaster(data_path=data_path, model_path=model_path)
+            forecaster.data = train.copy()
+
+            started = time.perf_counter()
+            if engine == "prophet":
+                forecaster.train_models(workers=workers, incremental=False)
+                forecaster.save_models()
+            elif engine == "routed":
+                forecaster.train_routed_models(workers=workers, incremental=False)
+                if forecaster.models:
+                    forecaster.save_models()
+            else:
+                forecaster.train_global_model(products_file)
+            train_seconds = time.perf_counter() - started
+
+            predictor = DemandPredictor(model_path=model_path, data_path=data_path, engine=engine)
+            predictor.load_models()
+            predictor.latest_data = train.copy()
+            started = time.perf_counter()
+            predictions = predictor.predict_all_products(days_ahead=test_days)
+            predict_seconds = time.perf_counter() - started
+
+            artifacts = [path for pattern in ENGINE_ARTIFACTS[engine] for path in model_path.glob(pattern)]
+            results.append({
+                'engine': engine,
+                'products': len(predictions),
+                'train_seconds': round(train_seconds, 2),
+                'predict_seconds': round(predict_seconds, 3),
+                'products_per_second': round(len(predictions) / predict_seconds, 1),
+                'artifacts': len(artifacts),
+                'artifact_mb': round(sum(path.stat().st_size for path in artifacts) / 1024 ** 2, 2),
+                **{metric: round(value, 4) for metric, value in score(predictions, test).items()}
+            })
+
+    return pd.DataFrame(results)
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare the per-product, global and routed forecasting engines on held-out days"
+    )
+    parser.add_argument("--data-path", default="data/processed")
+    parser.add_argument("--products-file", default="data/raw/products.csv")
+    parser.add_argument("--test-days", type=int, default=30, help="Most recent days held out for scoring")
+    parser.add_argument("--workers", type=int, default=1, help="Processes for per-product training")
+    parser.add_argument("--max-products", type=int, default=None)
+    parser.add_argument("--output", default="models/engine_comparison.csv")
+    args = parser.parse_args()
+
+    try:
+        report = compare_engines(args.data_path, args.products_file, args.test_days, args.workers, args.max_products)
+        report.to_csv(args.output, index=False)
+        logger.info(f"Engine comparison:\n{report.to_string(index=False)}")
+        logger.info(f"Saved report to {args.output}")
+    except Exception as e:
+        logger.error(f"Error comparing engines: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import pandas as pd
+import argparse
+import logging
+import tempfile
+import time
+from datetime import timedelta
+from models.train import DemandForecaster
+from models.predict import DemandPredictor
+from models.intervals import INTERVAL_MODES, DEFAULT_INTERVAL_WIDTH
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def interval_scores(predictions, actual):
+    """Coverage and mean width of the Prophet intervals against the held-out sales."""
+    forecast = pd.concat(
+        [frame.assign(product_id=product_id) for product_id, frame in predictions.items()],
+        ignore_index=True
+    )
+    forecast['day'] = forecast['date'].dt.normalize()
+    forecast['horizon'] = forecast.groupby('product_id').cumcount() + 1
+    actual = actual.assign(day=actual['date'].dt.normalize())
+    merged = forecast.merge(actual[['product_id', 'day', 'sales_quantity']], on=['product_id', 'day'])
+    # The Prophet component's interval is scored against its own point forecast's target
+    covered = (merged['sales_quantity'] >= merged['prophet_lower']) & (merged['sales_quantity'] <= merged['prophet_upper'])
+    first_week = merged['horizon'] <= 7
+    return {
+        'coverage': covered.mean(),
+        'coverage_first_week': covered[first_week].mean(),
+        'coverage_after_first_week': covered[~first_week].mean(),
+        'mean_width': (merged['prophet_upper'] - merged['prophet_lower']).mean(),
+    }
+
+def compare_intervals(data_path, test_days, interval_width, workers, max_products=None):
+    """Train Prophet models on all but the last ``test_days`` days and score each interval mode on those days."""
+    data = pd.read_csv(Path(data_path) / "processed_sales.csv", parse_dates=['date'])
+    if max_products:
+        data = data[data['product_id'].isin(data['product_id'].unique()[:max_products])]
+    cutoff = data['date'].max() - timedelta(days=test_days)
+    train, test = data[data['date'] <= cutoff], data[data['date'] > cutoff]
+    logger.info(
+        f"Comparing interval modes on {data['product_id'].nunique()} products, "
+        f"holding out {test_days} days, target coverage {interval_width:.0%}"
+    )
+
+    results = []
+    with tempfile.TemporaryDirectory() as model_path:
+        forecaster = DemandForecaster(data_path=data_path, model_path=model_path)
+        forecaster.data = train.copy()
+        forecaster.train_models(workers=workers, incremental=False)
+        forecaster.save_models()
+
+        for mode in INTERVAL_MODES:
+            predictor = DemandPredictor(
+                model_path=model_path, data_path=data_path,
+                interval_mode=mode, interval_width=interval_width
+            )
+            predictor.load_models()
+            if mode == "sampled":
+                for model in predictor.models.values():
+                    model.interval_width = interval_width
+            predictor.latest_data = train.copy()
+            started = time.perf_counter()
+            predictions = predictor.predict_all_products(days_ahead=test_days)
+            predict_seconds = time.perf_counter() - started
+
+            results.append({
+                'mode': mode,
+                'products': len(predictions),
+                'predict_seconds': round(predict_seconds, 3),
+                'ms_per_product': round(1000 * predict_seconds / max(len(predictions), 1), 2),
+                **{metric: round(value, 4) for metric, value in interval_scores(predictions, test).items()}
+            })
+
+    return pd.DataFrame(results)
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare Prophet's sampled intervals with the fast analytic and residual-quantile intervals"
+    )
+    parser.add_argument("--data-path", default="data/processed")
+    parser.add_argument("--test-days", type=int, default=30, help="Most recent days held out for scoring")
+    parser.add_argument("--interval-width", type=float, default=DEFAULT_INTERVAL_WIDTH)
+    parser.add_argument("--workers", type=int, default=1, help="Processes for per-product training")
+    parser.add_argument("--max-products", type=int, default=None)
+    parser.add_argument("--output", default="models/interval_comparison.csv")
+    args = parser.parse_args()
+
+    try:
+        report = compare_intervals(args.data_path, args.test_days, args.interval_width, args.workers, args.max_products)
+        report.to_csv(args.output, index=False)
+        logger.info(f"Interval comparison:\n{report.to_string(index=False)}")
+        logger.info(f"Saved report to {args.output}")
+    except Exception as e:
+        logger.error(f"Error comparing intervals: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+import pandas as pd
+import numpy as np
+from sklearn.ensemble import HistGradientBoostingRegressor
+import joblib
+from pathlib import Path
+import logging
+import time
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+GLOBAL_MODEL_FILE = "global_model.joblib"
+MIN_HISTORY_DAYS = 28  # Rows a product needs before its first forecast origin
+MAX_HORIZON_DAYS = 90  # Longer horizons reuse the features of this one
+INTERVAL_WIDTH = 0.8  # Same as Prophet's default interval_width
+PRODUCT_ENCODING_SMOOTHING = 28  # Days of the global mean blended into each product's encoding
+
+FEATURES = [
+    'horizon', 'day_of_week', 'month', 'is_weekend',
+    'last_sales', 'sales_7d_mean', 'sales_28d_mean', 'sales_28d_std',
+    'product_mean', 'same_weekday_sales', 'stock_to_sales_ratio', 'price', 'category',
+    'product_encoding'
+]
+
+def load_categories(products_file):
+    """product_id -> category from the raw products file, empty if it is missing."""
+    try:
+        products = pd.read_csv(products_file)
+        return dict(zip(products['product_id'], products['category']))
+    except FileNotFoundError:
+        logger.warning(f"No products file at {products_file}; training without categories")
+        return {}
+
+class GlobalDemandModel:
+    """
+    One gradient-boosted model forecasting every product.
+
+    Rows are (forecast origin, horizon) pairs: features describe the product's
+    sales up to the origin plus the calendar of the target day, so all
+    products and all days ahead are forecast in a single predict call.
+    Each product's history is put on a daily calendar first, missing days
+    counting as no sales. The product category is a native categorical
+    feature; the product itself is target encoded (its smoothed mean daily
+    sales), since HistGradientBoosting only supports categorical features
+    with up to 255 levels.
+
+    Intervals come from quantiles of the training residuals at each horizon.
+    """
+
+    def __init__(self, max_horizon=MAX_HORIZON_DAYS, interval_width=INTERVAL_WIDTH, random_state=42):
+        self.max_horizon = max_horizon
+        self.interval_width = interval_width
+        self.random_state = random_state
+        self.model = None
+        self.categories = []
+        self.product_categories = {}
+        self.product_encoding = {}  # product_id -> smoothed mean daily sales
+        self.global_mean = 0.0
+        self.residual_quantiles = None  # (max_horizon, 2) residual quantiles per horizon
+
+    @staticmethod
+    def daily_history(data):
+        """
+        Sales sorted by product and date, with one row per calendar day from
+        each product's first row to its last. Missing days get zero sales and
+        the previous day's stock to sales ratio and price, so positional lags
+        stay aligned with dates.
+        """
+        history = data.sort_values(['product_id', 'date'], kind='stable')
+        history = history.drop_duplicates(['product_id', 'date'], keep='last').reset_index(drop=True)
+        spans = history.groupby('product_id', sort=False)['date'].agg(['min', 'max'])
+        lengths = ((spans['max'] - spans['min']).dt.days + 1).to_numpy()
+        if lengths.sum() == len(history):
+            return history
+
+        offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        calendar = pd.DataFrame({
+            'product_id': np.repeat(spans.index.to_numpy(), lengths),
+            'date': np.repeat(spans['min'].to_numpy(), lengths) + offsets * np.timedelta64(1, 'D')
+        })
+        daily = calendar.merge(history, on=['product_id', 'date'], how='left')
+        daily['sales_quantity'] = daily['sales_quantity'].fillna(0.0)
+        carried = ['stock_to_sales_ratio', 'price']
+        daily[carried] = daily.groupby('product_id', sort=False)[carried].ffill()
+        return daily
+
+    def encode_products(self, product_ids):
+        """Target encoding of each product id; products unseen in training get the global mean."""
+        return pd.Series(product_ids).map(self.product_encoding).fillna(self.global_mean).to_numpy(dtype=float)
+
+    def origin_features(self, history, origins, horizons, product_encoding=None):
+        """
+        Feature matrix for forecasting ``horizons`` days after the rows at
+        ``origins`` (positions in ``history``, sorted by product and date).
+        ``product_encoding`` overrides the stored encoding per origin.
+        """
+        sales = history['sales_quantity'].to_numpy(dtype=float)
+        position = history.groupby('product_id', sort=False).cumcount().to_numpy()
+        start = np.arange(len(history)) - position
+
+        # Window sums from cumulative sums; origins always have MIN_HISTORY_DAYS rows behind them
+        csum = np.concatenate([[0.0], np.cumsum(sales)])
+        csum_sq = np.concatenate([[0.0], np.cumsum(sales ** 2)])
+        end = origins + 1
+        mean_7 = (csum[end] - csum[end - 7]) / 7
+        mean_28 = (csum[end] - csum[end - 28]) / 28
+        var_28 = (csum_sq[end] - csum_sq[end - 28]) / 28 - mean_28 ** 2
+        product_mean = (csum[end] - csum[start[origins]]) / (position[origins] + 1)
+
+        # The latest sales on the target's weekday, at or before the origin
+        same_weekday = origins + horizons - 7 * np.ceil(horizons / 7).astype(int)
+
+        target_dates = pd.DatetimeIndex(history['date'].to_numpy()[origins]) + pd.to_timedelta(horizons, unit='D')
+        category_codes = {category: code for code, category in enumerate(self.categories)}
+        product_codes = {
+            product_id: category_codes[category]
+            for product_id, category in self.product_categories.items() if category in category_codes
+        }
+        origin_products = history['product_id'].to_numpy()[origins]
+        category = pd.Series(origin_products).map(product_codes).to_numpy(dtype=float)
+        if product_encoding is None:
+            product_encoding = self.encode_products(origin_products)
+
+        features = pd.DataFrame({
+            'horizon': np.minimum(horizons, self.max_horizon),
+            'day_of_week': target_dates.dayofweek,
+            'month': target_dates.month,
+            'is_weekend': (target_dates.dayofweek >= 5).astype(int),
+            'last_sales': sales[origins],
+            'sales_7d_mean': mean_7,
+            'sales_28d_mean': mean_28,
+            'sales_28d_std': np.sqrt(np.maximum(var_28, 0.0)),
+            'product_mean': product_mean,
+            'same_weekday_sales': sales[same_weekday],
+            'stock_to_sales_ratio': history['stock_to_sales_ratio'].to_numpy(dtype=float)[origins],
+            'price': history['price'].to_numpy(dtype=float)[origins],
+            'category': category,
+            'product_encoding': product_encoding
+        }, columns=FEATURES)
+        return features, target_dates
+
+    def fit(self, data, product_categories=None):
+        """
+        Train on the processed sales of all products.
+
+        Each row is used once as a forecast target, with a horizon drawn
+        uniformly from 1..max_horizon.
+        """
+        started = time.perf_counter()
+        history = self.daily_history(data)
+        products = set(history['product_id'])
+        self.product_categories = {
+            product_id: category for product_id, category in (product_categories or {}).items()
+            if product_id in products
+        }
+        self.categories = sorted(set(self.product_categories.values()))
+
+        rng = np.random.default_rng(self.random_state)
+        position = history.groupby('product_id', sort=False).cumcount().to_numpy()
+        horizons = rng.integers(1, self.max_horizon + 1, size=len(history))
+        targets = np.flatnonzero(position - horizons >= MIN_HISTORY_DAYS - 1)
+        if len(targets) == 0:
+            raise ValueError(f"Products need more than {MIN_HISTORY_DAYS} days of history")
+        horizons = horizons[targets]
+        y = history['sales_quantity'].to_numpy(dtype=float)[targets]
+
+        # Smoothed mean daily sales per product. Training rows leave their own
+        # target out of it, so the encoding does not leak the value it predicts.
+        totals = history.groupby('product_id', sort=False)['sales_quantity'].agg(['sum', 'count'])
+        self.global_mean = float(history['sales_quantity'].mean())
+        prior = PRODUCT_ENCODING_SMOOTHING * self.global_mean
+        self.product_encoding = (
+            (totals['sum'] + prior) / (totals['count'] + PRODUCT_ENCODING_SMOOTHING)
+        ).to_dict()
+        target_totals = totals.loc[history['product_id'].to_numpy()[targets]]
+        leave_one_out = (
+            (target_totals['sum'].to_numpy() - y + prior)
+            / (target_totals['count'].to_numpy() - 1 + PRODUCT_ENCODING_SMOOTHING)
+        )
+
+        X, _ = self.origin_features(history, targets - horizons, horizons, leave_one_out)
+        self.model = HistGradientBoostingRegressor(
+            loss='poisson',
+            learning_rate=0.05,
+            max_iter=300,
+            max_leaf_nodes=31,
+            categorical_features=[column == 'category' for column in FEATURES],
+            early_stopping=False,
+            random_state=self.random_state
+        )
+        self.model.fit(X, y)
+
+        # Residual quantiles per horizon for prediction intervals
+        residuals = y - self.model.predict(X)
+        alpha = (1 - self.interval_width) / 2
+        overall = np.quantile(residuals, [alpha, 1 - alpha])
+        self.residual_quantiles = np.tile(overall, (self.max_horizon, 1))
+        for horizon, group in pd.Series(residuals).groupby(horizons):
+            if len(group) >= 20:
+                self.residual_quantiles[horizon - 1] = np.quantile(group, [alpha, 1 - alpha])
+
+        logger.info(
+            f"Trained global model on {len(targets)} rows from {history['product_id'].nunique()} products "
+            f"in {time.perf_counter() - started:.1f}s"
+        )
+        return self
+
+    def predict(self, data, days_ahead=30, product_ids=None):
+        """
+        Forecast ``days_ahead`` days after each product's last row.
+
+        Returns {product_id: DataFrame} with the columns of
+        DemandPredictor.predict_demand; products with less than
+        MIN_HISTORY_DAYS of history are left out.
+        """
+        if self.model is None:
+            raise ValueError("Model not trained. Call fit() or load() first.")
+
+        if product_ids is not None:
+            data = data[data['product_id'].isin(product_ids)]
+        history = self.daily_history(data)
+        sizes = history.groupby('product_id', sort=False).size()
+        sizes = sizes[sizes >= MIN_HISTORY_DAYS]
+        if sizes.empty:
+            return {}
+        last_rows = history.groupby('product_id', sort=False).cumcount(ascending=False).to_numpy() == 0
+        last_rows = np.flatnonzero(last_rows & history['product_id'].isin(sizes.index).to_numpy())
+
+        horizons = np.tile(np.arange(1, days_ahead + 1), len(last_rows))
+        origins = np.repeat(last_rows, days_ahead)
+        X, target_dates = self.origin_features(history, origins, horizons)
+
+        prediction = np.maximum(self.model.predict(X), 0.0)
+        quantiles = self.residual_quantiles[np.minimum(horizons, self.max_horizon) - 1]
+        lower = np.maximum(prediction + quantiles[:, 0], 0.0)
+        upper = prediction + quantiles[:, 1]
+
+        forecasts = {}
+        for i, product_id in enumerate(history['product_id'].to_numpy()[last_rows]):
+            rows = slice(i * days_ahead, (i + 1) * days_ahead)
+            forecasts[product_id] = pd.DataFrame({
+                'date': target_dates[rows],
+                'prophet_prediction': prediction[rows],
+                'feature_prediction': prediction[rows],
+                'combined_prediction': prediction[rows],
+                'prophet_lower': lower[rows],
+                'prophet_upper': upper[rows]
+            })
+        return forecasts
+
+    def save(self, model_path):
+        path = Path(model_path) / GLOBAL_MODEL_FILE
+        joblib.dump({
+            'model': self.model,
+            'categories': self.categories,
+            'product_categories': self.product_categories,
+            'product_encoding': self.product_encoding,
+            'global_mean': self.global_mean,
+            'max_horizon': self.max_horizon,
+            'interval_width': self.interval_width,
+            'residual_quantiles': self.residual_quantiles
+        }, path)
+        logger.info(f"Saved global model to {path}")
+
+    @classmethod
+    def load(cls, model_path):
+        artifact = joblib.load(Path(model_path) / GLOBAL_MODEL_FILE)
+        if 'product_encoding' not in artifact:
+            raise ValueError("Global model predates product encodings; retrain it with --engine global")
+        model = cls(max_horizon=artifact['max_horizon'], interval_width=artifact['interval_width'])
+        model.model = artifact['model']
+        model.categories = artifact['categories']
+        model.product_categories = artifact['product_categories']
+        model.product_encoding = artifact['product_encoding']
+        model.global_mean = artifact['global_mean']
+        model.residual_quantiles = artifact['residual_quantiles']
+        return model
@@ -1,10 +1,19 @@
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
 import pandas as pd
 import numpy as np
 from prophet import Prophet
 import joblib
-from pathlib import Path
+import json
+import argparse
 import logging
 from datetime import datetime, timedelta
+from models.global_model import GlobalDemandModel
+from models.statistical import StatisticalForecaster
+from models.prophet_batch import ProphetBatch
+from models.intervals import FastIntervals, sampled_bounds, INTERVAL_MODES, DEFAULT_INTERVAL_WIDTH
 
 # Set up logging
 logging.basicConfig(
@@ -14,9 +23,21 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 class DemandPredictor:
-    def __init__(self, model_path, data_path):
+    def __init__(self, model_path, data_path, engine="prophet", interval_mode="sampled",
+                 interval_width=DEFAULT_INTERVAL_WIDTH):
         self.model_path = Path(model_path)
         self.data_path = Path(data_path)
+        # "prophet" (per-product models), "global" (one model for all products)
+        # or "routed" (per-product models for high-volume products, statistical for the rest)
+        self.engine = engine
+        self.global_model = None
+        self.statistical = StatisticalForecaster()
+        self.routes = {}
+        # yhat is computed for all models in one batch; "sampled" takes intervals from
+        # Prophet's Monte Carlo simulation per model (the slow part), "analytic" and
+        # "residual" from in-sample residuals
+        self.interval_mode = interval_mode
+        self.intervals = FastIntervals(interval_mode, interval_width) if interval_mode != "sampled" else None
         self.models = {}
         self.feature_models = None
         self.scaler = None
@@ -25,14 +46,26 @@ class DemandPredictor:
     def load_models(self):
         """Load trained models from disk."""
         try:
+            if self.engine == "global":
+                self.global_model = GlobalDemandModel.load(self.model_path)
+                logger.info("Loaded global model")
+                return
+            
+            if self.engine == "routed":
+                with open(self.model_path / "routing.json") as f:
+                    self.routes = json.load(f)
+            
             # Load Prophet models
             for model_file in self.model_path.glob("prophet_model_*.json"):
                 product_id = model_file.stem.split('_')[-1]
+                if self.engine == "routed" and self.routes.get(product_id) != "prophet":
+                    continue
                 self.models[product_id] = joblib.load(str(model_file))
             
-            # Load feature models and scaler
-            self.feature_models = joblib.load(self.model_path / "feature_models.joblib")
-            self.scaler = joblib.load(self.model_path / "scaler.joblib")
+            # Load feature models and scaler (a routed run may have no Prophet products)
+            if self.models or self.engine != "routed":
+                self.feature_models = joblib.load(self.model_path / "feature_models.joblib")
+                self.scaler = joblib.load(self.model_path / "scaler.joblib")
             
             logger.info(f"Loaded models for {len(self.models)} products")
         except FileNotFoundError as e:
@@ -76,22 +109,39 @@ class DemandPredictor:
     
     def predict_demand(self, product_id, days_ahead=30):
         """Make demand predictions for a specific product."""
+        if self.engine == "global":
+            return self.predict_global([product_id], days_ahead)[product_id]
+        if self.engine == "routed" and product_id not in self.models:
+            return self.predict_statistical([product_id], days_ahead)[product_id]
+        
         if not self.models or product_id not in self.models:
             raise ValueError(f"No model found for product {product_id}")
         
-        # Generate future dates
+        future_dates = self.future_dates(days_ahead)
+        yhat, lower, upper = self.prophet_forecasts([product_id], future_dates)[product_id]
+        return self.combine_predictions(product_id, future_dates, yhat, lower, upper)
+    
+    def future_dates(self, days_ahead):
+        """Dates to forecast, starting the day after the latest data."""
         last_date = self.latest_data['date'].max()
-        future_dates = pd.date_range(
+        return pd.date_range(
             start=last_date + timedelta(days=1),
             periods=days_ahead,
             freq='D'
         )
-        
-        # Get Prophet predictions
-        prophet_forecast = self.models[product_id].predict(
-            pd.DataFrame({'ds': future_dates})
-        )
-        
+    
+    def prophet_forecasts(self, product_ids, future_dates):
+        """Prophet yhat with lower and upper bounds, as {product_id: (yhat, lower, upper)}."""
+        models = {product_id: self.models[product_id] for product_id in product_ids}
+        batch_ids, yhat = ProphetBatch(models).yhat(future_dates)
+        if self.intervals is None:
+            lower, upper = sampled_bounds(models, future_dates)
+        else:
+            lower, upper = self.intervals.bounds(models, future_dates, yhat)
+        return {product_id: (yhat[i], lower[i], upper[i]) for i, product_id in enumerate(batch_ids)}
+    
+    def combine_predictions(self, product_id, future_dates, yhat, lower, upper):
+        """Blend the Prophet forecast with the feature model's into the prediction frame."""
         # Get feature-based predictions
         feature_data = self.prepare_feature_data(product_id, future_dates)
         feature_data_scaled = self.scaler.transform(feature_data)
@@ -102,31 +152,73 @@ class DemandPredictor:
         feature_weight = 0.3
         
         combined_predictions = (
-            prophet_weight * prophet_forecast['yhat'].values +
+            prophet_weight * yhat +
             feature_weight * feature_predictions
         )
         
         # Create prediction DataFrame
         predictions_df = pd.DataFrame({
             'date': future_dates,
-            'prophet_prediction': prophet_forecast['yhat'].values,
+            'prophet_prediction': yhat,
             'feature_prediction': feature_predictions,
             'combined_prediction': combined_predictions,
-            'prophet_lower': prophet_forecast['yhat_lower'].values,
-            'prophet_upper': prophet_forecast['yhat_upper'].values
+            'prophet_lower': lower,
+            'prophet_upper': upper
         })
         
         return predictions_df
     
+    def predict_global(self, product_ids=None, days_ahead=30):
+        """Forecast products with the global model in one vectorized call."""
+        if self.global_model is None:
+            raise ValueError("Global model not loaded. Call load_models() first.")
+        if self.latest_data is None:
+            self.load_latest_data()
+        
+        predictions = self.global_model.predict(self.latest_data, days_ahead, product_ids)
+        for product_id in product_ids or []:
+            if product_id not in predictions:
+                raise ValueError(f"Not enough sales history to forecast product {product_id}")
+        return predictions
+    
+    def predict_statistical(self, product_ids=None, days_ahead=30):
+        """Forecast products with the statistical engine in one vectorized call."""
+        if self.latest_data is None:
+            self.load_latest_data()
+        
+        predictions = self.statistical.predict(self.latest_data, days_ahead, product_ids)
+        for product_id in product_ids or []:
+            if product_id not in predictions:
+                raise ValueError(f"No sales history for product {product_id}")
+        return predictions
+    
     def predict_all_products(self, days_ahead=30):
         """Make predictions for all products."""
         if self.latest_data is None:
             self.load_latest_data()
         
+        if self.engine == "global":
+            all_predictions = self.predict_global(days_ahead=days_ahead)
+            logger.info(f"Generated predictions for {len(all_predictions)} products")
+            return all_predictions
+        
         all_predictions = {}
+        if self.engine == "routed":
+            # Everything without a Prophet model, including products whose training failed
+            statistical_ids = sorted(set(self.latest_data['product_id']) - set(self.models))
+            if statistical_ids:
+                all_predictions.update(self.predict_statistical(statistical_ids, days_ahead))
+                logger.info(f"Generated statistical predictions for {len(statistical_ids)} products")
+        
+        # Every Prophet model is forecast in one batch
+        prophet_forecasts = {}
+        if self.models:
+            future_dates = self.future_dates(days_ahead)
+            prophet_forecasts = self.prophet_forecasts(list(self.models), future_dates)
+        
         for product_id in self.models.keys():
             try:
-                predictions = self.predict_demand(product_id, days_ahead)
+                predictions = self.combine_predictions(product_id, future_dates, *prophet_forecasts[product_id])
                 all_predictions[product_id] = predictions
                 logger.info(f"Generated predictions for product {product_id}")
             except Exception as e:
@@ -163,10 +255,22 @@ class DemandPredictor:
         logger.info(f"Saved predictions to {output_path}")
 
 def main():
+    parser = argparse.ArgumentParser(description="Generate demand predictions for all products")
+    parser.add_argument("--engine", choices=["prophet", "global", "routed"], default="prophet")
+    parser.add_argument(
+        "--intervals", choices=INTERVAL_MODES, default="sampled",
+        help="Prophet's sampled intervals (slow: simulated per model), or fast analytic / residual-quantile intervals"
+    )
+    parser.add_argument("--interval-width", type=float, default=DEFAULT_INTERVAL_WIDTH)
+    args = parser.parse_args()
+    
     # Initialize predictor
     predictor = DemandPredictor(
         model_path="models/saved",
-        data_path="data/processed"
+        data_path="data/processed",
+        engine=args.engine,
+        interval_mode=args.intervals,
+        interval_width=args.interval_width
     )
     
     try:
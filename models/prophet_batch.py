@@ -0,0 +1,204 @@
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import pandas as pd
+import numpy as np
+import joblib
+import argparse
+import logging
+import time
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+TREND_CHUNK_SIZE = 4096  # Products per (products x dates x changepoints) block
+DEFAULT_TOLERANCE = 1e-6
+
+def supports_batch(model):
+    """
+    Whether ``yhat`` of a fitted Prophet model can be computed from stacked
+    parameters: linear growth, additive unconditional seasonalities, no
+    holidays or extra regressors, and MAP estimates (no MCMC samples).
+    """
+    return (
+        model.growth == 'linear'
+        and not model.logistic_floor
+        and model.holidays is None
+        and model.country_holidays is None
+        and not model.extra_regressors
+        and model.params['k'].shape[0] == 1
+        and all(
+            props['mode'] == 'additive' and props['condition_name'] is None
+            for props in model.seasonalities.values()
+        )
+    )
+
+def seasonality_signature(model):
+    return tuple(
+        (name, float(props['period']), int(props['fourier_order']))
+        for name, props in model.seasonalities.items()
+    )
+
+def fourier_features(dates, signature):
+    """Seasonality features in Prophet's column order, shared by every model with ``signature``."""
+    # Same conversion as Prophet.fourier_series: whole seconds since the epoch, in days
+    t = dates.to_numpy(dtype=np.int64) // 10 ** 9 / (3600 * 24.)
+    columns = []
+    for _, period, order in signature:
+        for i in range(order):
+            c = t * np.pi * 2 * (i + 1) / period
+            columns.extend([np.sin(c), np.cos(c)])
+    if not columns:
+        return np.zeros((len(dates), 1))
+    return np.column_stack(columns)
+
+class ProphetBatch:
+    """
+    ``yhat`` of many fitted Prophet models for a shared set of dates.
+
+    Models with the same seasonalities are grouped and their fitted
+    parameters stacked: trend rates and offsets, changepoints (padded to the
+    longest list) and seasonal Fourier coefficients. A group's trend is then
+    one masked sum over changepoints and its seasonality one matrix product
+    with the shared Fourier features. Models that ``supports_batch`` rejects
+    go through Prophet.predict with uncertainty sampling turned off.
+    """
+
+    def __init__(self, models):
+        self.product_ids = list(models)
+        self.groups = {}
+        self.fallback = {}
+        members = {}
+        for product_id, model in models.items():
+            if supports_batch(model):
+                members.setdefault(seasonality_signature(model), []).append((product_id, model))
+            else:
+                self.fallback[product_id] = model
+        for signature, group in members.items():
+            self.groups[signature] = self.stack(group)
+        if self.fallback:
+            logger.info(f"{len(self.fallback)} models are not batchable and use Prophet.predict")
+
+    @staticmethod
+    def stack(group):
+        changepoints = max(len(model.changepoints_t) for _, model in group)
+        stacked = {
+            'product_ids': [product_id for product_id, _ in group],
+            'start': np.array([model.start.value for _, model in group], dtype=np.int64),
+            't_scale': np.array([model.t_scale.value for _, model in group], dtype=float),
+            'y_scale': np.array([model.y_scale for _, model in group], dtype=float),
+            'k': np.array([model.params['k'].mean() for _, model in group]),
+            'm': np.array([model.params['m'].mean() for _, model in group]),
+            'beta': np.vstack([model.params['beta'].mean(axis=0) for _, model in group]),
+            # Padding changepoints sit at +inf with zero rate change, so they never apply
+            'changepoints_t': np.full((len(group), changepoints), np.inf),
+            'delta': np.zeros((len(group), changepoints)),
+        }
+        for i, (_, model) in enumerate(group):
+            n = len(model.changepoints_t)
+            stacked['changepoints_t'][i, :n] = model.changepoints_t
+            stacked['delta'][i, :n] = model.params['delta'].mean(axis=0)
+        stacked['gamma'] = np.where(
+            np.isfinite(stacked['changepoints_t']), -stacked['changepoints_t'] * stacked['delta'], 0.0
+        )
+        return stacked
+
+    @staticmethod
+    def trend(group, dates):
+        """Piecewise linear trend of every model in ``group``, (products x dates)."""
+        t = (dates.asi8[None, :] - group['start'][:, None]) / group['t_scale'][:, None]
+        trend = np.empty_like(t)
+        for start in range(0, len(t), TREND_CHUNK_SIZE):
+            rows = slice(start, start + TREND_CHUNK_SIZE)
+            active = group['changepoints_t'][rows, None, :] <= t[rows, :, None]
+            k_t = group['k'][rows, None] + np.einsum('pdc,pc->pd', active, group['delta'][rows])
+            m_t = group['m'][rows, None] + np.einsum('pdc,pc->pd', active, group['gamma'][rows])
+            trend[rows] = k_t * t[rows] + m_t
+        return trend * group['y_scale'][:, None]
+
+    def yhat(self, dates):
+        """
+        Point forecasts for ``dates`` as (product_ids, array of shape
+        (products x dates)), rows in the order the models were given.
+        """
+        dates = pd.DatetimeIndex(dates).as_unit('ns')
+        rows = {}
+        for signature, group in self.groups.items():
+            seasonal = group['beta'] @ fourier_features(dates, signature).T
+            values = self.trend(group, dates) + seasonal * group['y_scale'][:, None]
+            rows.update(zip(group['product_ids'], values))
+        for product_id, model in self.fallback.items():
+            uncertainty_samples = model.uncertainty_samples
+            model.uncertainty_samples = 0
+            try:
+                # Prophet returns rows sorted by date
+                forecast = model.predict(pd.DataFrame({'ds': dates}))
+                order = np.argsort(np.argsort(dates.asi8, kind='stable'), kind='stable')
+                rows[product_id] = forecast['yhat'].to_numpy()[order]
+            finally:
+                model.uncertainty_samples = uncertainty_samples
+        return self.product_ids, np.vstack([rows[product_id] for product_id in self.product_ids])
+
+def check_against_prophet(models, dates, tolerance=DEFAULT_TOLERANCE):
+    """
+    Compare ProphetBatch with Prophet.predict on ``dates``. Returns the
+    largest absolute yhat difference and the time each took.
+    """
+    started = time.perf_counter()
+    product_ids, batch = ProphetBatch(models).yhat(dates)
+    batch_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    expected = np.vstack([
+        models[product_id].predict(pd.DataFrame({'ds': dates}))['yhat'].to_numpy()
+        for product_id in product_ids
+    ])
+    prophet_seconds = time.perf_counter() - started
+
+    max_error = float(np.abs(batch - expected).max())
+    return {
+        'products': len(product_ids),
+        'dates': len(dates),
+        'max_abs_error': max_error,
+        'within_tolerance': max_error <= tolerance,
+        'batch_seconds': round(batch_seconds, 4),
+        'prophet_seconds': round(prophet_seconds, 4),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Check batch Prophet yhat against Prophet.predict on saved models")
+    parser.add_argument("--model-path", default="models/saved")
+    parser.add_argument("--days-ahead", type=int, default=30)
+    parser.add_argument("--history-days", type=int, default=365, help="Past days checked as well, across changepoints")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args()
+
+    try:
+        models = {
+            model_file.stem[len("prophet_model_"):]: joblib.load(model_file)
+            for model_file in sorted(Path(args.model_path).glob("prophet_model_*.json"))
+        }
+        if not models:
+            raise ValueError(f"No Prophet models in {args.model_path}")
+        last_date = max(model.history['ds'].max() for model in models.values())
+        dates = pd.date_range(
+            end=last_date + pd.Timedelta(days=args.days_ahead),
+            periods=args.history_days + args.days_ahead,
+            freq='D'
+        )
+        result = check_against_prophet(models, dates, args.tolerance)
+        logger.info(f"Batch vs Prophet.predict: {result}")
+        if not result['within_tolerance']:
+            logger.error(f"Batch yhat differs from Prophet.predict by more than {args.tolerance}")
+            sys.exit(1)
+    except Exception as e:
+        logger.error(f"Error checking batch Prophet inference: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+import pandas as pd
+import numpy as np
+import logging
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+SEASON_LENGTH = 7  # Weekly seasonality of daily sales
+SES_ALPHAS = (0.05, 0.1, 0.2, 0.3, 0.5)  # Smoothing levels tried for each product
+TSB_ALPHA_DEMAND = 0.1
+TSB_ALPHA_PROBABILITY = 0.1
+INTERMITTENT_ADI = 1.32  # Average days between sales above which demand is intermittent
+INTERVAL_Z = 1.2816  # Normal quantile of an 80% interval, Prophet's default width
+PROPHET_VOLUME_SHARE = 0.8  # Share of total sales volume whose products are routed to Prophet
+
+METHODS = np.array(["ses", "seasonal_naive", "tsb"])
+
+def sales_matrix(data):
+    """
+    Daily sales as a (products x days) array, each product's history right
+    aligned so the last column is its latest day; shorter histories are NaN
+    padded on the left. Returns (product_ids, last_dates, matrix).
+    """
+    history = data.sort_values(['product_id', 'date'], kind='stable')
+    product_ids, rows = np.unique(history['product_id'].to_numpy(), return_inverse=True)
+    sizes = np.bincount(rows)
+    days = sizes.max()
+    columns = days - sizes[rows] + history.groupby('product_id', sort=True).cumcount().to_numpy()
+
+    matrix = np.full((len(product_ids), days), np.nan)
+    matrix[rows, columns] = history['sales_quantity'].to_numpy(dtype=float)
+    last_dates = history.groupby('product_id', sort=True)['date'].max().to_numpy()
+    return product_ids, last_dates, matrix
+
+def backfill_history(Y):
+    """
+    Prepare a right-aligned sales array for the smoothing recursions.
+
+    Leading NaN padding is replaced by the product's first observed value, so
+    the recursions can run over every column without branching: a level that
+    starts at that value does not move while the padding is replayed. Returns
+    (filled, observed, scored) transposed to (days x products), so each step
+    of a recursion reads one contiguous row; ``scored`` marks the days that
+    count towards in-sample errors (observed days after the first one).
+    """
+    observed = ~np.isnan(Y)
+    first = observed.argmax(axis=1)
+    filled = np.where(observed, Y, Y[np.arange(Y.shape[0]), first][:, None])
+    filled = np.nan_to_num(filled)
+    scored = observed & (np.arange(Y.shape[1]) > first[:, None])
+    return (
+        np.ascontiguousarray(filled.T),
+        np.ascontiguousarray(observed.T, dtype=float),
+        np.ascontiguousarray(scored.T, dtype=float)
+    )
+
+def rmse(squared_sum, counts):
+    """In-sample RMS error from a running sum of squares; infinite without scored days."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(counts > 0, np.sqrt(squared_sum / np.maximum(counts, 1)), np.inf)
+
+def simple_exponential_smoothing(filled, scored, alphas=SES_ALPHAS):
+    """
+    Level, smoothing constant and in-sample one-step RMSE of SES per
+    product, with the constant chosen per product from ``alphas``. All
+    constants are run together as an (alphas x products) state, updated in
+    place to keep the per-day cost to a few passes over that state.
+    """
+    weights = np.asarray(alphas, dtype=float)[:, None]
+    level = np.repeat(filled[None, 0], len(alphas), axis=0)
+    squared_sum = np.zeros_like(level)
+    errors = np.empty_like(level)
+    squared = np.empty_like(level)
+    for t in range(filled.shape[0]):
+        np.subtract(filled[t], level, out=errors)
+        np.multiply(errors, errors, out=squared)
+        squared *= scored[t]
+        squared_sum += squared
+        errors *= weights
+        level += errors
+
+    sigma = rmse(squared_sum, scored.sum(axis=0))
+    best = sigma.argmin(axis=0)
+    products = np.arange(filled.shape[1])
+    return level[best, products], weights[best, 0], sigma[best, products]
+
+def seasonal_naive(Y, season_length=SEASON_LENGTH):
+    """Last season of each product and the in-sample RMSE of repeating the previous season."""
+    errors = Y[:, season_length:] - Y[:, :-season_length]
+    counts = np.sum(~np.isnan(errors), axis=1)
+    np.nan_to_num(errors, copy=False)
+    return Y[:, -season_length:], rmse(np.einsum('ij,ij->i', errors, errors), counts)
+
+def tsb(filled, observed, scored, alpha_demand=TSB_ALPHA_DEMAND, alpha_probability=TSB_ALPHA_PROBABILITY):
+    """
+    Teunter-Syntetos-Babai forecast for intermittent demand: demand size and
+    the probability of a sale are smoothed separately, the demand size only
+    on days with a sale. Returns the per-day forecast and its one-step RMSE.
+    """
+    sales = observed * (filled > 0)
+    products = np.arange(filled.shape[1])
+    size = np.where(sales.any(axis=0), filled[sales.argmax(axis=0), products], 0.0)
+    probability = sales[observed.argmax(axis=0), products]
+    squared_sum = np.zeros(filled.shape[1])
+    for t in range(filled.shape[0]):
+        y = filled[t]
+        errors = y - size * probability
+        squared_sum += errors * errors * scored[t]
+        probability += alpha_probability * (sales[t] - probability) * observed[t]
+        size += alpha_demand * (y - size) * sales[t]
+    sigma = rmse(squared_sum, scored.sum(axis=0))
+    return size * probability, np.where(np.isfinite(sigma), sigma, 0.0)
+
+def average_demand_interval(Y):
+    """Observed days per day with a sale; infinite for products that never sold."""
+    observed = np.sum(~np.isnan(Y), axis=1)
+    sales_days = np.sum(np.nan_to_num(Y) > 0, axis=1)
+    with np.errstate(divide='ignore'):
+        return np.where(sales_days > 0, observed / np.maximum(sales_days, 1), np.inf)
+
+def forecast_matrix(Y, days_ahead):
+    """
+    Forecast every row of ``Y`` ``days_ahead`` days past its last column.
+
+    Intermittent products use TSB; the rest use whichever of SES and
+    seasonal naive had the lower in-sample RMSE. Returns
+    (prediction, lower, upper, method) with the first three shaped
+    (products x days_ahead).
+    """
+    horizons = np.arange(1, days_ahead + 1)
+    filled, observed, scored = backfill_history(Y)
+
+    level, alpha, ses_sigma = simple_exponential_smoothing(filled, scored)
+    ses_prediction = np.repeat(level[:, None], days_ahead, axis=1)
+    ses_sd = np.nan_to_num(ses_sigma, posinf=0.0)[:, None] * np.sqrt(1 + (horizons - 1) * alpha[:, None] ** 2)
+
+    last_season, seasonal_sigma = seasonal_naive(Y)
+    # A season with gaps cannot be repeated
+    seasonal_sigma = np.where(np.isnan(last_season).any(axis=1), np.inf, seasonal_sigma)
+    seasonal_prediction = last_season[:, (horizons - 1) % SEASON_LENGTH]
+    seasonal_sd = np.nan_to_num(seasonal_sigma, posinf=0.0)[:, None] * np.sqrt(np.ceil(horizons / SEASON_LENGTH))
+
+    tsb_forecast, tsb_sigma = tsb(filled, observed, scored)
+    tsb_prediction = np.repeat(tsb_forecast[:, None], days_ahead, axis=1)
+    tsb_sd = tsb_sigma[:, None] * np.sqrt(1 + (horizons - 1) * TSB_ALPHA_DEMAND ** 2)
+
+    method = np.where(
+        average_demand_interval(Y) > INTERMITTENT_ADI, 2,
+        np.where(seasonal_sigma < ses_sigma, 1, 0)
+    )
+    choice = method[:, None]
+    prediction = np.choose(choice, [ses_prediction, seasonal_prediction, tsb_prediction])
+    sd = np.choose(choice, [ses_sd, seasonal_sd, tsb_sd])
+    prediction = np.maximum(np.nan_to_num(prediction), 0.0)
+    sd = np.nan_to_num(sd)
+    lower = np.maximum(prediction - INTERVAL_Z * sd, 0.0)
+    upper = prediction + INTERVAL_Z * sd
+    return prediction, lower, upper, METHODS[method]
+
+def route_products(data, volume_share=PROPHET_VOLUME_SHARE):
+    """
+    Pick an engine per product: the highest-volume products that together
+    make up ``volume_share`` of all sales go to Prophet, unless their demand
+    is intermittent; everything else is forecast statistically.
+
+    Returns {product_id: "prophet" or "statistical"}.
+    """
+    product_ids, _, Y = sales_matrix(data)
+    volume = np.nansum(Y, axis=1)
+    order = np.argsort(-volume, kind='stable')
+    # A product is in the head if the products ranked above it have not yet reached the share
+    share_before = (np.cumsum(volume[order]) - volume[order]) / max(volume.sum(), 1e-9)
+    head = np.zeros(len(product_ids), dtype=bool)
+    head[order] = share_before < volume_share
+    prophet = head & (average_demand_interval(Y) <= INTERMITTENT_ADI)
+    routes = dict(zip(product_ids, np.where(prophet, "prophet", "statistical")))
+    logger.info(
+        f"Routed {int(prophet.sum())} products to Prophet and "
+        f"{len(product_ids) - int(prophet.sum())} to the statistical engine"
+    )
+    return routes
+
+class StatisticalForecaster:
+    """
+    Exponential smoothing, seasonal naive and Croston/TSB forecasts for many
+    products at once, computed on a (products x days) sales array.
+
+    Nothing is trained ahead of time; forecasts are computed from the sales
+    history on every call. Intervals assume normal errors around the chosen
+    method's one-step residuals.
+    """
+
+    def predict(self, data, days_ahead=30, product_ids=None):
+        """
+        Forecast ``days_ahead`` days after each product's last row.
+
+        Returns {product_id: DataFrame} with the columns of
+        DemandPredictor.predict_demand, plus the method used.
+        """
+        if product_ids is not None:
+            data = data[data['product_id'].isin(product_ids)]
+        if data.empty:
+            return {}
+
+        ids, last_dates, Y = sales_matrix(data)
+        prediction, lower, upper, methods = forecast_matrix(Y, days_ahead)
+        offsets = pd.to_timedelta(np.arange(1, days_ahead + 1), unit='D')
+
+        forecasts = {}
+        for i, product_id in enumerate(ids):
+            forecasts[product_id] = pd.DataFrame({
+                'date': pd.Timestamp(last_dates[i]) + offsets,
+                'prophet_prediction': prediction[i],
+                'feature_prediction': prediction[i],
+                'combined_prediction': prediction[i],
+                'prophet_lower': lower[i],
+                'prophet_upper': upper[i],
+                'method': methods[i]
+            })
+        return forecasts
@@ -1,12 +1,23 @@
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
 import pandas as pd
 import numpy as np
 from prophet import Prophet
 from sklearn.preprocessing import StandardScaler
 from sklearn.ensemble import RandomForestRegressor
 import joblib
-from pathlib import Path
+import hashlib
+import json
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import argparse
 import logging
+import time
 from datetime import datetime, timedelta
+from models.global_model import GlobalDemandModel, load_categories
+from models.statistical import route_products, PROPHET_VOLUME_SHARE
+from models.prophet_batch import ProphetBatch
 
 # Set up logging
 logging.basicConfig(
@@ -15,6 +26,102 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+MANIFEST_FILE = "training_manifest.json"
+ROUTING_FILE = "routing.json"
+
+def prepare_prophet_data(product_data):
+    """Prepare data for Prophet model."""
+    prophet_data = product_data[['date', 'sales_quantity']].copy()
+    prophet_data.columns = ['ds', 'y']
+    return prophet_data
+
+def prepare_feature_data(product_data):
+    """Prepare data for feature-based model."""
+    features = [
+        'day_of_week', 'month', 'year', 'is_weekend',
+        'sales_7d_avg', 'stock_to_sales_ratio'
+    ]
+    X = product_data[features].copy()
+    y = product_data['sales_quantity']
+    return X, y
+
+def data_fingerprint(product_data, row_hashes):
+    """Row count, last date and a hash of a product's rows, as stored in the training manifest."""
+    return {
+        'rows': int(len(product_data)),
+        'last_date': product_data['date'].max().isoformat(),
+        'data_hash': hashlib.sha1(row_hashes.values.tobytes()).hexdigest()[:16]
+    }
+
+def warm_start_params(model):
+    """Initial Stan parameters taken from a previously fitted Prophet model."""
+    params = {}
+    for name in ['k', 'm', 'sigma_obs']:
+        params[name] = model.params[name][0][0]
+    for name in ['delta', 'beta']:
+        params[name] = model.params[name][0]
+    return params
+
+def new_prophet_model():
+    return Prophet(
+        yearly_seasonality=True,
+        weekly_seasonality=True,
+        daily_seasonality=False,
+        changepoint_prior_scale=0.05
+    )
+
+def train_product(product_id, product_data, previous_model_path=None):
+    """
+    Fit the Prophet and feature models for one product.
+
+    Runs in a worker process when training in parallel, so it is a module
+    level function and returns failures instead of raising them. When
+    ``previous_model_path`` is given, Prophet is initialized from that fit.
+    """
+    started = time.perf_counter()
+    try:
+        # Train Prophet model, warm-started from the previous fit when there is one
+        prophet_data = prepare_prophet_data(product_data)
+        prophet_model = new_prophet_model()
+        warm_started = False
+        if previous_model_path is not None:
+            try:
+                prophet_model.fit(prophet_data, init=warm_start_params(joblib.load(previous_model_path)))
+                warm_started = True
+            except Exception as e:
+                logger.warning(f"Warm start failed for product {product_id}, fitting from scratch: {e}")
+                prophet_model = new_prophet_model()
+        if not warm_started:
+            prophet_model.fit(prophet_data)
+        
+        # Train feature-based model
+        X, y = prepare_feature_data(product_data)
+        scaler = StandardScaler()
+        X_scaled = scaler.fit_transform(X)
+        feature_model = RandomForestRegressor(
+            n_estimators=100,
+            max_depth=10,
+            random_state=42
+        )
+        feature_model.fit(X_scaled, y)
+        
+        return {
+            'product_id': product_id,
+            'status': 'trained',
+            'seconds': time.perf_counter() - started,
+            'warm_started': warm_started,
+            'prophet_model': prophet_model,
+            'feature_model': feature_model,
+            'scaler': scaler
+        }
+    except Exception as e:
+        return {
+            'product_id': product_id,
+            'status': 'failed',
+            'seconds': time.perf_counter() - started,
+            'error': str(e)
+        }
+
 class DemandForecaster:
     def __init__(self, data_path, model_path):
         self.data_path = Path(data_path)
@@ -23,6 +130,12 @@ class DemandForecaster:
         self.scaler = StandardScaler()
         self.models = {}  # Dictionary to store models for each product
         self.feature_models = {}  # Dictionary to store feature-based models
+        self.scalers = {}  # Feature scaler fitted on each product's data
+        self.data = None
+        self.training_report = []  # Per-product status and training time of the last run
+        self.manifest = {}  # Data fingerprint of each product's saved models
+        self.skipped_products = []  # Products whose data is unchanged since their saved models
+        self.global_model = None
     
     def load_data(self):
         """Load processed sales data."""
@@ -36,55 +149,139 @@ class DemandForecaster:
     
     def prepare_prophet_data(self, product_data):
         """Prepare data for Prophet model."""
-        prophet_data = product_data[['date', 'sales_quantity']].copy()
-        prophet_data.columns = ['ds', 'y']
-        return prophet_data
+        return prepare_prophet_data(product_data)
     
     def prepare_feature_data(self, product_data):
         """Prepare data for feature-based model."""
-        features = [
-            'day_of_week', 'month', 'year', 'is_weekend',
-            'sales_7d_avg', 'stock_to_sales_ratio'
-        ]
-        X = product_data[features].copy()
-        y = product_data['sales_quantity']
-        return X, y
+        return prepare_feature_data(product_data)
+    
+    def load_manifest(self):
+        """Fingerprints of the data each saved model was trained on, by product."""
+        manifest_path = self.model_path / MANIFEST_FILE
+        if not manifest_path.exists():
+            return {}
+        with open(manifest_path) as f:
+            return json.load(f)
     
-    def train_models(self):
-        """Train forecasting models for each product."""
+    def train_models(self, workers=1, incremental=True, product_ids=None):
+        """
+        Train forecasting models for each product, or only for ``product_ids``.
+
+        With ``incremental``, products whose rows match the fingerprint in the
+        training manifest and whose artifacts exist are skipped, and changed
+        products are warm-started from their previous Prophet fit. With
+        ``workers`` > 1, products are trained in parallel in a process pool;
+        each task is sent only its own product's rows. A product that fails to
+        train is logged and skipped instead of aborting the run. Per-product
+        status and timings are kept in ``self.training_report``.
+        """
         if self.data is None:
             raise ValueError("Data not loaded. Call load_data() first.")
         
-        # Get unique products
-        products = self.data['product_id'].unique()
+        data = self.data if product_ids is None else self.data[self.data['product_id'].isin(product_ids)]
+        self.manifest = self.load_manifest()
+        self.skipped_products = []
+        row_hashes = pd.util.hash_pandas_object(data, index=False)
         
-        for product_id in products:
-            logger.info(f"Training models for product {product_id}")
-            product_data = self.data[self.data['product_id'] == product_id].copy()
-            
-            # Train Prophet model
-            prophet_data = self.prepare_prophet_data(product_data)
-            prophet_model = Prophet(
-                yearly_seasonality=True,
-                weekly_seasonality=True,
-                daily_seasonality=False,
-                changepoint_prior_scale=0.05
-            )
-            prophet_model.fit(prophet_data)
-            self.models[product_id] = prophet_model
-            
-            # Train feature-based model
-            X, y = self.prepare_feature_data(product_data)
-            X_scaled = self.scaler.fit_transform(X)
-            feature_model = RandomForestRegressor(
-                n_estimators=100,
-                max_depth=10,
-                random_state=42
-            )
-            feature_model.fit(X_scaled, y)
-            self.feature_models[product_id] = feature_model
+        # Slice the data once per product so each task only carries its own rows
+        product_slices = []
+        fingerprints = {}
+        kinds = {}
+        for product_id, product_data in data.groupby('product_id', sort=False):
+            fingerprint = data_fingerprint(product_data, row_hashes[product_data.index])
+            prophet_path = self.model_path / f"prophet_model_{product_id}.json"
+            has_artifacts = prophet_path.exists() and (self.model_path / f"feature_model_{product_id}.joblib").exists()
+            if incremental and has_artifacts and self.manifest.get(product_id) == fingerprint:
+                self.skipped_products.append(product_id)
+                continue
+            fingerprints[product_id] = fingerprint
+            kinds[product_id] = 'refit' if prophet_path.exists() else 'new'
+            previous_model_path = prophet_path if incremental and prophet_path.exists() else None
+            product_slices.append((product_id, product_data.copy(), previous_model_path))
+        
+        started = time.perf_counter()
+        if workers > 1 and len(product_slices) > 1:
+            results = []
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = {
+                    executor.submit(train_product, *product_slice): product_slice[0]
+                    for product_slice in product_slices
+                }
+                for future in as_completed(futures):
+                    try:
+                        results.append(future.result())
+                    except Exception as e:
+                        # The worker itself died (e.g. out of memory)
+                        results.append({'product_id': futures[future], 'status': 'failed', 'seconds': 0.0, 'error': str(e)})
+        else:
+            results = [train_product(*product_slice) for product_slice in product_slices]
+        
+        # Keep the data's product order regardless of completion order
+        order = {product_slice[0]: i for i, product_slice in enumerate(product_slices)}
+        results.sort(key=lambda result: order[result['product_id']])
+        
+        self.training_report = [
+            {'product_id': product_id, 'status': 'skipped', 'seconds': 0.0, 'warm_started': False, 'error': None}
+            for product_id in self.skipped_products
+        ]
+        for result in results:
+            product_id = result['product_id']
+            if result['status'] == 'trained':
+                self.models[product_id] = result['prophet_model']
+                self.feature_models[product_id] = result['feature_model']
+                self.scalers[product_id] = result['scaler']
+                self.scaler = result['scaler']
+                self.manifest[product_id] = fingerprints[product_id]
+                status = kinds[product_id]
+                logger.info(f"Trained models for product {product_id} ({status}) in {result['seconds']:.1f}s")
+            else:
+                status = 'failed'
+                logger.error(f"Failed to train product {product_id}: {result['error']}")
+            self.training_report.append({
+                'product_id': product_id,
+                'status': status,
+                'seconds': round(result['seconds'], 3),
+                'warm_started': result.get('warm_started', False),
+                'error': result.get('error')
+            })
+        
+        counts = {status: 0 for status in ['skipped', 'refit', 'new', 'failed']}
+        for row in self.training_report:
+            counts[row['status']] += 1
+        logger.info(
+            f"Skipped {counts['skipped']} unchanged products, refit {counts['refit']}, "
+            f"trained {counts['new']} new ({counts['failed']} failed) "
+            f"in {time.perf_counter() - started:.1f}s with {workers} worker(s)"
+        )
+        return counts
+    
+    def train_routed_models(self, workers=1, incremental=True, volume_share=PROPHET_VOLUME_SHARE):
+        """
+        Train Prophet + RandomForest models only for the high-volume products
+        picked by route_products; the rest are left to the statistical engine,
+        which needs no training. The routing is saved for DemandPredictor.
+        """
+        if self.data is None:
+            raise ValueError("Data not loaded. Call load_data() first.")
+        
+        routes = route_products(self.data, volume_share)
+        with open(self.model_path / ROUTING_FILE, 'w') as f:
+            json.dump(routes, f, indent=2, sort_keys=True)
+        return self.train_models(
+            workers=workers,
+            incremental=incremental,
+            product_ids=[product_id for product_id, engine in routes.items() if engine == "prophet"]
+        )
+    
+    def train_global_model(self, products_file=None):
+        """Train and save the single cross-product model used by the "global" engine."""
+        if self.data is None:
+            raise ValueError("Data not loaded. Call load_data() first.")
         
-        logger.info(f"Trained models for {len(products)} products")
+        products_file = products_file or self.data_path.parent / "raw" / "products.csv"
+        self.global_model = GlobalDemandModel().fit(self.data, load_categories(products_file))
+        self.global_model.save(self.model_path)
+        return self.global_model
     
     def save_models(self):
         """Save trained models to disk."""
@@ -96,10 +293,28 @@ class DemandForecaster:
             model_path = self.model_path / f"prophet_model_{product_id}.json"
             joblib.dump(model, str(model_path))
         
-        # Save feature models and scaler
-        joblib.dump(self.feature_models, self.model_path / "feature_models.joblib")
+        # Save each feature model with its scaler so the backend can load products lazily
+        for product_id, model in self.feature_models.items():
+            joblib.dump(
+                {"model": model, "scaler": self.scalers[product_id]},
+                self.model_path / f"feature_model_{product_id}.joblib"
+            )
+
+        # Save feature models and scaler, keeping the saved models of skipped products
+        bundle_path = self.model_path / "feature_models.joblib"
+        feature_models = joblib.load(bundle_path) if self.skipped_products and bundle_path.exists() else {}
+        feature_models.update(self.feature_models)
+        joblib.dump(feature_models, bundle_path)
         joblib.dump(self.scaler, self.model_path / "scaler.joblib")
         
+        # Record what each saved model was trained on for the next incremental run
+        with open(self.model_path / MANIFEST_FILE, 'w') as f:
+            json.dump(self.manifest, f, indent=2, sort_keys=True)
+        
+        # Per-product training times of the last run
+        if self.training_report:
+            pd.DataFrame(self.training_report).to_csv(self.model_path / "training_report.csv", index=False)
+        
         logger.info("Saved all models to disk")
     
     def evaluate_models(self, test_days=30):
@@ -110,28 +325,29 @@ class DemandForecaster:
         results = []
         cutoff_date = self.data['date'].max() - timedelta(days=test_days)
         
+        # Prophet point forecasts for every model and test date at once
+        recent = self.data[self.data['date'] > cutoff_date]
+        test_dates = pd.DatetimeIndex(np.sort(recent['date'].unique()))
+        batch_ids, batch_yhat = ProphetBatch(self.models).yhat(test_dates)
+        prophet_yhat = dict(zip(batch_ids, batch_yhat))
+        
         for product_id in self.models.keys():
             # Prepare test data
-            test_data = self.data[
-                (self.data['product_id'] == product_id) &
-                (self.data['date'] > cutoff_date)
-            ].copy()
+            test_data = recent[recent['product_id'] == product_id].copy()
             
             if len(test_data) == 0:
                 continue
             
             # Make predictions
-            prophet_forecast = self.models[product_id].predict(
-                pd.DataFrame({'ds': test_data['date']})
-            )
+            prophet_predictions = prophet_yhat[product_id][test_dates.searchsorted(test_data['date'])]
             
             X_test, y_test = self.prepare_feature_data(test_data)
-            X_test_scaled = self.scaler.transform(X_test)
+            X_test_scaled = self.scalers[product_id].transform(X_test)
             feature_predictions = self.feature_models[product_id].predict(X_test_scaled)
             
             # Calculate metrics
             actual = test_data['sales_quantity'].values
-            prophet_mae = np.mean(np.abs(prophet_forecast['yhat'] - actual))
+            prophet_mae = np.mean(np.abs(prophet_predictions - actual))
             feature_mae = np.mean(np.abs(feature_predictions - actual))
             
             results.append({
@@ -141,9 +357,16 @@ class DemandForecaster:
                 'test_size': len(test_data)
             })
         
-        # Convert results to DataFrame and save
+        # Convert results to DataFrame and save, keeping the last scores of skipped products
         results_df = pd.DataFrame(results)
-        results_df.to_csv(self.model_path / "model_evaluation.csv", index=False)
+        evaluation_path = self.model_path / "model_evaluation.csv"
+        if self.skipped_products and evaluation_path.exists():
+            previous = pd.read_csv(evaluation_path)
+            results_df = pd.concat(
+                [previous[previous['product_id'].isin(self.skipped_products)], results_df],
+                ignore_index=True
+            )
+        results_df.to_csv(evaluation_path, index=False)
         
         # Log average performance
         avg_prophet_mae = results_df['prophet_mae'].mean()
@@ -154,16 +377,38 @@ class DemandForecaster:
         return results_df
 
 def main():
+    parser = argparse.ArgumentParser(description="Train demand forecasting models")
+    parser.add_argument("--data-path", default="data/processed")
+    parser.add_argument("--model-path", default="models/saved")
+    parser.add_argument("--workers", type=int, default=1, help="Products trained in parallel")
+    parser.add_argument("--full", action="store_true", help="Retrain every product, ignoring the training manifest")
+    parser.add_argument(
+        "--engine", choices=["prophet", "global", "routed"], default="prophet",
+        help="Per-product Prophet + RandomForest models, one global gradient-boosted model, "
+             "or per-product models for high-volume products only"
+    )
+    args = parser.parse_args()
+    
     # Initialize forecaster
     forecaster = DemandForecaster(
-        data_path="data/processed",
-        model_path="models/saved"
+        data_path=args.data_path,
+        model_path=args.model_path
     )
     
     try:
         # Load data and train models
         forecaster.load_data()
-        forecaster.train_models()
+        if args.engine == "global":
+            forecaster.train_global_model()
+            logger.info("Global model training completed successfully")
+            return
+        if args.engine == "routed":
+            forecaster.train_routed_models(workers=args.workers, incremental=not args.full)
+        else:
+            forecaster.train_models(workers=args.workers, incremental=not args.full)
+        if not forecaster.models:
+            logger.info("No products needed training; nothing to save")
+            return
         
         # Evaluate models
         evaluation_results = forecaster.evaluate_models()
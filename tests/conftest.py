@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The scripts in models/ import each other as models.<module> from the repository root
+sys.path.insert(0, str(Path(__file__).parent.parent))
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from models.advice import InventoryAdvisor
+
+def synthetic_predictions(products, days=30, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range("2025-06-01", periods=days, freq="D")
+    predictions = {}
+    for i in range(products):
+        level = rng.uniform(-1, 12)
+        combined = level + rng.normal(0, 2, days)
+        width = rng.uniform(0, 6, days)
+        predictions[f"PRD{i:03d}"] = pd.DataFrame({
+            'date': dates,
+            'prophet_prediction': combined,
+            'combined_prediction': combined,
+            'prophet_lower': combined - width / 2,
+            'prophet_upper': combined + width / 2,
+        })
+    # Edge cases: no demand at all, and demand that is negative on average
+    predictions["PRD-ZERO"] = predictions["PRD000"].assign(combined_prediction=0.0)
+    predictions["PRD-NEG"] = predictions["PRD000"].assign(combined_prediction=-1.5)
+    return predictions
+
+@pytest.fixture
+def advisor(tmp_path):
+    return InventoryAdvisor(model_path=tmp_path, data_path=tmp_path)
+
+def test_vectorized_matches_loop(advisor):
+    predictions = synthetic_predictions(200)
+    rng = np.random.default_rng(1)
+    # Some products have no stock record and default to 0
+    current_stock = {
+        product_id: int(rng.integers(0, 400))
+        for product_id in list(predictions)[::2]
+    }
+
+    expected = advisor.calculate_advice_loop(predictions, current_stock)
+    actual = advisor.calculate_advice_vectorized(list(predictions), predictions, current_stock)
+
+    pd.testing.assert_frame_equal(actual, expected, check_dtype=False)
+
+def test_order_quantity_is_clamped(advisor):
+    predictions = synthetic_predictions(20, seed=3)
+    current_stock = {product_id: 0 for product_id in predictions}
+    advice = advisor.calculate_advice_vectorized(list(predictions), predictions, current_stock)
+
+    assert advice['order_quantity'].between(advisor.min_order_quantity, advisor.max_order_quantity).all()
+    zero = advice.set_index('product_id').loc["PRD-ZERO"]
+    assert zero['days_of_stock'] == np.inf
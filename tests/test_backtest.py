@@ -0,0 +1,91 @@
+import math
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from models.backtest import cache_folds, fold_origins, summarize, summarize_routed
+
+def sales(products=("PRD001", "PRD002"), days=60):
+    dates = pd.date_range("2025-01-01", periods=days, freq="D")
+    return pd.concat([
+        pd.DataFrame({'product_id': product_id, 'date': dates, 'sales_quantity': float(i + 1)})
+        for i, product_id in enumerate(products)
+    ], ignore_index=True)
+
+def forecasts(data, origin, horizon, value):
+    dates = pd.date_range(origin + pd.Timedelta(days=1), periods=horizon, freq="D")
+    return pd.concat([
+        pd.DataFrame({'product_id': product_id, 'date': dates, 'prediction': value})
+        for product_id in data['product_id'].unique()
+    ], ignore_index=True)
+
+def test_fold_origins_end_on_latest_date():
+    data = sales()
+    origins = fold_origins(data, folds=3, horizon=7)
+    assert origins == [pd.Timestamp("2025-02-08"), pd.Timestamp("2025-02-15"), pd.Timestamp("2025-02-22")]
+    assert origins[-1] + pd.Timedelta(days=7) == data['date'].max()
+
+def test_summarize_scores_every_fold():
+    data = sales()
+    origins = fold_origins(data, folds=2, horizon=7)
+    fold_results = [(forecasts(data, origin, 7, 2.0), 0.5) for origin in origins]
+    fold_scores = []
+
+    row = summarize("statistical", fold_results, data, origins, 7, 1.0, 1.0, 0, fold_scores)
+
+    # Actuals are 1 and 2, predictions 2: half the points are off by one
+    assert row['mae'] == 0.5
+    assert row['bias'] == 0.5
+    assert row['scored_points'] == 2 * 2 * 7
+    assert row['series'] == 4
+    assert len(fold_scores) == 2
+
+def test_summarize_without_forecasts_returns_empty_row():
+    data = sales()
+    origins = fold_origins(data, folds=2, horizon=7)
+    fold_scores = []
+
+    row = summarize("prophet", [(None, {}), (None, {})], data, origins, 7, 1.0, 2.0, 4, fold_scores)
+
+    assert row['engine'] == "prophet"
+    assert row['scored_points'] == 0
+    assert row['failed'] == 4
+    assert math.isnan(row['mae'])
+    assert fold_scores == []
+
+def test_routed_falls_back_to_statistical_when_prophet_failed():
+    data = sales(products=[f"PRD{i:03d}" for i in range(1, 6)])
+    origins = fold_origins(data, folds=1, horizon=7)
+    statistical = forecasts(data, origins[0], 7, 1.0)
+    results = {
+        "prophet": [(None, {})],
+        "statistical": [(statistical, 0.1)],
+    }
+    fold_scores = []
+
+    row = summarize_routed(results, data, origins, 7, fold_scores)
+
+    assert row['series'] == 5
+    assert np.isclose(row['cpu_seconds'], 0.1)
+
+def test_cache_folds_reuses_current_folds_and_drops_stale_ones(tmp_path):
+    data = sales()
+    origins = fold_origins(data, folds=2, horizon=7)
+    unrelated = tmp_path / "notes.txt"
+    unrelated.write_text("kept")
+
+    paths = cache_folds(data, origins, tmp_path)
+    assert len(paths) == 2
+    assert pd.read_pickle(paths[0])['date'].max() == origins[0]
+    mtimes = [Path(path).stat().st_mtime_ns for path in paths]
+    assert cache_folds(data, origins, tmp_path) == paths
+    assert [Path(path).stat().st_mtime_ns for path in paths] == mtimes
+
+    # New data: its folds replace the old ones
+    newer = sales(days=61)
+    new_paths = cache_folds(newer, fold_origins(newer, folds=2, horizon=7), tmp_path)
+
+    assert sorted(str(path) for path in tmp_path.glob("fold_*.pkl")) == sorted(new_paths)
+    assert not set(new_paths) & set(paths)
+    assert unrelated.exists()
@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from models.global_model import GlobalDemandModel, FEATURES, PRODUCT_ENCODING_SMOOTHING
+
+def history(levels, days=120, start="2024-01-01"):
+    rng = np.random.default_rng(0)
+    dates = pd.date_range(start, periods=days, freq="D")
+    return pd.concat([
+        pd.DataFrame({
+            'date': dates,
+            'product_id': product_id,
+            'sales_quantity': rng.poisson(level * (1 + 0.5 * (dates.dayofweek >= 5))).astype(float),
+            'stock_to_sales_ratio': 2.0,
+            'price': 10.0 + i,
+        })
+        for i, (product_id, level) in enumerate(levels.items())
+    ], ignore_index=True)
+
+@pytest.fixture(scope="module")
+def model():
+    data = history({"LOW": 2, "MID": 10, "HIGH": 40})
+    return GlobalDemandModel(max_horizon=14).fit(data, {"LOW": "a", "MID": "a", "HIGH": "b"}), data
+
+def test_products_are_target_encoded(model):
+    model, data = model
+    assert "product_encoding" in FEATURES
+
+    totals = data.groupby('product_id')['sales_quantity'].agg(['sum', 'count'])
+    prior = PRODUCT_ENCODING_SMOOTHING * data['sales_quantity'].mean()
+    expected = (totals['sum'] + prior) / (totals['count'] + PRODUCT_ENCODING_SMOOTHING)
+    assert model.product_encoding == pytest.approx(expected.to_dict())
+    assert model.product_encoding["LOW"] < model.product_encoding["MID"] < model.product_encoding["HIGH"]
+    # A product unseen in training falls back to the global mean
+    np.testing.assert_allclose(model.encode_products(["NEW"]), [model.global_mean])
+
+def test_daily_history_fills_missing_days():
+    data = history({"A": 5}, days=10)
+    gappy = data.drop(index=[3, 4]).sample(frac=1, random_state=0)
+
+    daily = GlobalDemandModel.daily_history(gappy)
+
+    assert len(daily) == 10
+    assert (daily['date'].diff().dropna() == pd.Timedelta(days=1)).all()
+    assert daily.loc[3:4, 'sales_quantity'].tolist() == [0.0, 0.0]
+    assert daily.loc[3:4, 'price'].tolist() == [data.loc[2, 'price']] * 2
+    pd.testing.assert_frame_equal(GlobalDemandModel.daily_history(data), data)
+
+def test_missing_days_do_not_shift_lags(model):
+    model, data = model
+    # Days without sales either appear as zero rows or are left out entirely
+    zeroed = data.copy()
+    missing = (zeroed['product_id'] == "MID") & zeroed['date'].isin(pd.date_range("2024-04-20", periods=5))
+    zeroed.loc[missing, 'sales_quantity'] = 0.0
+    gappy = zeroed[~missing]
+
+    expected = model.predict(zeroed, days_ahead=14)["MID"]
+    actual = model.predict(gappy, days_ahead=14)["MID"]
+
+    pd.testing.assert_frame_equal(actual, expected)
+    assert actual['date'].iloc[0] == data['date'].max() + pd.Timedelta(days=1)
+
+def test_saved_model_keeps_its_encoding(model, tmp_path):
+    model, data = model
+    model.save(tmp_path)
+    loaded = GlobalDemandModel.load(tmp_path)
+
+    assert loaded.product_encoding == model.product_encoding
+    pd.testing.assert_frame_equal(loaded.predict(data, 7)["HIGH"], model.predict(data, 7)["HIGH"])
@@ -0,0 +1,86 @@
+import logging
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+import pytest
+from prophet import Prophet
+
+from models.intervals import FastIntervals, interval_stats, sampled_bounds
+from models.prophet_batch import ProphetBatch
+
+logging.getLogger("cmdstanpy").setLevel(logging.WARNING)
+
+WIDTH = 0.8
+
+@pytest.fixture(scope="module")
+def model():
+    rng = np.random.default_rng(0)
+    dates = pd.date_range("2024-01-01", periods=240, freq="D")
+    t = np.arange(len(dates))
+    y = 30 + 0.05 * t + 4 * np.sin(2 * np.pi * t / 7) + rng.normal(0, 2, len(t))
+    return Prophet().fit(pd.DataFrame({'ds': dates, 'y': y}))
+
+def bounds(model, mode, dates):
+    _, yhat = ProphetBatch({'PRD001': model}).yhat(dates)
+    lower, upper = FastIntervals(mode, WIDTH).bounds({'PRD001': model}, dates, yhat)
+    return yhat[0], lower[0], upper[0]
+
+def test_stats_match_in_sample_residuals(model):
+    stats = interval_stats(model, WIDTH)
+    residuals = model.history['y'].to_numpy() - model.predict(model.history[['ds']])['yhat'].to_numpy()
+    scale = np.mean(np.abs(model.params['delta'].mean(axis=0)))
+
+    assert stats['rmse'] == pytest.approx(np.sqrt(np.mean(residuals ** 2)), rel=1e-6)
+    assert stats['lower_quantile'] == pytest.approx(np.quantile(residuals, 0.1), rel=1e-6)
+    assert stats['upper_quantile'] == pytest.approx(np.quantile(residuals, 0.9), rel=1e-6)
+    # Laplace(0, lambda) rate changes at rate S: variance S * 2 * lambda^2 * tau^3 / 3, in y units
+    expected_trend_variance = len(model.changepoints_t) * 2 * scale ** 2 / 3 * model.y_scale ** 2
+    assert stats['trend_variance'] == pytest.approx(expected_trend_variance, rel=1e-3)
+
+def test_analytic_half_width_formula(model):
+    stats = interval_stats(model, WIDTH)
+    z = NormalDist().inv_cdf((1 + WIDTH) / 2)
+    dates = pd.date_range(model.history['ds'].max() - pd.Timedelta(days=10), periods=60, freq="D")
+    yhat, lower, upper = bounds(model, "analytic", dates)
+
+    t = (dates.as_unit('ns').asi8 - stats['start']) / stats['t_scale']
+    tau = np.maximum(t - 1, 0)
+    expected = z * np.sqrt(stats['rmse'] ** 2 + stats['trend_variance'] * tau ** 3)
+
+    np.testing.assert_allclose(upper - yhat, expected, rtol=1e-9)
+    np.testing.assert_allclose(yhat - lower, expected, rtol=1e-9)
+    # Within the history only noise counts; past it the interval widens
+    in_history = dates <= model.history['ds'].max()
+    np.testing.assert_allclose((upper - yhat)[in_history], z * stats['rmse'], rtol=1e-9)
+    assert np.all(np.diff((upper - yhat)[~in_history]) > 0)
+
+def test_residual_mode_uses_quantiles_in_history(model):
+    stats = interval_stats(model, WIDTH)
+    dates = pd.date_range(model.history['ds'].min(), periods=30, freq="D")
+    yhat, lower, upper = bounds(model, "residual", dates)
+
+    np.testing.assert_allclose(lower - yhat, stats['lower_quantile'], rtol=1e-9)
+    np.testing.assert_allclose(upper - yhat, stats['upper_quantile'], rtol=1e-9)
+
+def test_in_sample_coverage_is_close_to_width(model):
+    dates = pd.DatetimeIndex(model.history['ds'])
+    _, lower, upper = bounds(model, "analytic", dates)
+    y = model.history['y'].to_numpy()
+    coverage = np.mean((y >= lower) & (y <= upper))
+    assert abs(coverage - WIDTH) < 0.06
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        FastIntervals("sampled")
+
+def test_sampled_bounds_match_prophet_predict(model):
+    dates = pd.date_range(model.history['ds'].max() + pd.Timedelta(days=1), periods=30, freq="D")
+
+    np.random.seed(0)
+    lower, upper = sampled_bounds({'PRD001': model}, dates)
+    np.random.seed(0)
+    forecast = model.predict(pd.DataFrame({'ds': dates}))
+
+    np.testing.assert_array_equal(lower[0], forecast['yhat_lower'].to_numpy())
+    np.testing.assert_array_equal(upper[0], forecast['yhat_upper'].to_numpy())
@@ -0,0 +1,59 @@
+import logging
+
+import numpy as np
+import pandas as pd
+import pytest
+from prophet import Prophet
+
+from models.prophet_batch import ProphetBatch, check_against_prophet, supports_batch
+
+logging.getLogger("cmdstanpy").setLevel(logging.WARNING)
+
+HISTORY = pd.date_range("2024-01-01", periods=200, freq="D")
+
+def history(seed, trend):
+    rng = np.random.default_rng(seed)
+    t = np.arange(len(HISTORY))
+    y = 20 + trend * t + 3 * np.sin(2 * np.pi * t / 7) + rng.normal(0, 1, len(t))
+    # A change in slope halfway gives the changepoints something to fit
+    y[len(t) // 2:] += 0.1 * np.arange(len(t) - len(t) // 2)
+    return pd.DataFrame({'ds': HISTORY, 'y': y})
+
+def fit(model, seed, trend):
+    return model.fit(history(seed, trend))
+
+@pytest.fixture(scope="module")
+def models():
+    return {
+        "PRD001": fit(Prophet(), 1, 0.05),
+        "PRD002": fit(Prophet(), 2, -0.02),
+        # Different seasonalities put this one in its own group
+        "PRD003": fit(Prophet(weekly_seasonality=False, daily_seasonality=False), 3, 0.0),
+        # Holidays are not batchable and go through Prophet.predict
+        "PRD004": fit(Prophet(holidays=pd.DataFrame({
+            'holiday': 'promo', 'ds': pd.to_datetime(["2024-03-01", "2024-06-01", "2024-09-01"])
+        })), 4, 0.03),
+    }
+
+def test_supports_batch(models):
+    assert all(supports_batch(models[product_id]) for product_id in ["PRD001", "PRD002", "PRD003"])
+    assert not supports_batch(models["PRD004"])
+
+def test_yhat_matches_prophet_predict(models):
+    # History and future dates, across changepoints and past the last one
+    dates = pd.date_range("2024-02-01", periods=250, freq="D")
+    result = check_against_prophet(models, dates, tolerance=1e-6)
+    assert result['within_tolerance'], result
+    assert result['products'] == 4
+
+def test_rows_follow_model_order_and_unsorted_dates(models):
+    dates = pd.DatetimeIndex(["2024-08-10", "2024-07-20", "2024-08-01"])
+    product_ids, yhat = ProphetBatch(models).yhat(dates)
+
+    assert product_ids == list(models)
+    assert yhat.shape == (4, 3)
+    for row, product_id in enumerate(product_ids):
+        expected = models[product_id].predict(pd.DataFrame({'ds': dates}))
+        # Prophet.predict sorts by date; map back to the requested order
+        expected = expected.set_index('ds')['yhat'].reindex(dates).to_numpy()
+        np.testing.assert_allclose(yhat[row], expected, atol=1e-6)
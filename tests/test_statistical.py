@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+
+from models.statistical import (
+    forecast_matrix, route_products, sales_matrix, StatisticalForecaster, INTERMITTENT_ADI
+)
+
+def frame(series, start="2025-01-01"):
+    """Long sales frame from {product_id: daily sales}."""
+    return pd.concat([
+        pd.DataFrame({
+            'product_id': product_id,
+            'date': pd.date_range(start, periods=len(sales), freq="D"),
+            'sales_quantity': sales,
+        })
+        for product_id, sales in series.items()
+    ], ignore_index=True)
+
+def test_sales_matrix_right_aligns_shorter_histories():
+    data = frame({"A": [1, 2, 3, 4], "B": [5, 6]}, start="2025-01-01")
+    data.loc[data['product_id'] == "B", 'date'] += pd.Timedelta(days=2)
+
+    product_ids, last_dates, Y = sales_matrix(data.sample(frac=1, random_state=0))
+
+    assert list(product_ids) == ["A", "B"]
+    assert Y.shape == (2, 4)
+    np.testing.assert_array_equal(Y[0], [1, 2, 3, 4])
+    np.testing.assert_array_equal(Y[1], [np.nan, np.nan, 5, 6])
+    assert (last_dates == np.datetime64("2025-01-04")).all()
+
+def test_forecast_matrix_shapes_and_bounds():
+    rng = np.random.default_rng(0)
+    Y = rng.poisson(5, size=(12, 120)).astype(float)
+    Y[3, :40] = np.nan  # shorter history
+    Y[4] = np.where(rng.random(120) < 0.2, rng.poisson(3, 120), 0)  # intermittent
+    Y[5] = 0.0  # never sold
+
+    prediction, lower, upper, method = forecast_matrix(Y, 30)
+
+    assert prediction.shape == lower.shape == upper.shape == (12, 30)
+    assert method.shape == (12,)
+    assert set(method) <= {"ses", "seasonal_naive", "tsb"}
+    assert np.isfinite(prediction).all() and np.isfinite(upper).all()
+    assert (lower >= 0).all() and (lower <= prediction).all() and (prediction <= upper).all()
+    assert method[4] == "tsb" and method[5] == "tsb"
+    np.testing.assert_array_equal(prediction[5], 0.0)
+
+def test_seasonal_product_uses_seasonal_naive():
+    week = np.array([1, 2, 3, 10, 3, 2, 1], dtype=float)
+    Y = np.tile(week, 16)[None, :]
+
+    prediction, _, _, method = forecast_matrix(Y, 14)
+
+    assert method[0] == "seasonal_naive"
+    np.testing.assert_allclose(prediction[0], np.tile(week, 2))
+
+def test_route_products_sends_high_volume_regular_demand_to_prophet():
+    days = 70
+    rng = np.random.default_rng(1)
+    intermittent = np.zeros(days)
+    intermittent[::10] = 500  # Large but sells one day in ten
+    data = frame({
+        "BIG": np.full(days, 100.0),
+        "MID": np.full(days, 40.0),
+        "SPIKY": intermittent,
+        "TAIL1": rng.poisson(1, days).astype(float) + 1,
+        "TAIL2": np.full(days, 1.0),
+    })
+
+    routes = route_products(data, volume_share=0.8)
+
+    assert set(routes) == {"BIG", "MID", "SPIKY", "TAIL1", "TAIL2"}
+    assert routes["BIG"] == "prophet" and routes["MID"] == "prophet"
+    # In the volume head, but its demand interval is above INTERMITTENT_ADI
+    assert days / (days / 10) > INTERMITTENT_ADI
+    assert routes["SPIKY"] == "statistical"
+    assert routes["TAIL1"] == "statistical" and routes["TAIL2"] == "statistical"
+
+def test_forecaster_returns_dated_frames_per_product():
+    data = frame({"A": np.arange(30, dtype=float), "B": np.full(20, 2.0)})
+
+    forecasts = StatisticalForecaster().predict(data, days_ahead=7)
+
+    assert set(forecasts) == {"A", "B"}
+    for product_id, forecast in forecasts.items():
+        last = data.loc[data['product_id'] == product_id, 'date'].max()
+        assert len(forecast) == 7
+        assert forecast['date'].iloc[0] == last + pd.Timedelta(days=1)
+        assert {'combined_prediction', 'prophet_lower', 'prophet_upper', 'method'} <= set(forecast.columns)
+    assert StatisticalForecaster().predict(data, product_ids=["missing"]) == {}
@@ -0,0 +1,106 @@
+import logging
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from models.train import DemandForecaster
+
+logging.getLogger("cmdstanpy").setLevel(logging.WARNING)
+
+def sales_rows(product_id, days, level, start="2024-01-01", seed=0):
+    """Rows in the layout of processed_sales.csv for one product."""
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(start, periods=days, freq="D")
+    sales = rng.poisson(level, days).astype(float)
+    return pd.DataFrame({
+        'date': dates,
+        'product_id': product_id,
+        'sales_quantity': sales,
+        'day_of_week': dates.dayofweek,
+        'month': dates.month,
+        'year': dates.year,
+        'is_weekend': (dates.dayofweek >= 5).astype(int),
+        'sales_7d_avg': pd.Series(sales).rolling(7, min_periods=1).mean().to_numpy(),
+        'stock_to_sales_ratio': 2.0,
+    })
+
+def forecaster(tmp_path, data):
+    forecaster = DemandForecaster(data_path=tmp_path / "data", model_path=tmp_path / "saved")
+    forecaster.data = data.reset_index(drop=True)
+    return forecaster
+
+def report(forecaster):
+    return {row['product_id']: row for row in forecaster.training_report}
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_failing_product_does_not_abort_the_run(tmp_path, workers):
+    data = pd.concat([
+        sales_rows("PRD001", 60, 10, seed=1),
+        # A single row is too little for Prophet to fit
+        sales_rows("PRD002", 1, 5, seed=2),
+        sales_rows("PRD003", 60, 3, seed=3),
+    ])
+    trainer = forecaster(tmp_path, data)
+
+    counts = trainer.train_models(workers=workers)
+    rows = report(trainer)
+
+    assert counts == {'skipped': 0, 'refit': 0, 'new': 2, 'failed': 1}
+    assert set(trainer.models) == {"PRD001", "PRD003"}
+    assert rows["PRD002"]['status'] == 'failed' and rows["PRD002"]['error']
+    assert rows["PRD001"]['status'] == rows["PRD003"]['status'] == 'new'
+    assert list(rows) == ["PRD001", "PRD002", "PRD003"]
+
+    trainer.save_models()
+    saved = pd.read_csv(tmp_path / "saved" / "training_report.csv")
+    assert saved.set_index('product_id').loc["PRD002", 'status'] == 'failed'
+    assert not (tmp_path / "saved" / "prophet_model_PRD002.json").exists()
+
+def train_and_save(tmp_path, data):
+    trainer = forecaster(tmp_path, data)
+    counts = trainer.train_models()
+    if trainer.models:
+        trainer.save_models()
+    return trainer, counts
+
+def test_incremental_training_retrains_only_changed_products(tmp_path):
+    data = pd.concat([sales_rows(product_id, 60, 8, seed=i) for i, product_id in enumerate(["A", "B", "C"])])
+    _, counts = train_and_save(tmp_path, data)
+    assert counts['new'] == 3
+    manifest = DemandForecaster(tmp_path / "data", tmp_path / "saved").load_manifest()
+    assert set(manifest) == {"A", "B", "C"}
+    assert manifest["A"]['rows'] == 60 and manifest["A"]['last_date'].startswith("2024-02-29")
+
+    # Same data: every product matches its fingerprint
+    trainer, counts = train_and_save(tmp_path, data)
+    assert counts == {'skipped': 3, 'refit': 0, 'new': 0, 'failed': 0}
+    assert trainer.skipped_products == ["A", "B", "C"]
+
+    # One corrected row for B: only B is refit, warm-started from its last fit
+    changed = data.copy()
+    changed.loc[(changed['product_id'] == "B") & (changed['date'] == "2024-02-01"), 'sales_quantity'] += 5
+    trainer, counts = train_and_save(tmp_path, changed)
+    rows = report(trainer)
+    assert counts == {'skipped': 2, 'refit': 1, 'new': 0, 'failed': 0}
+    assert rows["B"]['status'] == 'refit' and rows["B"]['warm_started']
+    assert set(trainer.models) == {"B"}
+
+    # A deleted artifact forces that product to train again
+    (tmp_path / "saved" / "feature_model_C.joblib").unlink()
+    trainer, counts = train_and_save(tmp_path, changed)
+    assert counts == {'skipped': 2, 'refit': 1, 'new': 0, 'failed': 0}
+    assert set(trainer.models) == {"C"}
+    assert (tmp_path / "saved" / "feature_model_C.joblib").exists()
+
+    # Everything is back in sync
+    _, counts = train_and_save(tmp_path, changed)
+    assert counts['skipped'] == 3
+
+def test_full_run_ignores_the_manifest(tmp_path):
+    data = pd.concat([sales_rows(product_id, 40, 5, seed=i) for i, product_id in enumerate(["A", "B"])])
+    train_and_save(tmp_path, data)
+
+    counts = forecaster(tmp_path, data).train_models(incremental=False)
+
+    assert counts == {'skipped': 0, 'refit': 2, 'new': 0, 'failed': 0}